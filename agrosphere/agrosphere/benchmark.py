@@ -0,0 +1,72 @@
+"""
+Small timing harness shared by the ``bench_*`` management commands.
+"""
+import statistics
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    timings: list = field(default_factory=list)
+    queries: int = 0
+    operations: int = 1  # units of work per timed call, e.g. rows serialized
+
+    @property
+    def best(self):
+        return min(self.timings)
+
+    @property
+    def median(self):
+        return statistics.median(self.timings)
+
+    @property
+    def p95(self):
+        ordered = sorted(self.timings)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    @property
+    def per_operation(self):
+        return self.median / self.operations
+
+    def format(self):
+        line = (
+            f"{self.name:<32} median {self.median * 1000:10.3f} ms  "
+            f"best {self.best * 1000:10.3f} ms  p95 {self.p95 * 1000:10.3f} ms  "
+            f"queries {self.queries:>4}"
+        )
+        if self.operations > 1:
+            line += f"  per-op {self.per_operation * 1_000_000:9.2f} us"
+        return line
+
+
+def measure(name, func, repeat=5, warmup=1, operations=1):
+    """
+    Time ``func`` ``repeat`` times after ``warmup`` untimed calls, recording
+    the number of queries issued by the last run.
+    """
+    for _ in range(warmup):
+        func()
+    result = BenchmarkResult(name=name, operations=operations)
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            func()
+            result.timings.append(time.perf_counter() - start)
+        result.queries = len(context)
+    return result
+
+
+def report(stdout, results, baseline=None):
+    """
+    Write one line per result, plus the speed-up relative to ``baseline``.
+    """
+    for result in results:
+        line = result.format()
+        if baseline is not None and result is not baseline:
+            line += f"  x{baseline.median / result.median:.1f} vs {baseline.name}"
+        stdout.write(line)
@@ -0,0 +1,80 @@
+"""
+Conditional GET support: answer ``If-None-Match`` / ``If-Modified-Since``
+with ``304 Not Modified`` from cheap validators, before the view queries and
+serializes the full representation.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """
+    Weak ETag over ``parts``; only used to compare representations.
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_conditional(request):
+    meta = request.META
+    return "HTTP_IF_NONE_MATCH" in meta or "HTTP_IF_MODIFIED_SINCE" in meta
+
+
+class ConditionalGetMixin:
+    """
+    Wraps ``get`` with validator checks. Views implement ``get_validators``
+    returning ``(parts, last_modified)`` (or ``None`` to skip), where
+    ``parts`` is anything that changes whenever the response body does and
+    ``last_modified`` is an optional datetime. The accepted renderer and the
+    normalized query string are always mixed into the ETag.
+
+    ``get_validators`` only runs for requests carrying ``If-None-Match`` or
+    ``If-Modified-Since``; unconditional GETs are answered first and labelled
+    with ``get_response_validators(response)``, which views can override to
+    derive the same validators from the rendered data without a query.
+    """
+
+    def get_validators(self):
+        return None
+
+    def get_response_validators(self, response):
+        return self.get_validators()
+
+    def get(self, request, *args, **kwargs):
+        if not is_conditional(request):
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == 200:
+                self.label(request, response, self.get_response_validators(response))
+            return response
+
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        etag, timestamp = self.make_validators(request, validators)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            self.label(request, response, validators)
+        return response
+
+    def make_validators(self, request, validators):
+        parts, last_modified = validators
+        etag = make_etag(request.accepted_renderer.format, self.normalized_query(request), *parts)
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def label(self, request, response, validators):
+        if validators is None:
+            return
+        etag, timestamp = self.make_validators(request, validators)
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+
+    def normalized_query(self, request):
+        return urlencode(sorted(
+            (key, value) for key, values in request.query_params.lists() for value in values
+        ))
@@ -0,0 +1,195 @@
+"""
+Sparse fieldsets (``?fields=``) and opt-in expansion (``?expand=``).
+
+Both parameters take comma-separated, dot-nested field paths::
+
+    ?fields=id,status,items.quantity,items.product.title
+    ?expand=items.product
+
+``SparseFieldsetMixin`` prunes a serializer (and its nested serializers) to
+the requested shape; fields listed in ``Meta.expandable_fields`` are only
+rendered when expanded, or when ``fields`` reaches into them. ``fields`` is
+honoured on safe requests only, so it can never drop writable input;
+``expand`` also shapes the response of writes. ``SparseQuerysetMixin`` then derives
+``only()``, ``select_related()`` and ``prefetch_related()`` for the view's
+queryset from that pruned serializer, so unrequested columns and relations
+are never loaded.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def parse_paths(value):
+    """
+    ``"a,b.c,b.d"`` -> ``{"a": {}, "b": {"c": {}, "d": {}}}``
+    """
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for name in filter(None, (part.strip() for part in path.split("."))):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def requested_shape(request):
+    """
+    The ``(fields, expand)`` trees requested by ``request``; empty trees mean
+    the serializer's default shape.
+    """
+    if request is None:
+        return {}, {}
+    params = request.query_params
+    fields = parse_paths(params.get(FIELDS_PARAM, "")) if request.method in SAFE_METHODS else {}
+    return fields, parse_paths(params.get(EXPAND_PARAM, ""))
+
+
+class SparseFieldsetMixin:
+    """
+    ``Meta.expandable_fields`` maps a field name to ``(serializer_class,
+    kwargs)``; ``Meta.field_dependencies`` lists the model fields behind
+    computed fields (e.g. ``SerializerMethodField``) for query optimization.
+    """
+
+    def get_sparse_shape(self):
+        if hasattr(self, "_sparse_shape"):
+            return self._sparse_shape
+        parent = self.parent
+        if parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return requested_shape(self.context.get("request"))
+        return {}, {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        wanted, expand = self.get_sparse_shape()
+        request = self.context.get("request")
+        writing = request is not None and request.method not in SAFE_METHODS
+        for name, (serializer_class, kwargs) in getattr(self.Meta, "expandable_fields", {}).items():
+            if writing and name in fields and not fields[name].read_only:
+                continue  # still needed for input
+            if name in expand or wanted.get(name):
+                fields[name] = serializer_class(**kwargs)
+        if wanted:
+            fields = type(fields)(
+                (name, field) for name, field in fields.items() if name in wanted or field.write_only
+            )
+        for name, field in fields.items():
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, SparseFieldsetMixin):
+                nested._sparse_shape = (wanted.get(name, {}), expand.get(name, {}))
+        return fields
+
+
+def concrete_name(opts, name):
+    """
+    Model field name for ``name`` (which may be an attname such as
+    ``product_id``), or None if it is not a concrete field.
+    """
+    for field in opts.concrete_fields:
+        if name in (field.name, field.attname):
+            return field.name
+    return None
+
+
+def queryset_plan(serializer, model, prefix=""):
+    """
+    Walk ``serializer``'s readable fields and return ``(only, select_related,
+    prefetches)`` for ``model``; ``only`` is None when some field needs the
+    whole instance.
+    """
+    opts = model._meta
+    only, related, prefetches = {prefix + opts.pk.name}, [], []
+    restrict = True
+    dependencies = getattr(getattr(serializer, "Meta", None), "field_dependencies", {})
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        if name in dependencies:
+            only.update(prefix + path for path in dependencies[name])
+            continue
+        if source == "*" or "." in source:
+            restrict = False
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            try:
+                relation = opts.get_field(source)
+            except FieldDoesNotExist:
+                relation = None
+            child = field.child
+            if relation is None or not relation.one_to_many or not isinstance(child, serializers.ModelSerializer):
+                restrict = False
+                continue
+            child_model = child.Meta.model
+            child_only, child_related, child_prefetches = queryset_plan(child, child_model)
+            queryset = child_model._default_manager.all()
+            if child_related:
+                queryset = queryset.select_related(*child_related)
+            if child_only is not None:
+                # The prefetch joins children back through their foreign key
+                queryset = queryset.only(*child_only, relation.field.name)
+            if child_prefetches:
+                queryset = queryset.prefetch_related(*child_prefetches)
+            prefetches.append(Prefetch(prefix + source, queryset=queryset))
+            continue
+        try:
+            model_field = opts.get_field(concrete_name(opts, source) or source)
+        except FieldDoesNotExist:
+            restrict = False
+            continue
+        if not model_field.concrete:
+            restrict = False
+            continue
+        if isinstance(field, serializers.ModelSerializer) and model_field.is_relation:
+            nested_only, nested_related, nested_prefetches = queryset_plan(
+                field, model_field.related_model, f"{prefix}{model_field.name}__"
+            )
+            related += [f"{prefix}{model_field.name}", *nested_related]
+            prefetches += nested_prefetches
+            if nested_only is None:
+                restrict = False
+            else:
+                only.add(prefix + model_field.name)
+                only.update(nested_only)
+        elif isinstance(field, serializers.StringRelatedField) and model_field.is_relation:
+            # __str__ may read any column of the related row
+            related.append(prefix + model_field.name)
+            only.add(prefix + model_field.name)
+        else:
+            only.add(prefix + model_field.name)
+    return (only if restrict else None), related, prefetches
+
+
+def optimize_queryset(queryset, serializer):
+    """
+    Replace the related loading of ``queryset`` with what ``serializer``
+    actually renders and restrict its columns with ``only()``.
+    """
+    only, related, prefetches = queryset_plan(serializer, queryset.model)
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    if only is not None:
+        queryset = queryset.only(*only)
+    return queryset
+
+
+class SparseQuerysetMixin:
+    """
+    Shape the filtered queryset of safe requests to the (sparse) serializer.
+    Hooked into ``filter_queryset`` so views overriding ``get_queryset``
+    still get it, for lists and ``get_object`` alike.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        return optimize_queryset(queryset, self.get_serializer())
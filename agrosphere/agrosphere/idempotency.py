@@ -0,0 +1,141 @@
+"""
+``Idempotency-Key`` support for unsafe requests.
+
+The first request carrying a key claims it with ``cache.add`` and runs; its
+response (status, data and a few headers) is stored under the key for
+``TTL`` seconds. Retries with the same key and payload get the stored
+response replayed without touching the view, concurrent duplicates wait for
+the first one to finish, and reusing a key for a different payload is
+rejected. Server errors are not stored, so those can be retried.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+STORED_HEADERS = ("Location", "ETag", "Last-Modified")
+MAX_KEY_LENGTH = 255
+
+DEFAULTS = {
+    "TTL": 24 * 60 * 60,   # how long a completed response is replayed
+    "LOCK_TIMEOUT": 30,    # upper bound on the first request's run time
+    "WAIT_TIMEOUT": 10,    # how long a concurrent duplicate waits for it
+    "POLL_INTERVAL": 0.05,
+}
+
+
+def options():
+    return {**DEFAULTS, **getattr(settings, "IDEMPOTENCY", {})}
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed."
+    default_code = "idempotency_conflict"
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used with a different request."
+    default_code = "idempotency_key_reused"
+
+
+class Replay(Exception):
+    def __init__(self, entry):
+        self.entry = entry
+
+
+class IdempotencyMixin:
+    """
+    Honour ``Idempotency-Key`` on the view's unsafe methods. Keys are scoped
+    to the authenticated user, method and path. Views that may run longer
+    than ``LOCK_TIMEOUT`` set ``idempotency_lock_timeout``, so the claim does
+    not lapse and let a retry run the request a second time.
+    """
+
+    idempotency_lock_timeout = None
+
+    def get_idempotency_fingerprint(self, request):
+        return hashlib.sha256(request.body).hexdigest()
+
+    def get_idempotency_cache_key(self, request, key):
+        user = request.user.pk if request.user.is_authenticated else "anonymous"
+        scope = f"{user}:{request.method}:{request.path}:{key}"
+        return "idempotency:" + hashlib.sha256(scope.encode()).hexdigest()
+
+    def initial(self, request, *args, **kwargs):
+        self._idempotency_claim = None
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(HEADER)
+        if key is None or request.method not in UNSAFE_METHODS:
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({HEADER: [f"Must be 1 to {MAX_KEY_LENGTH} characters."]})
+        self.claim_idempotency_key(
+            self.get_idempotency_cache_key(request, key), self.get_idempotency_fingerprint(request)
+        )
+
+    def claim_idempotency_key(self, cache_key, fingerprint):
+        """
+        Claim ``cache_key`` for this request, or raise ``Replay`` with the
+        stored response once the first request with that key completes.
+        """
+        config = options()
+        deadline = time.monotonic() + config["WAIT_TIMEOUT"]
+        while True:
+            lock_timeout = self.idempotency_lock_timeout or config["LOCK_TIMEOUT"]
+            if cache.add(cache_key, {"fingerprint": fingerprint}, lock_timeout):
+                self._idempotency_claim = (cache_key, fingerprint)
+                return
+            entry = cache.get(cache_key)
+            if entry is not None:
+                if entry["fingerprint"] != fingerprint:
+                    raise IdempotencyKeyReused()
+                if "status" in entry:
+                    raise Replay(entry)
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict()
+            time.sleep(config["POLL_INTERVAL"])
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # Still set only if the view raised past finalize_response
+            claim = getattr(self, "_idempotency_claim", None)
+            if claim is not None:
+                self._idempotency_claim = None
+                cache.delete(claim[0])
+
+    def handle_exception(self, exc):
+        if isinstance(exc, Replay):
+            entry = exc.entry
+            response = Response(entry["data"], status=entry["status"], headers=entry["headers"])
+            response[REPLAYED_HEADER] = "true"
+            return response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        claim = getattr(self, "_idempotency_claim", None)
+        if claim is None:
+            return response
+        cache_key, fingerprint = claim
+        self._idempotency_claim = None
+        if response.status_code >= 500 or not isinstance(response, Response):
+            cache.delete(cache_key)
+            return response
+        cache.set(cache_key, {
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "data": response.data,
+            "headers": {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+        }, options()["TTL"])
+        return response
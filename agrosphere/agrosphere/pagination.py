@@ -0,0 +1,218 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the full ordering key instead of offsets.
+
+    The ordering is taken from the filtered queryset (so ``OrderingFilter``
+    and search ranking are honoured) and the primary key is appended as a
+    tiebreaker, which keeps pages stable on non-unique columns such as
+    ``price`` or ``title``. The cursor stores the key of the last row seen and
+    the next page is fetched with ``WHERE (key) > (cursor) ... LIMIT n + 1``:
+    no ``COUNT(*)`` and no ``OFFSET``, so page N costs the same as page 1.
+    Nullable ordering columns sort NULLs last.
+    """
+
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor.get("r"))
+
+        ordering = [(name, not descending if self.reverse else descending, nullable)
+                    for name, descending, nullable in self.ordering]
+        queryset = queryset.order_by(*(self.order_expression(*key) for key in ordering))
+        if cursor:
+            queryset = queryset.filter(self.seek_condition(ordering, self.cursor_values(queryset, cursor["v"])))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """
+        Return ``(name, descending, nullable)`` triples for the queryset's
+        ordering, with the primary key appended as a unique tiebreaker.
+        """
+        clauses = queryset.query.order_by or queryset.query.get_meta().ordering
+        opts = queryset.model._meta
+        pk_names = {"pk", opts.pk.name, opts.pk.attname}
+        ordering = []
+        for clause in clauses:
+            if isinstance(clause, OrderBy) and isinstance(clause.expression, F):
+                name, descending = clause.expression.name, clause.descending
+            elif isinstance(clause, str) and clause != "?":
+                name, descending = clause.lstrip("-"), clause.startswith("-")
+            else:
+                continue
+            if name in pk_names:
+                ordering.append(("pk", descending, False))
+                return ordering
+            ordering.append((name, descending, self.is_nullable(opts, name)))
+        ordering.append(("pk", ordering[-1][1] if ordering else True, False))
+        return ordering
+
+    def is_nullable(self, opts, name):
+        try:
+            return opts.get_field(name).null
+        except FieldDoesNotExist:
+            return False  # annotation, e.g. search rank
+
+    def order_expression(self, name, descending, nullable):
+        if not nullable:
+            return f"-{name}" if descending else name
+        # NULLs trail forward pages, so they lead once the direction is flipped
+        nulls = {"nulls_first": True} if self.reverse else {"nulls_last": True}
+        return F(name).desc(**nulls) if descending else F(name).asc(**nulls)
+
+    def seek_condition(self, ordering, values):
+        """
+        Rows strictly after ``values`` in ``ordering``:
+        ``(a > x) OR (a = x AND b > y) OR ...`` with NULL-aware comparisons.
+        """
+        condition = Q(pk__in=[])
+        equal_prefix = Q()
+        for (name, descending, nullable), value in zip(ordering, values):
+            nulls_after = nullable and not self.reverse
+            if value is None:
+                # Past a NULL only non-NULLs remain, and only when NULLs lead
+                after = Q(pk__in=[]) if nulls_after else Q(**{f"{name}__isnull": False})
+                equal = Q(**{f"{name}__isnull": True})
+            else:
+                after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                if nulls_after:
+                    after |= Q(**{f"{name}__isnull": True})
+                equal = Q(**{name: value})
+            condition |= equal_prefix & after
+            equal_prefix &= equal
+        return condition
+
+    def cursor_values(self, queryset, values):
+        """
+        The cursor's ``values`` converted by their ordering fields, so a
+        tampered cursor is a 404 rather than a database error.
+        """
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        opts = queryset.model._meta
+        converted = []
+        try:
+            for (name, _, _), value in zip(self.ordering, values):
+                if value is None:
+                    converted.append(None)
+                    continue
+                if name == "pk":
+                    field = opts.pk
+                elif name in queryset.query.annotations:
+                    field = queryset.query.annotations[name].output_field
+                else:
+                    field = opts.get_field(name)
+                if isinstance(value, (dict, list)):
+                    raise TypeError(name)
+                converted.append(field.to_python(value))
+        except (ValidationError, TypeError, ValueError, FieldDoesNotExist):
+            raise NotFound(self.invalid_cursor_message)
+        return converted
+
+    def position(self, row):
+        values = []
+        for name, _, _ in self.ordering:
+            if isinstance(row, dict):
+                value = row["id"] if name == "pk" else row[name]
+            else:
+                value = getattr(row, name)
+            values.append(encode_value(value))
+        return values
+
+    def encode_cursor(self, values, reverse):
+        payload = {"v": values, "r": 1} if reverse else {"v": values}
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            if not isinstance(payload.get("v"), list):
+                raise ValueError
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        return payload
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # An empty page reached by paging backwards: restart from the top
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.position(self.page[0]), reverse=True)
+
+
+def encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
@@ -0,0 +1,192 @@
+"""
+Read-only projections: render serializer-identical output from ``.values()``.
+
+A ``Projection`` compiles its serializer (by default a bare
+``serializer_class()``; views pass theirs, already pruned to the requested
+sparse fieldset) once per shape into a flat plan of ``values()`` paths and
+per-field renderers (the serializer's own field ``to_representation``), then
+builds each row as a plain dict. This skips model instantiation,
+related-object lookups and the per-field serializer machinery while
+producing exactly the same JSON.
+"""
+from django.conf import settings
+from django.db.models import F
+from django.db.models.expressions import OrderBy
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+class Projection:
+    serializer_class = None
+    # Fields rendered with str() of a related value, e.g. {"vendor": "vendor__email"}
+    string_fields = {}
+    # SerializerMethodFields: {"name": (("path", ...), callable(row, prefix))}
+    method_fields = {}
+    # Nested many=True serializers: {"name": (ChildProjection, "fk_attname")}
+    children = {}
+
+    _plans = {}
+
+    def __init__(self, serializer=None):
+        self.serializer = self.serializer_class() if serializer is None else serializer
+
+    def plan(self):
+        key = (type(self), shape(self.serializer))
+        if key not in self._plans:
+            paths, renderers = self.compile(self.serializer, "")
+            if any(render is None for _, render in renderers):
+                paths.append("id")  # children are grouped by their parent's id
+            self._plans[key] = (list(dict.fromkeys(paths)), renderers)
+        return self._plans[key]
+
+    @classmethod
+    def compile(cls, serializer, prefix):
+        paths, renderers = [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = prefix + field.source.replace(".", "__")
+            if name in cls.children and not prefix:
+                renderers.append((name, None))
+            elif isinstance(field, serializers.BaseSerializer):
+                model = field.Meta.model
+                nested_paths, nested_renderers = cls.compile(field, f"{source}__")
+                pk_path = f"{source}__{model._meta.pk.name}"
+                paths += [pk_path, *nested_paths]
+                renderers.append((name, _nested(pk_path, nested_renderers)))
+            elif prefix + name in cls.string_fields:
+                path = cls.string_fields[prefix + name]
+                paths.append(path)
+                renderers.append((name, _stringify(path)))
+            elif isinstance(field, serializers.SerializerMethodField):
+                method_paths, method = cls.method_fields[prefix + name]
+                paths += [prefix + path for path in method_paths]
+                renderers.append((name, _method(method, prefix)))
+            elif isinstance(field, serializers.RelatedField):
+                paths.append(source)
+                renderers.append((name, _plain(source)))
+            else:
+                paths.append(source)
+                renderers.append((name, _represent(source, field.to_representation)))
+        return paths, renderers
+
+    def values(self, queryset, extra=()):
+        paths, _ = self.plan()
+        return queryset.values(*dict.fromkeys([*paths, *extra]))
+
+    def render(self, rows):
+        _, renderers = self.plan()
+        children = {name: self.render_children(name, rows) for name, render in renderers if render is None}
+        return [
+            {name: children[name][index] if render is None else render(row) for name, render in renderers}
+            for index, row in enumerate(rows)
+        ]
+
+    def render_children(self, name, rows):
+        projection_class, fk = self.children[name]
+        projection = projection_class(self.serializer.fields[name].child)
+        ids = [row["id"] for row in rows]
+        grouped = {pk: [] for pk in ids}
+        if ids:
+            model = projection_class.serializer_class.Meta.model
+            queryset = model._default_manager.filter(**{f"{fk}__in": ids}).order_by("pk")
+            for child in projection.values(queryset, [fk]):
+                grouped[child[fk]].append(child)
+        return [projection.render(grouped[pk]) for pk in ids]
+
+
+def shape(serializer):
+    """
+    Hashable outline of the fields ``serializer`` renders, nested included.
+    """
+    outline = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        nested = getattr(field, "child", field)
+        outline.append((name, shape(nested) if isinstance(nested, serializers.BaseSerializer) else None))
+    return tuple(outline)
+
+
+def _represent(path, to_representation):
+    def render(row):
+        value = row[path]
+        return None if value is None else to_representation(value)
+    return render
+
+
+def _plain(path):
+    return lambda row: row[path]
+
+
+def _stringify(path):
+    def render(row):
+        value = row[path]
+        return None if value is None else str(value)
+    return render
+
+
+def _method(method, prefix):
+    return lambda row: method(row, prefix)
+
+
+def _nested(pk_path, renderers):
+    def render(row):
+        if row[pk_path] is None:
+            return None
+        return {name: renderer(row) for name, renderer in renderers}
+    return render
+
+
+def ordering_names(queryset):
+    """
+    Plain column/annotation names the queryset is ordered by, so they can be
+    selected for the paginator's cursor.
+    """
+    names = []
+    for clause in queryset.query.order_by or queryset.query.get_meta().ordering:
+        if isinstance(clause, OrderBy) and isinstance(clause.expression, F):
+            names.append(clause.expression.name)
+        elif isinstance(clause, str) and clause != "?":
+            names.append(clause.lstrip("-"))
+    return [name for name in names if name != "pk" and "__" not in name]
+
+
+class ProjectionMixin:
+    """
+    Serve list/retrieve GETs through ``projection_class`` when set and
+    ``settings.READ_PROJECTIONS`` is on. Retrieval relies on ``get_queryset``
+    for access control: object-level permissions are not evaluated.
+    """
+
+    projection_class = None
+
+    def get_projection(self):
+        if self.projection_class is None or not getattr(settings, "READ_PROJECTIONS", True):
+            return None
+        return self.projection_class(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        projection = self.get_projection()
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = projection.values(queryset, ordering_names(queryset))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(projection.render(page))
+        return Response(projection.render(list(rows)))
+
+    def retrieve(self, request, *args, **kwargs):
+        projection = self.get_projection()
+        if projection is None:
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        rows = list(projection.values(queryset)[:1])
+        if not rows:
+            raise Http404
+        return Response(projection.render(rows)[0])
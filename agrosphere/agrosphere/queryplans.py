@@ -0,0 +1,59 @@
+"""
+Query-plan inspection for regression tests: EXPLAIN every query a block of
+code runs and report the tables that were read with a full sequential scan.
+"""
+import re
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# SQLite: "SCAN products_product" with no "USING ... INDEX" / virtual table suffix
+SQLITE_SCAN = re.compile(r"\bSCAN (\w+)(?: AS \w+)?\s*$")
+POSTGRES_SCAN = re.compile(r"\bSeq Scan on (\w+)")
+
+
+def explain(sql, params=()):
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def sequential_scans(plan):
+    pattern = SQLITE_SCAN if connection.vendor == "sqlite" else POSTGRES_SCAN
+    return [match.group(1) for line in plan.splitlines() if (match := pattern.search(line))]
+
+
+@contextmanager
+def prefer_indexes():
+    """
+    On PostgreSQL, make the planner pick any usable index even on the tiny
+    tables of a test database, so a remaining Seq Scan means no index fits.
+    """
+    if connection.vendor != "postgresql":
+        yield
+        return
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        yield
+
+
+class QueryPlanCapture(CaptureQueriesContext):
+    """
+    Capture the queries run inside the block; ``scans(tables)`` then returns
+    ``{sql: [table, ...]}`` for every captured query that sequentially scans
+    one of ``tables``.
+    """
+
+    def scans(self, tables):
+        found = {}
+        for query in self.captured_queries:
+            if not query["sql"].lstrip().upper().startswith("SELECT"):
+                continue
+            with prefer_indexes():
+                scanned = [table for table in sequential_scans(explain(query["sql"])) if table in tables]
+            if scanned:
+                found[query["sql"]] = scanned
+        return found
@@ -33,6 +33,10 @@ INSTALLED_APPS = [
     'users',
     'products',
     'orders',
+    'inventory',
+    'analytics',
+    'vendors',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -72,6 +76,23 @@ DATABASES = {}
 # Auth settings
 AUTH_USER_MODEL = "users.User"
 
+# Argon2 first; PBKDF2 only verifies older hashes, which are upgraded on login
+PASSWORD_HASHERS = [
+    'users.hashers.BoundedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Argon2 costs (see `manage.py tune_password_hasher`) and the per-process cap on
+# concurrent hash/verify calls, plus how long a request waits for a free slot
+PASSWORD_HASHING = {
+    'TIME_COST': env.int('ARGON2_TIME_COST', default=2),
+    'MEMORY_COST': env.int('ARGON2_MEMORY_COST', default=65536),
+    'PARALLELISM': env.int('ARGON2_PARALLELISM', default=1),
+    'MAX_CONCURRENCY': env.int('PASSWORD_HASHING_CONCURRENCY', default=2),
+    'ACQUIRE_TIMEOUT': 5,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -100,20 +121,59 @@ STATIC_URL = '/static/'
 # DRF + JWT settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_PAGINATION_CLASS': 'agrosphere.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': ['agrosphere.throttling.TokenBucketThrottle'],
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # Anonymous rate limits key on the address the outermost one saw; with 0
+    # the header is ignored and REMOTE_ADDR is used, so clients cannot spoof it
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
+}
+
+# Token-bucket rate limits (see agrosphere.throttling): per endpoint class, a
+# (refill rate, burst) pair for authenticated users and for anonymous clients by IP
+RATE_LIMITS = {
+    'ENABLED': env.bool('RATE_LIMITS_ENABLED', default=True),
+    'BACKEND': 'agrosphere.throttling.RedisTokenBuckets',
+    'OPTIONS': {'url': env('REDIS_RATE_LIMIT_URL', default='redis://localhost:6379/3')},
+    'SCOPES': {
+        'auth': {'anon': ('10/min', 5), 'user': ('10/min', 5)},
+        'search': {'anon': ('30/min', 10), 'user': ('120/min', 30)},
+        'browse': {'anon': ('120/min', 60), 'user': ('600/min', 120)},
+        'checkout': {'user': ('30/min', 10)},
+    },
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
-    'BLACKLIST_AFTER_ROTATION': True,
+    # Rotated refresh tokens are revoked in users.revocation, not simplejwt's blacklist app
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': False,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
+}
+
+# Revoked token ids and per-user token generations (see users.revocation)
+TOKEN_REVOCATION = {
+    'BACKEND': 'users.revocation.RedisRevocationStore',
+    'OPTIONS': {'url': env('REDIS_REVOCATION_URL', default='redis://localhost:6379/2')},
+}
+
+# Authenticated user cache (see users.authentication): seconds per cache level;
+# STATELESS_READS lets opted-in read-only views trust the token claims instead
+AUTH_USER_CACHE = {
+    'LOCAL_TTL': 5,
+    'SHARED_TTL': 60,
+    'LOCAL_MAX_ENTRIES': 10000,
+    'STATELESS_READS': env.bool('AUTH_STATELESS_READS', default=False),
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -124,3 +184,122 @@ CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default='redis://localhost:
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+
+CELERY_BEAT_SCHEDULE = {
+    'release-expired-stock-reservations': {
+        'task': 'inventory.tasks.release_expired_reservations',
+        'schedule': 60.0,
+    },
+    # Safety net for intake tickets whose drain task was lost
+    'drain-order-intake': {
+        'task': 'orders.tasks.drain_order_intake',
+        'schedule': 30.0,
+    },
+    # Safety net for outbox messages whose relay task was lost, and their retries
+    'relay-outbox': {
+        'task': 'outbox.tasks.relay_outbox',
+        'schedule': 30.0,
+    },
+    'purge-sent-outbox': {
+        'task': 'outbox.tasks.purge_sent_outbox',
+        'schedule': 24 * 60 * 60.0,
+    },
+    'archive-old-orders': {
+        'task': 'orders.tasks.archive_old_orders',
+        'schedule': 24 * 60 * 60.0,
+    },
+}
+
+# Order intake gets its own queue so a backlog cannot delay other tasks
+CELERY_TASK_ROUTES = {
+    'orders.tasks.drain_order_intake': {'queue': 'order-intake'},
+}
+
+# Product listing response cache (see products.cache.VersionedQueryCache)
+PRODUCT_LIST_CACHE = {
+    'TIMEOUT': 300,
+    'STALE_TIMEOUT': 60,
+    'LOCK_TIMEOUT': 10,
+    'WAIT_TIMEOUT': 5,
+}
+
+# Facet buckets (see products.facets.FacetEngine); price ranges map a label to price lookups
+PRODUCT_FACETS = {
+    'PRICE_RANGES': {
+        '0-50': {'gte': 0, 'lte': 50},
+        '51-100': {'gt': 50, 'lte': 100},
+        '101-500': {'gt': 100, 'lte': 500},
+        '500+': {'gt': 500},
+    },
+    'RATING_THRESHOLDS': [1, 2, 3, 4, 5],
+}
+
+# Bulk product import (see products.importers.ProductImporter)
+PRODUCT_IMPORT = {
+    'BATCH_SIZE': 1000,
+    'MAX_REPORTED_ERRORS': 100,
+}
+
+# Serve list/detail GETs of views with a projection_class from .values() rows
+# (see agrosphere.projections); set False to fall back to the serializers
+READ_PROJECTIONS = True
+
+# Stock reservations (see inventory.stock); TTL in seconds
+INVENTORY = {
+    'RESERVATION_TTL': 900,
+    'EXPIRY_BATCH_SIZE': 500,
+}
+
+# Idempotency-Key handling on unsafe endpoints (see agrosphere.idempotency); seconds
+IDEMPOTENCY = {
+    'TTL': 24 * 60 * 60,
+    'LOCK_TIMEOUT': 30,
+    'WAIT_TIMEOUT': 10,
+}
+
+# Order status workflow (see orders.workflow): rows per bulk UPDATE
+ORDER_WORKFLOW = {
+    'BATCH_SIZE': 1000,
+}
+
+# Asynchronous order intake (see orders.intake); ASYNC=False still honours Prefer: respond-async
+ORDER_INTAKE = {
+    'ASYNC': env.bool('ORDER_INTAKE_ASYNC', default=False),
+    'BATCH_SIZE': 50,
+    'MAX_BATCHES': 20,
+    'LINGER': 0.2,
+}
+
+# Hot/cold order storage (see orders.archive): finished orders older than RETENTION_DAYS are archived
+ORDER_ARCHIVE = {
+    'RETENTION_DAYS': 90,
+    'BATCH_SIZE': 1000,
+}
+
+# Daily sales rollups (see analytics.rollups): orders per transaction, longest report range
+ANALYTICS = {
+    'CHUNK_SIZE': 1000,
+    'MAX_RANGE_DAYS': 366,
+}
+
+# Vendor dashboard (see vendors.dashboard): cache lifetimes in seconds, report defaults
+VENDOR_DASHBOARD = {
+    'TIMEOUT': 300,
+    'STALE_TIMEOUT': 60,
+    'DEFAULT_DAYS': 30,
+    'MAX_DAYS': 365,
+    'TOP_PRODUCTS': 5,
+    'LOW_RATING_THRESHOLD': 3.0,
+    'LOW_RATING_MIN_REVIEWS': 3,
+}
+
+# Transactional email outbox (see outbox.relay): batch sizes, lease and retry backoff in seconds
+OUTBOX = {
+    'BATCH_SIZE': 100,
+    'MAX_BATCHES': 10,
+    'LEASE': 300,
+    'MAX_ATTEMPTS': 8,
+    'BACKOFF': 30,
+    'MAX_BACKOFF': 3600,
+    'KEEP_SENT_DAYS': 7,
+}
@@ -15,6 +15,14 @@ DATABASES = {
     }
 }
 
+# Shared cache so invalidation and recomputation locks span all API replicas
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('REDIS_CACHE_URL', default='redis://redis:6379/1'),
+    }
+}
+
 # Security best practices
 SECURE_SSL_REDIRECT = True
 SESSION_COOKIE_SECURE = True
@@ -0,0 +1,31 @@
+import os
+
+os.environ.setdefault('DJANGO_SECRET_KEY', 'insecure-test-key')
+
+from .base import *  # noqa: E402
+
+DEBUG = False
+
+ALLOWED_HOSTS = ['*']
+
+# SQLite keeps the suite self-contained; product search uses the FTS5 backend here
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Per-process stand-in for the Redis revocation store
+TOKEN_REVOCATION = {'BACKEND': 'users.revocation.LocalRevocationStore', 'OPTIONS': {}}
+
+# Rate limits are switched on by the tests that exercise them
+RATE_LIMITS = {**RATE_LIMITS, 'ENABLED': False, 'BACKEND': 'agrosphere.throttling.LocalTokenBuckets', 'OPTIONS': {}}
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+DEFAULT_FROM_EMAIL = 'noreply@agrosphere.test'
+
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
@@ -0,0 +1,175 @@
+"""
+Token-bucket rate limiting shared by all API replicas.
+
+Views name their endpoint class in ``throttle_scope`` (or compute it in
+``get_throttle_scope()``); ``settings.RATE_LIMITS["SCOPES"]`` gives each
+scope a ``(rate, burst)`` pair per identity: ``"user"`` for authenticated
+requests (keyed on the user id) and ``"anon"`` for the rest (keyed on the
+client IP, taken from ``X-Forwarded-For`` only as far as
+``REST_FRAMEWORK["NUM_PROXIES"]`` trusted proxies vouch for it). A bucket holds up to ``burst`` tokens and refills at ``rate``
+(``"120/min"``); each request takes one token, and an empty bucket answers
+``429`` with ``Retry-After`` set to when the next token arrives.
+
+``RedisTokenBuckets`` refills and takes in one Lua script, so the check is
+atomic across replicas and costs a single round trip; the script reads the
+Redis clock, so replica clock skew does not matter. ``LocalTokenBuckets`` is
+the per-process stand-in for tests and development. If Redis is
+unreachable requests are let through rather than failed, and Redis is not
+retried for ``retry_interval`` seconds.
+"""
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "BACKEND": "agrosphere.throttling.RedisTokenBuckets",
+    "OPTIONS": {},
+    "SCOPES": {},
+}
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, wait = 0, 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+def option(name):
+    return getattr(settings, "RATE_LIMITS", {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """
+    ``"120/min"`` -> tokens per second.
+    """
+    count, period = rate.split("/")
+    return int(count) / PERIODS[period]
+
+
+class RedisTokenBuckets:
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, url="redis://localhost:6379/3", prefix="ratelimit", retry_interval=5):
+        import redis
+
+        self.redis = redis
+        self.client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self.down_until = 0.0
+
+    def take(self, key, rate, capacity):
+        """
+        Take a token from bucket ``key``: ``(allowed, seconds until the next
+        token)``.
+        """
+        if self.clock() < self.down_until:
+            return True, 0.0
+        try:
+            allowed, wait = self.script(keys=[f"{self.prefix}:{key}"], args=[rate, capacity])
+        except self.redis.RedisError:
+            # Don't pay a timeout on every request while Redis is down
+            self.down_until = self.clock() + self.retry_interval
+            logger.warning("Rate limiter unavailable, letting requests through", exc_info=True)
+            return True, 0.0
+        return bool(allowed), float(wait)
+
+
+class LocalTokenBuckets:
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def take(self, key, rate, capacity):
+        with self.lock:
+            now = self.clock()
+            tokens, stamp = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - stamp) * rate)
+            if tokens >= 1:
+                self.buckets[key] = (tokens - 1, now)
+                return True, 0.0
+            self.buckets[key] = (tokens, now)
+            return False, (1 - tokens) / rate
+
+
+_buckets = None
+
+
+def get_buckets():
+    global _buckets
+    if _buckets is None:
+        _buckets = import_string(option("BACKEND"))(**option("OPTIONS"))
+    return _buckets
+
+
+@receiver(setting_changed)
+def reset_buckets(setting, **kwargs):
+    global _buckets
+    if setting == "RATE_LIMITS":
+        _buckets = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle requests of views with a ``throttle_scope`` listed in
+    ``RATE_LIMITS["SCOPES"]``; other views are not limited.
+    """
+
+    def get_scope(self, request, view):
+        if hasattr(view, "get_throttle_scope"):
+            return view.get_throttle_scope()
+        return getattr(view, "throttle_scope", None)
+
+    def get_identity(self, request):
+        if request.user and request.user.is_authenticated:
+            return "user", request.user.pk
+        return "anon", self.get_ident(request)
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        if not option("ENABLED"):
+            return True
+        scope = self.get_scope(request, view)
+        kind, identity = self.get_identity(request)
+        limit = option("SCOPES").get(scope, {}).get(kind)
+        if limit is None:
+            return True
+        rate, burst = limit
+        allowed, wait = get_buckets().take(f"{scope}:{kind}:{identity}", parse_rate(rate), burst)
+        if not allowed:
+            self.wait_time = wait
+        return allowed
+
+    def wait(self):
+        # Retry-After is whole seconds; never tell clients to retry immediately
+        return None if self.wait_time is None else max(1, math.ceil(self.wait_time))
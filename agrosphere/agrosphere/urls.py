@@ -9,6 +9,8 @@ urlpatterns = [
     path('api/v1/users/', include('users.urls')),  
     path('api/v1/products/', include('products.urls')),
     path('api/v1/orders/', include('orders.urls')),
+    path('api/v1/analytics/', include('analytics.urls')),
+    path('api/v1/vendors/', include('vendors.urls')),
 
     # API docs
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
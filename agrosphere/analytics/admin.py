@@ -0,0 +1,37 @@
+from django.contrib import admin
+
+from .models import BookedOrder, CategoryDailySales, ProductDailySales, VendorDailySales
+
+
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ("day", "units", "revenue", "orders")
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProductDailySales)
+class ProductDailySalesAdmin(DailySalesAdmin):
+    list_display = ("day", "product", *DailySalesAdmin.list_display[1:])
+    raw_id_fields = ("product",)
+
+
+@admin.register(VendorDailySales)
+class VendorDailySalesAdmin(DailySalesAdmin):
+    list_display = ("day", "vendor", *DailySalesAdmin.list_display[1:])
+    raw_id_fields = ("vendor",)
+
+
+@admin.register(CategoryDailySales)
+class CategoryDailySalesAdmin(DailySalesAdmin):
+    list_display = ("day", "category", *DailySalesAdmin.list_display[1:])
+
+
+@admin.register(BookedOrder)
+class BookedOrderAdmin(admin.ModelAdmin):
+    list_display = ("order", "booked_at")
+    raw_id_fields = ("order",)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from analytics.models import BookedOrder, CategoryDailySales, ProductDailySales, VendorDailySales
+from analytics.rollups import COUNTED_STATUSES, option, sync_orders
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Book historical orders into the daily sales rollups, in order-id chunks of one "
+        "transaction each. Already booked orders are skipped, so it can be stopped and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=None)
+        parser.add_argument("--reset", action="store_true", help="Empty the rollups first and rebuild them.")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"] or option("CHUNK_SIZE", 1000)
+        if options["reset"]:
+            with transaction.atomic():
+                for model in (ProductDailySales, VendorDailySales, CategoryDailySales, BookedOrder):
+                    model.objects.all().delete()
+
+        # Counted orders, plus booked ones whose cancellation may have been missed
+        pending = Order.objects.filter(Q(status__in=COUNTED_STATUSES) | Q(sales_booking__isnull=False))
+        last_id, booked, unbooked, chunks = 0, 0, 0, 0
+        while True:
+            ids = list(pending.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size])
+            if not ids:
+                break
+            added, removed = sync_orders(ids)
+            booked, unbooked, chunks, last_id = booked + added, unbooked + removed, chunks + 1, ids[-1]
+            self.stdout.write(f"chunk {chunks}: orders {ids[0]}-{last_id}, booked {added}, unbooked {removed}")
+        self.stdout.write(self.style.SUCCESS(f"Booked {booked} and unbooked {unbooked} orders in {chunks} chunks."))
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("orders", "0003_user_created_index"),
+        ("products", "0006_hot_path_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookedOrder",
+            fields=[
+                ("order", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="sales_booking", serialize=False, to="orders.order")),
+                ("booked_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CategoryDailySales",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("units", models.BigIntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ("orders", models.IntegerField(default=0)),
+                ("category", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="daily_sales", to="products.category")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("day", "category"), name="category_daily_sales_uniq")],
+            },
+        ),
+        migrations.CreateModel(
+            name="ProductDailySales",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("units", models.BigIntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ("orders", models.IntegerField(default=0)),
+                ("product", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="daily_sales", to="products.product")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("day", "product"), name="product_daily_sales_uniq")],
+            },
+        ),
+        migrations.CreateModel(
+            name="VendorDailySales",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("units", models.BigIntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ("orders", models.IntegerField(default=0)),
+                ("vendor", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="daily_sales", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("day", "vendor"), name="vendor_daily_sales_uniq")],
+            },
+        ),
+    ]
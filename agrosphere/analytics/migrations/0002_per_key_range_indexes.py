@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+        ("products", "0006_hot_path_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="productdailysales",
+            index=models.Index(fields=["product", "day"], name="product_daily_sales_range_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="vendordailysales",
+            index=models.Index(fields=["vendor", "day"], name="vendor_daily_sales_range_idx"),
+        ),
+    ]
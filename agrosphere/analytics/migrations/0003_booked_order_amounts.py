@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:01
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+
+# (dimension, OrderItem lookup), as in analytics.rollups.DIMENSIONS
+DIMENSIONS = [("products", "product"), ("vendors", "product__vendor"), ("categories", "product__category")]
+
+
+def record_booked_amounts(apps, schema_editor):
+    # Existing bookings were made from the items as they are now; the best
+    # record there is of what they added
+    BookedOrder = apps.get_model("analytics", "BookedOrder")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    booked = list(BookedOrder.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(booked), 1000):
+        chunk = booked[start:start + 1000]
+        items = OrderItem.objects.filter(order_id__in=chunk).annotate(day=TruncDate("order__created_at"))
+        amounts = {pk: {} for pk in chunk}
+        for dimension, lookup in DIMENSIONS:
+            rows = (
+                items.filter(**{f"{lookup}__isnull": False})
+                .values("order_id", "day", lookup)
+                .annotate(
+                    units=Sum("quantity"),
+                    revenue=Sum(
+                        F("price_at_purchase") * F("quantity"),
+                        output_field=DecimalField(max_digits=16, decimal_places=2),
+                    ),
+                )
+                .order_by()
+            )
+            for row in rows:
+                amounts[row["order_id"]].setdefault(dimension, []).append(
+                    [row["day"].isoformat(), row[lookup], row["units"], str(row["revenue"])]
+                )
+        BookedOrder.objects.bulk_update(
+            [BookedOrder(pk=pk, amounts=value) for pk, value in amounts.items()], ["amounts"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_per_key_range_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookedorder",
+            name="amounts",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(record_booked_amounts, migrations.RunPython.noop),
+    ]
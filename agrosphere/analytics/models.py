@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import models
+
+
+class DailySales(models.Model):
+    """
+    Units, revenue (``price_at_purchase * quantity``) and distinct orders
+    for one day, keyed by the day the order was placed. Rows are only
+    changed by the signed increments of ``analytics.rollups``.
+    """
+    day = models.DateField()
+    units = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ProductDailySales(DailySales):
+    product = models.ForeignKey("products.Product", related_name="daily_sales", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "product"], name="product_daily_sales_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["product", "day"], name="product_daily_sales_range_idx"),
+        ]
+
+
+class VendorDailySales(DailySales):
+    vendor = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="daily_sales", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "vendor"], name="vendor_daily_sales_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["vendor", "day"], name="vendor_daily_sales_range_idx"),
+        ]
+
+
+class CategoryDailySales(DailySales):
+    category = models.ForeignKey("products.Category", related_name="daily_sales", on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "category"], name="category_daily_sales_uniq"),
+        ]
+
+
+class BookedOrder(models.Model):
+    """
+    An order whose items are currently counted in the rollups. Booking and
+    unbooking are driven by this table rather than by the events that
+    trigger them, so replayed or reordered tasks never count an order twice.
+    """
+    order = models.OneToOneField(
+        "orders.Order", primary_key=True, related_name="sales_booking", on_delete=models.CASCADE
+    )
+    # Per-dimension rows added by booking, see analytics.rollups.booked_amounts
+    amounts = models.JSONField(default=dict)
+    booked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Order {self.order_id}"
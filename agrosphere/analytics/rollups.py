@@ -0,0 +1,165 @@
+"""
+Incremental daily sales rollups.
+
+An order is counted once it reaches one of ``COUNTED_STATUSES``. Booking it
+adds its items to the product, vendor and category rollups of the day it
+was placed and records those amounts on its ``BookedOrder``; when it later
+leaves those statuses (cancelled, refunded) the recorded amounts are
+subtracted again. Both directions are signed ``INSERT ... ON CONFLICT DO
+UPDATE`` increments, so nothing is ever recomputed from ``OrderItem``.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.dispatch import Signal
+
+from orders.models import Order, OrderItem
+
+from .models import BookedOrder, CategoryDailySales, ProductDailySales, VendorDailySales
+
+COUNTED_STATUSES = {"processing", "shipped", "delivered"}
+
+# (rollup model, key column, OrderItem lookup for the key)
+DIMENSIONS = {
+    "products": (ProductDailySales, "product_id", "product"),
+    "vendors": (VendorDailySales, "vendor_id", "product__vendor"),
+    "categories": (CategoryDailySales, "category_id", "product__category"),
+}
+
+# Sent after deltas were posted, with the ``vendor_ids`` whose rollups changed
+rollups_changed = Signal()
+
+# Rows per INSERT; 5 parameters each stays under SQLite's variable limit
+UPSERT_BATCH_SIZE = 150
+
+
+def option(name, default):
+    return getattr(settings, "ANALYTICS", {}).get(name, default)
+
+
+def changes_counted(status, sources):
+    """
+    Whether moving from any of ``sources`` to ``status`` can book or unbook
+    an order.
+    """
+    counted = status in COUNTED_STATUSES
+    return any((source in COUNTED_STATUSES) != counted for source in sources)
+
+
+def booked_amounts(order_ids):
+    """
+    What booking ``order_ids`` adds, per order and dimension:
+    ``{order_id: {dimension: [[day, key, units, revenue], ...]}}``, with the
+    day in ISO format and the revenue as a string. Stored on ``BookedOrder``
+    so unbooking subtracts exactly this, whatever happened to the items,
+    products or categories since.
+    """
+    items = OrderItem.objects.filter(order_id__in=order_ids).annotate(day=TruncDate("order__created_at"))
+    amounts = {pk: {} for pk in order_ids}
+    for dimension, (_, _, lookup) in DIMENSIONS.items():
+        rows = (
+            items.filter(**{f"{lookup}__isnull": False})
+            .values("order_id", "day", lookup)
+            .annotate(
+                units=Sum("quantity"),
+                revenue=Sum(
+                    F("price_at_purchase") * F("quantity"),
+                    output_field=DecimalField(max_digits=16, decimal_places=2),
+                ),
+            )
+            .order_by()
+        )
+        for row in rows:
+            amounts[row["order_id"]].setdefault(dimension, []).append(
+                [row["day"].isoformat(), row[lookup], row["units"], str(row["revenue"])]
+            )
+    return amounts
+
+
+def sales_deltas(bookings, sign):
+    """
+    Yield ``(model, column, rows)`` per dimension, each row a signed
+    ``(day, key, units, revenue, orders)`` delta summing ``bookings`` (values
+    of ``booked_amounts``).
+    """
+    for dimension, (model, column, _) in DIMENSIONS.items():
+        totals = defaultdict(lambda: [0, Decimal("0"), 0])
+        for booking in bookings:
+            for day, key, units, revenue in booking.get(dimension, ()):
+                total = totals[(day, key)]
+                total[0] += units
+                total[1] += Decimal(revenue)
+                total[2] += 1
+        yield model, column, [
+            (date.fromisoformat(day), key, sign * units, sign * revenue, sign * orders)
+            for (day, key), (units, revenue, orders) in sorted(totals.items())
+        ]
+
+
+def apply_deltas(model, column, rows):
+    """
+    Add ``rows`` to ``model``'s counters, inserting missing days.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    counters = ", ".join(f"{name} = {table}.{name} + EXCLUDED.{name}" for name in ("units", "revenue", "orders"))
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        batch = rows[start:start + UPSERT_BATCH_SIZE]
+        values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+        sql = (
+            f"INSERT INTO {table} (day, {qn(column)}, units, revenue, orders) VALUES {values} "
+            f"ON CONFLICT (day, {qn(column)}) DO UPDATE SET {counters}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [value for row in batch for value in row])
+
+
+def post_deltas(bookings, sign):
+    vendor_ids = set()
+    for model, column, rows in sales_deltas(bookings, sign):
+        apply_deltas(model, column, rows)
+        if model is VendorDailySales:
+            vendor_ids.update(row[1] for row in rows)
+    rollups_changed.send(sender=VendorDailySales, vendor_ids=vendor_ids)
+
+
+def sync_orders(order_ids):
+    """
+    Book the orders of ``order_ids`` that are in a counted status and
+    unbook the booked ones that are not any more. Safe to repeat. Returns
+    ``(booked, unbooked)`` counts.
+    """
+    with transaction.atomic():
+        statuses = dict(
+            Order.objects.select_for_update().filter(pk__in=order_ids).order_by("pk").values_list("pk", "status")
+        )
+        booked = set(BookedOrder.objects.filter(order_id__in=statuses).values_list("order_id", flat=True))
+        counted = {pk for pk, status in statuses.items() if status in COUNTED_STATUSES}
+        to_book, to_unbook = sorted(counted - booked), sorted(booked - counted)
+        if to_book:
+            amounts = booked_amounts(to_book)
+            BookedOrder.objects.bulk_create(BookedOrder(order_id=pk, amounts=amounts[pk]) for pk in to_book)
+            post_deltas(amounts.values(), 1)
+        if to_unbook:
+            unbook(to_unbook)
+    return len(to_book), len(to_unbook)
+
+
+def unbook(order_ids):
+    """
+    Subtract the booked orders among ``order_ids`` from the rollups, by the
+    amounts recorded when they were booked.
+    """
+    with transaction.atomic():
+        booked = dict(
+            BookedOrder.objects.select_for_update().filter(order_id__in=order_ids).values_list("order_id", "amounts")
+        )
+        if booked:
+            post_deltas(booked.values(), -1)
+            BookedOrder.objects.filter(order_id__in=booked).delete()
+    return len(booked)
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from .rollups import option
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the sales reports; the range defaults to the last
+    30 days, both ends inclusive.
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=["total", "day"], default="total")
+    ids = serializers.CharField(required=False, help_text="Comma-separated ids to report on.")
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+    def validate_ids(self, value):
+        try:
+            return sorted({int(part) for part in value.split(",") if part.strip()})
+        except ValueError:
+            raise serializers.ValidationError("Expected comma-separated integers.")
+
+    def validate(self, attrs):
+        end = attrs.setdefault("end", timezone.localdate())
+        start = attrs.setdefault("start", end - timedelta(days=29))
+        if start > end:
+            raise serializers.ValidationError({"start": ["Must not be after end."]})
+        max_days = option("MAX_RANGE_DAYS", 366)
+        if (end - start).days >= max_days:
+            raise serializers.ValidationError({"start": [f"Ranges are limited to {max_days} days."]})
+        return attrs
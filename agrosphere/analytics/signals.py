@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from orders.archive import is_archiving
+from orders.models import Order
+from orders.signals import order_status_changed
+
+from . import rollups
+from .tasks import record_order_sales
+
+
+def schedule(order_ids):
+    order_ids = list(order_ids)
+    transaction.on_commit(lambda: record_order_sales.delay(order_ids))
+
+
+@receiver(order_status_changed, sender=Order)
+def record_on_transition(sender, order_ids, status, sources, **kwargs):
+    if rollups.changes_counted(status, sources):
+        schedule(order_ids)
+
+
+@receiver(post_save, sender=Order)
+def record_on_save(sender, instance, created, update_fields=None, **kwargs):
+    # Status saved directly (e.g. from the admin) rather than via orders.workflow;
+    # orders never return to pending, so pending ones are never booked
+    if created or instance.status == "pending":
+        return
+    if update_fields is not None and "status" not in update_fields:
+        return
+    schedule([instance.pk])
+
+
+@receiver(pre_delete, sender=Order)
+def unbook_on_delete(sender, instance, **kwargs):
+    if is_archiving():
+        return  # archived orders still count towards the sales they made
+    # The items cascade with the order, so compensate while they still exist
+    rollups.unbook([instance.pk])
@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from . import rollups
+
+
+@shared_task
+def record_order_sales(order_ids):
+    """
+    Bring the rollups in line with the current status of ``order_ids``,
+    one transaction per chunk.
+    """
+    size = rollups.option("CHUNK_SIZE", 1000)
+    booked = unbooked = 0
+    for start in range(0, len(order_ids), size):
+        added, removed = rollups.sync_orders(order_ids[start:start + size])
+        booked += added
+        unbooked += removed
+    return booked, unbooked
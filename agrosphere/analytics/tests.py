@@ -0,0 +1,153 @@
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.models import Order, OrderItem
+from orders.workflow import transition_orders
+from products.models import Category, Product
+
+from .models import BookedOrder, CategoryDailySales, ProductDailySales, VendorDailySales
+from .tasks import record_order_sales
+
+User = get_user_model()
+
+
+class SalesRollupTests(APITestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(email="grower@example.com", password="pass1234")
+        self.buyer = User.objects.create_user(email="shopper@example.com", password="pass1234")
+        self.category = Category.objects.create(name="Fruit")
+        self.apples = Product.objects.create(title="Apples", price=2, category=self.category, vendor=self.vendor)
+        self.pears = Product.objects.create(title="Pears", price=3, vendor=self.vendor)
+        self.first = self.order(date(2026, 5, 1), (self.apples, 3, 2), (self.pears, 1, 3))
+        self.second = self.order(date(2026, 5, 1), (self.apples, 2, 2))
+
+    def order(self, day, *lines):
+        created = datetime(day.year, day.month, day.day, 12, tzinfo=dt_timezone.utc)
+        order = Order.objects.create(user=self.buyer, created_at=created)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=quantity, price_at_purchase=price)
+            for product, quantity, price in lines
+        )
+        return order
+
+    def transition(self, status, orders):
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders(status, order_ids=[order.pk for order in orders])
+
+    def counters(self, model, **lookup):
+        row = model.objects.get(day=date(2026, 5, 1), **lookup)
+        return row.units, row.revenue, row.orders
+
+    def test_processing_orders_are_added_per_day(self):
+        self.transition("processing", [self.first, self.second])
+        self.assertEqual(self.counters(ProductDailySales, product=self.apples), (5, 10, 2))
+        self.assertEqual(self.counters(ProductDailySales, product=self.pears), (1, 3, 1))
+        self.assertEqual(self.counters(VendorDailySales, vendor=self.vendor), (6, 13, 2))
+        # Pears have no category
+        self.assertEqual(self.counters(CategoryDailySales, category=self.category), (5, 10, 2))
+
+    def test_cancellation_and_refund_post_compensating_deltas(self):
+        self.transition("processing", [self.first, self.second])
+        self.transition("cancelled", [self.second])
+        self.assertEqual(self.counters(VendorDailySales, vendor=self.vendor), (4, 9, 1))
+
+        self.transition("shipped", [self.first])
+        self.transition("delivered", [self.first])
+        self.assertEqual(self.counters(VendorDailySales, vendor=self.vendor), (4, 9, 1))
+        self.transition("refunded", [self.first])
+        self.assertEqual(self.counters(VendorDailySales, vendor=self.vendor), (0, 0, 0))
+        self.assertFalse(BookedOrder.objects.exists())
+
+    def test_unbooking_subtracts_what_was_booked(self):
+        self.transition("processing", [self.second])
+        # Edited behind the workflow's back, then the product changes category
+        OrderItem.objects.filter(order=self.second).update(quantity=5)
+        vegetables = Category.objects.create(name="Vegetables")
+        Product.objects.filter(pk=self.apples.pk).update(category=vegetables)
+
+        self.transition("cancelled", [self.second])
+        self.assertEqual(self.counters(ProductDailySales, product=self.apples), (0, 0, 0))
+        self.assertEqual(self.counters(CategoryDailySales, category=self.category), (0, 0, 0))
+        self.assertFalse(CategoryDailySales.objects.filter(category=vegetables).exists())
+
+    def test_replayed_tasks_do_not_double_count(self):
+        self.transition("processing", [self.first])
+        self.assertEqual(record_order_sales.delay([self.first.pk]).get(), (0, 0))
+        self.assertEqual(self.counters(ProductDailySales, product=self.pears), (1, 3, 1))
+
+    def test_status_saved_directly_is_picked_up(self):
+        self.transition("processing", [self.first])
+        self.first.status = "cancelled"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.save()
+        self.assertEqual(self.counters(ProductDailySales, product=self.pears), (0, 0, 0))
+
+    def test_backfill_books_history_in_chunks(self):
+        # Bypass the workflow so no rollup events fire
+        Order.objects.update(status="delivered")
+        self.order(date(2026, 5, 2), (self.pears, 4, 3))  # still pending
+        out = StringIO()
+        call_command("backfill_sales_rollups", chunk_size=1, stdout=out)
+        self.assertIn("Booked 2 and unbooked 0 orders in 2 chunks.", out.getvalue())
+        self.assertEqual(self.counters(VendorDailySales, vendor=self.vendor), (6, 13, 2))
+
+        call_command("backfill_sales_rollups", stdout=StringIO())
+        self.assertEqual(self.counters(VendorDailySales, vendor=self.vendor), (6, 13, 2))
+        call_command("backfill_sales_rollups", reset=True, stdout=StringIO())
+        self.assertEqual(self.counters(VendorDailySales, vendor=self.vendor), (6, 13, 2))
+
+
+class SalesReportTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(email="analyst@example.com", password="pass1234", is_staff=True)
+        self.client.force_authenticate(user=self.staff)
+        vendor = User.objects.create_user(email="orchard@example.com", password="pass1234")
+        self.apples = Product.objects.create(title="Apples", price=2, vendor=vendor)
+        self.pears = Product.objects.create(title="Pears", price=3, vendor=vendor)
+        ProductDailySales.objects.bulk_create([
+            ProductDailySales(day=date(2026, 5, 1), product=self.apples, units=5, revenue=10, orders=2),
+            ProductDailySales(day=date(2026, 5, 2), product=self.apples, units=1, revenue=2, orders=1),
+            ProductDailySales(day=date(2026, 5, 2), product=self.pears, units=6, revenue=18, orders=3),
+            ProductDailySales(day=date(2026, 5, 3), product=self.pears, units=0, revenue=0, orders=0),
+            ProductDailySales(day=date(2026, 6, 1), product=self.pears, units=9, revenue=27, orders=9),
+        ])
+        self.url = reverse("sales-report", args=["products"])
+        self.range = {"start": "2026-05-01", "end": "2026-05-31"}
+
+    def test_totals_are_ranked_by_revenue(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, self.range)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [
+            {"product_id": self.pears.id, "units": 6, "revenue": "18.00", "orders": 3},
+            {"product_id": self.apples.id, "units": 6, "revenue": "12.00", "orders": 3},
+        ])
+
+    def test_daily_series(self):
+        response = self.client.get(self.url, {**self.range, "interval": "day", "ids": str(self.apples.id)})
+        self.assertEqual(
+            [(row["day"], row["units"]) for row in response.data["results"]],
+            [(date(2026, 5, 1), 5), (date(2026, 5, 2), 1)],
+        )
+
+    def test_daily_series_is_limited(self):
+        response = self.client.get(self.url, {**self.range, "interval": "day", "limit": 2})
+        self.assertEqual(
+            [(row["day"], row["product_id"]) for row in response.data["results"]],
+            [(date(2026, 5, 1), self.apples.id), (date(2026, 5, 2), self.apples.id)],
+        )
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.client.get(self.url, {"start": "2026-06-01", "end": "2026-05-01"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"start": "2020-01-01", "end": "2026-05-01"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("sales-report", args=["regions"])).status_code, 404)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=User.objects.create_user(email="nosy@example.com", password="pass1234"))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
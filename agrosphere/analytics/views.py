@@ -0,0 +1,59 @@
+from django.db.models import Sum
+from django.http import Http404
+from rest_framework import generics, permissions, serializers
+from rest_framework.response import Response
+
+from .rollups import DIMENSIONS
+from .serializers import SalesReportQuerySerializer
+
+REVENUE = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+class SalesReportView(generics.GenericAPIView):
+    """
+    GET: Staff sales report per product, vendor or category, read from the
+    daily rollups only. ``interval=total`` ranks keys by revenue over the
+    range; ``interval=day`` returns one row per key and day. Either way at
+    most ``limit`` rows are returned, so a long daily series needs ``ids``.
+    """
+
+    serializer_class = SalesReportQuerySerializer
+    permission_classes = [permissions.IsAdminUser]
+    # Needs only the user id and flags, which the token claims carry
+    stateless_authentication = True
+
+    def get(self, request, dimension):
+        if dimension not in DIMENSIONS:
+            raise Http404
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        model, column, _ = DIMENSIONS[dimension]
+
+        queryset = model.objects.filter(day__range=(params["start"], params["end"]))
+        if params.get("ids"):
+            queryset = queryset.filter(**{f"{column}__in": params["ids"]})
+        if params["interval"] == "day":
+            keys, ordering = ["day", column], ["day", column]
+        else:
+            keys, ordering = [column], ["-total_revenue", column]
+        rows = (
+            queryset.values(*keys)
+            .annotate(total_units=Sum("units"), total_revenue=Sum("revenue"), total_orders=Sum("orders"))
+            .filter(total_orders__gt=0)  # fully cancelled or refunded
+            .order_by(*ordering)[:params["limit"]]
+        )
+        return Response({
+            "start": params["start"],
+            "end": params["end"],
+            "interval": params["interval"],
+            "results": [
+                {
+                    **{key: row[key] for key in keys},
+                    "units": row["total_units"],
+                    "revenue": REVENUE.to_representation(row["total_revenue"]),
+                    "orders": row["total_orders"],
+                }
+                for row in rows
+            ],
+        })
@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import StockLevel, StockReservation
+
+
+@admin.register(StockLevel)
+class StockLevelAdmin(admin.ModelAdmin):
+    list_display = ("product", "on_hand", "reserved", "updated_at")
+    raw_id_fields = ("product",)
+    readonly_fields = ("reserved",)
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ("order", "product", "quantity", "status", "expires_at")
+    list_filter = ("status",)
+    raw_id_fields = ("order", "product")
@@ -0,0 +1,79 @@
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+
+from inventory.models import StockLevel, StockReservation
+from inventory.stock import InsufficientStock, reserve
+from orders.models import Order
+from products.models import Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Contention benchmark: concurrent buyers reserve one SKU at the same time. "
+        "Reports throughput and oversells, which must be zero. Writes to the configured "
+        "database (use PostgreSQL for meaningful numbers) and cleans up afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=200)
+        parser.add_argument("--stock", type=int, default=50)
+        parser.add_argument("--quantity", type=int, default=1, help="Units each buyer asks for.")
+
+    def handle(self, *args, **options):
+        buyers, on_hand, quantity = options["buyers"], options["stock"], options["quantity"]
+        user = User.objects.create_user(email=f"bench-{uuid.uuid4().hex[:12]}@example.com")
+        product = Product.objects.create(vendor=user, title="Contention benchmark SKU", price=1)
+        StockLevel.objects.create(product=product, on_hand=on_hand)
+
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(buyers)
+
+        def buy():
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    order = Order.objects.create(user=user)
+                    reserve(order, {product.pk: quantity})
+                outcome = "reserved"
+            except InsufficientStock:
+                outcome = "sold out"
+            except DatabaseError as exc:
+                outcome = f"error: {type(exc).__name__}"
+            finally:
+                connection.close()
+            with lock:
+                outcomes[outcome] += 1
+
+        threads = [threading.Thread(target=buy) for _ in range(buyers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        try:
+            level = StockLevel.objects.get(product=product)
+            held = sum(StockReservation.objects.filter(product=product).values_list("quantity", flat=True))
+            oversold = max(0, held - level.on_hand, level.reserved - level.on_hand)
+
+            self.stdout.write(f"vendor: {connection.vendor}, buyers: {buyers}, stock: {on_hand}, quantity: {quantity}")
+            for outcome, count in sorted(outcomes.items()):
+                self.stdout.write(f"  {outcome:<24} {count:>6}")
+            self.stdout.write(f"  {'elapsed':<24} {elapsed * 1000:>9.1f} ms")
+            self.stdout.write(f"  {'throughput':<24} {buyers / elapsed:>9.1f} checkouts/s")
+            self.stdout.write(f"  {'reserved units':<24} {held:>6}")
+            self.stdout.write(f"  {'oversold units':<24} {oversold:>6}")
+        finally:
+            Order.objects.filter(user=user).delete()
+            product.delete()
+            user.delete()
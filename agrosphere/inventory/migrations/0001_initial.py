@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("orders", "0003_user_created_index"),
+        ("products", "0006_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockLevel",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("on_hand", models.PositiveIntegerField(default=0)),
+                ("reserved", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("product", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="stock", to="products.product")),
+            ],
+            options={
+                "constraints": [models.CheckConstraint(condition=models.Q(("reserved__lte", models.F("on_hand"))), name="stock_reserved_lte_on_hand")],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("quantity", models.PositiveIntegerField()),
+                ("status", models.CharField(choices=[("active", "Active"), ("released", "Released"), ("expired", "Expired")], default="active", max_length=20)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("expires_at", models.DateTimeField()),
+                ("order", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="reservations", to="orders.order")),
+                ("product", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="reservations", to="products.product")),
+            ],
+            options={
+                "indexes": [models.Index(condition=models.Q(("status", "active")), fields=["expires_at"], name="reservation_active_expiry_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="stockreservation",
+            name="status",
+            field=models.CharField(choices=[("active", "Active"), ("committed", "Committed"), ("released", "Released"), ("expired", "Expired")], default="active", max_length=20),
+        ),
+    ]
@@ -0,0 +1,56 @@
+from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+class StockLevel(models.Model):
+    """
+    Stock for one product. ``reserved`` counts units held by open orders;
+    both columns only ever change through conditional UPDATEs in
+    ``inventory.stock``. Products without a row are not stock-managed.
+    """
+    product = models.OneToOneField("products.Product", related_name="stock", on_delete=models.CASCADE)
+    on_hand = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(reserved__lte=F("on_hand")), name="stock_reserved_lte_on_hand"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.available} available"
+
+    @property
+    def available(self):
+        return self.on_hand - self.reserved
+
+
+class StockReservation(models.Model):
+    ACTIVE = "active"
+    COMMITTED = "committed"
+    RELEASED = "released"
+    EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (ACTIVE, "Active"),
+        (COMMITTED, "Committed"),
+        (RELEASED, "Released"),
+        (EXPIRED, "Expired"),
+    ]
+
+    order = models.ForeignKey("orders.Order", related_name="reservations", on_delete=models.CASCADE)
+    product = models.ForeignKey("products.Product", related_name="reservations", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=ACTIVE)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # The expiry sweep only looks at active reservations
+            models.Index(fields=["expires_at"], condition=Q(status="active"), name="reservation_active_expiry_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for order {self.order_id} ({self.status})"
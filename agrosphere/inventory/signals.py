@@ -0,0 +1,47 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from orders.archive import is_archiving
+from orders.models import Order
+from orders.signals import order_status_changed, orders_archived
+
+from . import stock
+from .models import StockReservation
+
+# Order statuses that no longer hold stock
+RELEASING_STATUSES = {"cancelled", "refunded"}
+# Reserved units leave the warehouse when an order ships
+SHIPPING_STATUSES = {"shipped"}
+
+
+@receiver(order_status_changed, sender=Order)
+def settle_on_transition(sender, order_ids, status, **kwargs):
+    reservations = StockReservation.objects.filter(order_id__in=order_ids)
+    if status in RELEASING_STATUSES:
+        stock.release(reservations)
+    elif status in SHIPPING_STATUSES:
+        stock.commit(reservations)
+
+
+@receiver(post_save, sender=Order)
+def release_on_cancel(sender, instance, created, update_fields=None, **kwargs):
+    # Status saved directly (e.g. from the admin) rather than via orders.workflow
+    if created or instance.status not in RELEASING_STATUSES:
+        return
+    if update_fields is not None and "status" not in update_fields:
+        return
+    stock.release_order(instance.pk)
+
+
+@receiver(pre_delete, sender=Order)
+def release_on_delete(sender, instance, **kwargs):
+    if is_archiving():
+        return  # handled per batch by release_on_archive
+    # Reservations cascade with the order; hand their stock back first
+    stock.release_order(instance.pk)
+
+
+@receiver(orders_archived, sender=Order)
+def release_on_archive(sender, order_ids, **kwargs):
+    # Finished orders rarely still hold stock, but never let it cascade away
+    stock.release(StockReservation.objects.filter(order_id__in=order_ids))
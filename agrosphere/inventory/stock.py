@@ -0,0 +1,178 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from orders.models import Order
+from orders.workflow import transition_orders
+
+from .models import StockLevel, StockReservation
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when a reservation cannot be taken; ``shortages`` maps each
+    short product id to the quantity that was still available.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock for products {sorted(shortages)}")
+
+
+def option(name, default):
+    return getattr(settings, "INVENTORY", {}).get(name, default)
+
+
+def per_product(quantities):
+    """
+    ``{product_id: quantity}`` -> ``Case`` picking each row's quantity.
+    """
+    return Case(
+        *(When(product_id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def lock_stock(product_ids):
+    """
+    Lock the stock rows of ``product_ids`` in product-id order, so concurrent
+    checkouts over overlapping carts always queue in the same order instead
+    of deadlocking. Returns ``{product_id: available}`` for the products that
+    are stock-managed.
+    """
+    rows = (
+        StockLevel.objects.select_for_update()
+        .filter(product_id__in=product_ids)
+        .order_by("product_id")
+        .values_list("product_id", "on_hand", "reserved")
+    )
+    return {product_id: on_hand - reserved for product_id, on_hand, reserved in rows}
+
+
+def reserve(order, quantities, ttl=None):
+    """
+    Hold ``quantities`` (``{product_id: quantity}``) for ``order``.
+
+    The rows are locked in id order, then one conditional UPDATE bumps
+    ``reserved`` only where ``on_hand - reserved`` still covers the request,
+    so stock is never read and written back. If any line is short, nothing
+    is reserved and ``InsufficientStock`` is raised. Products without a
+    stock row are not limited.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return []
+    with transaction.atomic():
+        available = lock_stock(quantities)
+        tracked = {product_id: quantities[product_id] for product_id in available}
+        if not tracked:
+            return []
+        wanted = per_product(tracked)
+        updated = StockLevel.objects.filter(
+            product_id__in=tracked, on_hand__gte=F("reserved") + wanted
+        ).update(reserved=F("reserved") + wanted)
+        if updated != len(tracked):
+            shortages = {
+                product_id: available[product_id]
+                for product_id in tracked
+                if available[product_id] < tracked[product_id]
+            }
+            # Without row locks (SQLite) a concurrent checkout can win after
+            # the snapshot; then every line is suspect. Raising out of the
+            # atomic block rolls back the lines that did fit.
+            raise InsufficientStock(shortages or available)
+        expires_at = timezone.now() + timedelta(seconds=ttl or option("RESERVATION_TTL", 900))
+        return StockReservation.objects.bulk_create(
+            StockReservation(order=order, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in tracked.items()
+        )
+
+
+def release(reservations, status=StockReservation.RELEASED):
+    """
+    Give the stock held by the active reservations in ``reservations`` back
+    and mark them ``status``. Returns the number of reservations released.
+    """
+    return settle(reservations, status)
+
+
+def commit(reservations):
+    """
+    Turn the active reservations in ``reservations`` into shipped stock:
+    the held units leave both ``reserved`` and ``on_hand``.
+    """
+    return settle(reservations, StockReservation.COMMITTED, ship=True)
+
+
+def settle(reservations, status, ship=False):
+    """
+    Close the active reservations in ``reservations`` as ``status``, taking
+    their units off ``reserved`` (and off ``on_hand`` too when ``ship``).
+    """
+    with transaction.atomic():
+        rows = list(
+            reservations.select_for_update()
+            .filter(status=StockReservation.ACTIVE)
+            .order_by("pk")
+            .values_list("pk", "product_id", "quantity")
+        )
+        if not rows:
+            return 0
+        held = defaultdict(int)
+        for _, product_id, quantity in rows:
+            held[product_id] += quantity
+        lock_stock(held)
+        updates = {"reserved": F("reserved") - per_product(held)}
+        if ship:
+            updates["on_hand"] = F("on_hand") - per_product(held)
+        StockLevel.objects.filter(product_id__in=held).update(**updates)
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(status=status)
+    return len(rows)
+
+
+def release_order(order_id):
+    return release(StockReservation.objects.filter(order_id=order_id))
+
+
+def rereserve_order(order, quantities):
+    """
+    Replace an order's active reservations with ``quantities`` after its
+    items changed, atomically.
+    """
+    with transaction.atomic():
+        release_order(order.pk)
+        return reserve(order, quantities)
+
+
+def release_expired(batch_size=None):
+    """
+    Expire one batch of active reservations past their expiry and cancel
+    their orders. Only orders still ``pending`` lose their hold: once an
+    order has moved on, its reservations stay until it ships or is
+    cancelled. Returns the number of reservations expired.
+    """
+    batch_size = batch_size or option("EXPIRY_BATCH_SIZE", 500)
+    with transaction.atomic():
+        expired = list(
+            StockReservation.objects.filter(
+                status=StockReservation.ACTIVE, expires_at__lte=timezone.now(), order__status="pending"
+            ).order_by("expires_at").values_list("pk", "order_id")[:batch_size]
+        )
+        # Lock the orders so none is confirmed while its stock is handed back
+        pending = set(
+            Order.objects.select_for_update()
+            .filter(pk__in={order_id for _, order_id in expired}, status="pending")
+            .values_list("pk", flat=True)
+        )
+        released = release(
+            StockReservation.objects.filter(pk__in=[pk for pk, order_id in expired if order_id in pending]),
+            status=StockReservation.EXPIRED,
+        )
+        if pending:
+            transition_orders("cancelled", order_ids=pending, from_status="pending")
+    return released
@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from . import stock
+
+
+@shared_task
+def release_expired_reservations(batch_size=None):
+    """
+    Return stock held by expired reservations, one batch per transaction.
+    """
+    batch_size = batch_size or stock.option("EXPIRY_BATCH_SIZE", 500)
+    total = 0
+    while True:
+        released = stock.release_expired(batch_size)
+        total += released
+        if released < batch_size:
+            return total
@@ -0,0 +1,155 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.models import Order
+from orders.workflow import transition_order, transition_orders
+from products.models import Product
+
+from . import stock
+from .models import StockLevel, StockReservation
+from .tasks import release_expired_reservations
+
+User = get_user_model()
+
+
+class StockReservationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="stock@example.com", password="pass1234")
+        self.apples = Product.objects.create(title="Apples", price=2, vendor=self.user)
+        self.pears = Product.objects.create(title="Pears", price=3, vendor=self.user)
+        StockLevel.objects.create(product=self.apples, on_hand=5)
+        StockLevel.objects.create(product=self.pears, on_hand=2)
+        self.order = Order.objects.create(user=self.user)
+
+    def levels(self):
+        return dict(StockLevel.objects.values_list("product_id", "reserved"))
+
+    def test_reserve_holds_stock(self):
+        reservations = stock.reserve(self.order, {self.apples.id: 3, self.pears.id: 2})
+        self.assertEqual(len(reservations), 2)
+        self.assertEqual(self.levels(), {self.apples.id: 3, self.pears.id: 2})
+
+    def test_short_line_reserves_nothing(self):
+        with self.assertRaises(stock.InsufficientStock) as raised:
+            stock.reserve(self.order, {self.apples.id: 3, self.pears.id: 5})
+        self.assertEqual(raised.exception.shortages, {self.pears.id: 2})
+        self.assertEqual(self.levels(), {self.apples.id: 0, self.pears.id: 0})
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_products_without_stock_rows_are_not_limited(self):
+        untracked = Product.objects.create(title="Water", price=1, vendor=self.user)
+        self.assertEqual(stock.reserve(self.order, {untracked.id: 1000}), [])
+
+    def test_release_returns_stock_once(self):
+        stock.reserve(self.order, {self.apples.id: 4})
+        self.assertEqual(stock.release_order(self.order.id), 1)
+        self.assertEqual(stock.release_order(self.order.id), 0)
+        self.assertEqual(self.levels()[self.apples.id], 0)
+
+    def test_cancelling_or_deleting_an_order_releases_stock(self):
+        stock.reserve(self.order, {self.apples.id: 4})
+        self.order.status = "cancelled"
+        self.order.save()
+        self.assertEqual(self.levels()[self.apples.id], 0)
+
+        other = Order.objects.create(user=self.user)
+        stock.reserve(other, {self.pears.id: 2})
+        other.delete()
+        self.assertEqual(self.levels()[self.pears.id], 0)
+
+    def expire(self, order):
+        StockReservation.objects.filter(order=order).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_expiry_task_releases_only_expired_reservations(self):
+        later = Order.objects.create(user=self.user)
+        stock.reserve(self.order, {self.apples.id: 1})
+        stock.reserve(later, {self.pears.id: 1}, ttl=60)
+        self.expire(self.order)
+
+        self.assertEqual(release_expired_reservations.delay(batch_size=1).get(), 1)
+        self.assertEqual(self.levels(), {self.apples.id: 0, self.pears.id: 1})
+        self.assertEqual(StockReservation.objects.get(product=self.apples).status, StockReservation.EXPIRED)
+        # The order can no longer be fulfilled
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "cancelled")
+
+    def test_confirmed_orders_keep_their_reservations(self):
+        stock.reserve(self.order, {self.apples.id: 2})
+        transition_order(self.order, "processing")
+        self.expire(self.order)
+
+        self.assertEqual(stock.release_expired(), 0)
+        transition_order(self.order, "shipped")
+        level = StockLevel.objects.get(product=self.apples)
+        self.assertEqual((level.on_hand, level.reserved), (3, 0))
+
+
+class OrderWorkflowStockTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="warehouse@example.com", password="pass1234")
+        self.product = Product.objects.create(title="Boxed seeds", price=4, vendor=self.user)
+        StockLevel.objects.create(product=self.product, on_hand=10)
+        self.orders = [Order.objects.create(user=self.user) for _ in range(3)]
+        for order in self.orders:
+            stock.reserve(order, {self.product.id: 2})
+
+    def test_shipping_commits_and_cancelling_releases(self):
+        first, second, third = self.orders
+        transition_orders("processing", order_ids=[first.pk, second.pk])
+        transition_orders("shipped", from_status="processing")
+        transition_order(third, "cancelled")
+
+        level = StockLevel.objects.get()
+        self.assertEqual((level.on_hand, level.reserved), (6, 0))
+        self.assertEqual(
+            sorted(StockReservation.objects.values_list("status", flat=True)),
+            ["committed", "committed", "released"],
+        )
+
+
+class CheckoutStockTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="checkout@example.com", password="pass1234")
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(title="Flash sale seeds", price=4, vendor=self.user)
+        StockLevel.objects.create(product=self.product, on_hand=3)
+        self.url = reverse("order-list-create")
+
+    def order(self, quantity):
+        return self.client.post(self.url, {"items": [{"product_id": self.product.id, "quantity": quantity}]}, format="json")
+
+    def test_checkout_cannot_oversell(self):
+        self.assertEqual(self.order(2).status_code, status.HTTP_201_CREATED)
+        response = self.order(2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["items"][0]["quantity"], ["Only 1 left in stock."])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(StockLevel.objects.get().reserved, 2)
+
+    def test_editing_items_adjusts_the_reservation(self):
+        order_id = self.order(1).data["id"]
+        url = reverse("order-detail", args=[order_id])
+        payload = {"items": [{"product_id": self.product.id, "quantity": 3}]}
+        self.assertEqual(self.client.patch(url, payload, format="json").status_code, status.HTTP_200_OK)
+        self.assertEqual(StockLevel.objects.get().reserved, 3)
+
+        payload["items"][0]["quantity"] = 4
+        self.assertEqual(self.client.patch(url, payload, format="json").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(StockLevel.objects.get().reserved, 3)
+
+    def test_items_are_frozen_once_the_order_leaves_pending(self):
+        order = Order.objects.get(pk=self.order(1).data["id"])
+        transition_order(order, "processing")
+        url = reverse("order-detail", args=[order.id])
+        payload = {"items": [{"product_id": self.product.id, "quantity": 3}]}
+        response = self.client.patch(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("items", response.data)
+        self.assertEqual(StockLevel.objects.get().reserved, 1)
+        # Addresses may still change
+        self.assertEqual(self.client.patch(url, {"shipping_address": "Farm 9"}, format="json").status_code, 200)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import ArchivedOrder, Order, OrderIntakeTicket, OrderItem
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -12,3 +12,16 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')
     search_fields = ('user__email',)
     inlines = [OrderItemInline]
+
+@admin.register(OrderIntakeTicket)
+class OrderIntakeTicketAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'order', 'created_at', 'processed_at')
+    list_filter = ('status',)
+    raw_id_fields = ('user', 'order')
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'total_price', 'created_at', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
@@ -0,0 +1,152 @@
+"""
+Hot/cold order storage.
+
+``Order``/``OrderItem`` are the hot tables. Orders that finished
+(``ARCHIVABLE_STATUSES``) and were neither created nor changed in the last
+``RETENTION_DAYS`` are moved, in batches, to ``ArchivedOrder`` with their line items inlined, and deleted
+from the hot tables, which therefore stay roughly the size of the
+retention window. On PostgreSQL the archive is partitioned by month of
+``created_at``; partitions are created on demand before each batch.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order, OrderItem
+from .signals import orders_archived
+
+ARCHIVABLE_STATUSES = {'delivered', 'cancelled', 'refunded'}
+
+DEFAULTS = {
+    'RETENTION_DAYS': 90,
+    'BATCH_SIZE': 1000,
+}
+
+_archiving = ContextVar('archiving_orders', default=False)
+
+
+def option(name):
+    return getattr(settings, 'ORDER_ARCHIVE', {}).get(name, DEFAULTS[name])
+
+
+def is_archiving():
+    """
+    True while orders are being deleted because they moved to the archive,
+    for delete receivers that must not treat it as the order disappearing.
+    """
+    return _archiving.get()
+
+
+@contextmanager
+def archiving():
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def ensure_partitions(months):
+    """
+    Create the monthly archive partitions for ``months`` (first days of
+    month) on PostgreSQL; a no-op elsewhere.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    table = ArchivedOrder._meta.db_table
+    with connection.cursor() as cursor:
+        for month in sorted(set(months)):
+            partition = f'{table}_p{month:%Y%m}'
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition)} '
+                f'PARTITION OF {connection.ops.quote_name(table)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month.isoformat(), next_month(month).isoformat()],
+            )
+
+
+def archivable_orders(cutoff):
+    """
+    Finished orders last changed before ``cutoff``. An old order that was
+    delivered, cancelled or refunded recently stays in the hot tables for
+    the retention window like any other.
+    """
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff, updated_at__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to ``batch_size`` orders that finished before ``cutoff`` to the
+    archive in one transaction. Returns the number moved.
+    """
+    with transaction.atomic():
+        orders = list(archivable_orders(cutoff).select_for_update(skip_locked=True).order_by('pk')[:batch_size])
+        if not orders:
+            return 0
+        ids = [order.pk for order in orders]
+        items = {pk: [] for pk in ids}
+        rows = (
+            OrderItem.objects.filter(order_id__in=ids)
+            .order_by('pk')
+            .values_list('order_id', 'id', 'product_id', 'product__title', 'quantity', 'price_at_purchase')
+        )
+        for order_id, item_id, product_id, title, quantity, price in rows:
+            items[order_id].append({
+                'id': item_id,
+                'product_id': product_id,
+                'title': title,
+                'quantity': quantity,
+                'price_at_purchase': str(price),
+            })
+
+        # Partition bounds are read in the connection's time zone (UTC)
+        ensure_partitions(month_start(order.created_at.astimezone(dt_timezone.utc)) for order in orders)
+        ArchivedOrder.objects.bulk_create(
+            [
+                ArchivedOrder(
+                    id=order.pk,
+                    user_id=order.user_id,
+                    status=order.status,
+                    total_price=order.total_price,
+                    shipping_address=order.shipping_address,
+                    billing_address=order.billing_address,
+                    items=items[order.pk],
+                    created_at=order.created_at,
+                    updated_at=order.updated_at,
+                )
+                for order in orders
+            ],
+            ignore_conflicts=True,
+        )
+        orders_archived.send(sender=Order, order_ids=ids)
+        with archiving():
+            Order.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(retention_days=None, batch_size=None):
+    """
+    Archive every finished order older than the retention horizon, one
+    batch per transaction. Returns the number of orders moved.
+    """
+    retention_days = option('RETENTION_DAYS') if retention_days is None else retention_days
+    batch_size = batch_size or option('BATCH_SIZE')
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+
+from outbox.relay import email, enqueue
+
+from .models import Order
+
+User = get_user_model()
+
+
+def queue_confirmations(orders):
+    """
+    Queue a confirmation email per order in the current transaction; the
+    outbox relay sends them once it commits. Owners not already loaded on
+    the orders are fetched in one query.
+    """
+    missing = {order.user_id for order in orders if not Order.user.is_cached(order)}
+    addresses = dict(User.objects.filter(pk__in=missing).values_list('pk', 'email')) if missing else {}
+    for order in orders:
+        if Order.user.is_cached(order):
+            addresses[order.user_id] = order.user.email
+    enqueue(*[
+        email(
+            f'orders:confirmation:{order.pk}',
+            f"Order #{order.pk} received",
+            f"Thanks for your order #{order.pk}. Total: {order.total_price}.",
+            [addresses[order.user_id]],
+        )
+        for order in orders
+    ])
+
+
+def queue_status_notifications(order_ids, status):
+    """
+    Queue an email per order telling its owner about the new ``status``,
+    in the transaction that made the change; recipients are loaded with a
+    single query.
+    """
+    label = dict(Order.STATUS_CHOICES).get(status, status)
+    enqueue(*[
+        email(
+            f'orders:status:{order_id}:{status}',
+            f"Order #{order_id} is now {label.lower()}",
+            f"Your order #{order_id} status changed to {label}.",
+            [address],
+        )
+        for order_id, address in Order.objects.filter(pk__in=order_ids).values_list('pk', 'user__email')
+    ])
@@ -0,0 +1,143 @@
+"""
+Asynchronous order intake.
+
+With ``ORDER_INTAKE['ASYNC']`` on (or a ``Prefer: respond-async`` request
+header) the order API only checks the payload's shape, stores it as an
+``OrderIntakeTicket`` and answers ``202 Accepted``. Workers drain queued
+tickets in micro-batches: products are resolved for the whole batch in one
+query, orders and items are inserted with ``bulk_create``, and each order's
+stock is reserved in its own savepoint so one short cart only fails its own
+ticket.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.stock import InsufficientStock, reserve
+
+from .emails import queue_confirmations
+from .models import Order, OrderIntakeTicket, OrderItem, Product
+from .serializers import item_quantities, stock_error
+from .signals import orders_placed
+from .tasks import drain_order_intake
+
+DEFAULTS = {
+    'ASYNC': False,
+    'BATCH_SIZE': 50,      # tickets per transaction
+    'MAX_BATCHES': 20,     # batches per drain task before it hands over
+    'LINGER': 0.2,         # seconds a drain waits so tickets can accumulate
+}
+
+DRAIN_SCHEDULED_KEY = 'orders:intake:drain-scheduled'
+
+
+def option(name):
+    return getattr(settings, 'ORDER_INTAKE', {}).get(name, DEFAULTS[name])
+
+
+def wants_async(request):
+    return option('ASYNC') or 'respond-async' in request.headers.get('Prefer', '')
+
+
+def schedule_drain():
+    """
+    Queue a drain after commit unless one is already waiting, so a burst of
+    tickets is picked up by one task in batches instead of one task each.
+    """
+    if cache.add(DRAIN_SCHEDULED_KEY, True, timeout=60):
+        transaction.on_commit(lambda: drain_order_intake.apply_async(countdown=option('LINGER')))
+
+
+def drain(batch_size=None, max_batches=None):
+    """
+    Process queued tickets, oldest first, until none are left or
+    ``max_batches`` batches ran. Returns the number of tickets processed.
+    """
+    cache.delete(DRAIN_SCHEDULED_KEY)
+    batch_size = batch_size or option('BATCH_SIZE')
+    max_batches = max_batches or option('MAX_BATCHES')
+    processed = 0
+    for _ in range(max_batches):
+        count = process_batch(batch_size)
+        processed += count
+        if count < batch_size:
+            return processed
+    # Still more to do: let another task continue
+    schedule_drain()
+    return processed
+
+
+def process_batch(batch_size):
+    """
+    Claim up to ``batch_size`` queued tickets and settle them in one
+    transaction. Row locks with SKIP LOCKED keep concurrent workers on
+    disjoint tickets; a crashed worker's batch simply rolls back to queued.
+    """
+    with transaction.atomic():
+        tickets = list(
+            OrderIntakeTicket.objects.select_for_update(skip_locked=True)
+            .filter(status=OrderIntakeTicket.QUEUED)
+            .order_by('created_at')[:batch_size]
+        )
+        if tickets:
+            create_orders(tickets)
+    return len(tickets)
+
+
+def create_orders(tickets):
+    product_ids = {item['product_id'] for ticket in tickets for item in ticket.payload['items']}
+    products = Product.objects.filter(available=True, pk__in=product_ids).in_bulk()
+
+    planned = []
+    for ticket in tickets:
+        items = ticket.payload['items']
+        errors = [
+            {} if item['product_id'] in products
+            else {'product_id': [f'Invalid pk "{item["product_id"]}" - object does not exist.']}
+            for item in items
+        ]
+        if any(errors):
+            ticket.status, ticket.errors = OrderIntakeTicket.FAILED, {'items': errors}
+            continue
+        items_data = [{'product': products[item['product_id']], 'quantity': item['quantity']} for item in items]
+        order_items = [
+            OrderItem(product=data['product'], quantity=data['quantity'], price_at_purchase=data['product'].price)
+            for data in items_data
+        ]
+        order = Order(
+            user_id=ticket.user_id,
+            shipping_address=ticket.payload.get('shipping_address', ''),
+            billing_address=ticket.payload.get('billing_address', ''),
+            total_price=sum((item.total_price() for item in order_items), Decimal('0')),
+        )
+        planned.append((ticket, order, items_data, order_items))
+
+    Order.objects.bulk_create([order for _, order, _, _ in planned])
+    created_items, rejected = [], []
+    for ticket, order, items_data, order_items in planned:
+        try:
+            reserve(order, item_quantities(items_data))
+        except InsufficientStock as exc:
+            ticket.status, ticket.errors = OrderIntakeTicket.FAILED, stock_error(items_data, exc).detail
+            rejected.append(order.pk)
+            continue
+        for item in order_items:
+            item.order = order
+        created_items += order_items
+        ticket.status, ticket.order = OrderIntakeTicket.CREATED, order
+
+    if rejected:
+        Order.objects.filter(pk__in=rejected).delete()
+    OrderItem.objects.bulk_create(created_items)
+    now = timezone.now()
+    for ticket in tickets:
+        ticket.processed_at = now
+    OrderIntakeTicket.objects.bulk_update(tickets, ['status', 'order', 'errors', 'processed_at'])
+
+    orders = [ticket.order for ticket in tickets if ticket.status == OrderIntakeTicket.CREATED]
+    if orders:
+        orders_placed.send(sender=Order, order_ids=[order.pk for order in orders])
+        queue_confirmations(orders)
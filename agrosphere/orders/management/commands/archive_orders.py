@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.archive import archivable_orders, archive_batch, option
+
+
+class Command(BaseCommand):
+    help = (
+        "Move delivered, cancelled and refunded orders older than the retention horizon "
+        "to the order archive, one transaction per batch. Safe to stop and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Retention horizon in days.")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--dry-run", action="store_true", help="Only count the orders to archive.")
+
+    def handle(self, *args, **options):
+        days = option("RETENTION_DAYS") if options["days"] is None else options["days"]
+        batch_size = options["batch_size"] or option("BATCH_SIZE")
+        cutoff = timezone.now() - timedelta(days=days)
+        if options["dry_run"]:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} orders finished before {cutoff:%Y-%m-%d %H:%M} would be archived.")
+            return
+
+        total, batches = 0, 0
+        while True:
+            moved = archive_batch(cutoff, batch_size)
+            if moved:
+                total, batches = total + moved, batches + 1
+                self.stdout.write(f"batch {batches}: archived {moved} orders")
+            if moved < batch_size:
+                break
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} orders in {batches} batches."))
@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from agrosphere.benchmark import BenchmarkResult, measure, report
+from inventory.models import StockLevel
+from orders import intake
+from products.models import Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare synchronous order creation with the asynchronous intake: the request "
+        "path (202 + ticket) and the worker's micro-batched drain. Runs in a rolled-back "
+        "transaction; use PostgreSQL for meaningful numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=200, help="Orders per timed run.")
+        parser.add_argument("--items", type=int, default=3, help="Line items per order.")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        count, repeat = options["orders"], options["repeat"]
+        with transaction.atomic():
+            client = APIClient()
+            client.force_authenticate(user=User.objects.create_user(email="bench-intake@example.com"))
+            vendor = User.objects.create_user(email="bench-intake-vendor@example.com")
+            products = Product.objects.bulk_create(
+                Product(vendor=vendor, title=f"Intake benchmark {i}", slug=f"bench-intake-product-{i}", price=i + 1)
+                for i in range(options["items"])
+            )
+            StockLevel.objects.bulk_create(StockLevel(product=product, on_hand=10 ** 9) for product in products)
+            payload = {
+                "shipping_address": "1 Benchmark Road",
+                "items": [{"product_id": product.pk, "quantity": 1} for product in products],
+            }
+            url = reverse("order-list-create")
+
+            def submit(**headers):
+                for _ in range(count):
+                    response = client.post(url, payload, format="json", **headers)
+                    assert response.status_code in (201, 202), response.content
+
+            def accept():
+                # Hold the drain: only the request path is timed here
+                cache.add(intake.DRAIN_SCHEDULED_KEY, True)
+                submit(HTTP_PREFER="respond-async")
+
+            results = [
+                measure("sync POST", submit, repeat=repeat, operations=count),
+                measure("async POST (202 + ticket)", accept, repeat=repeat, operations=count),
+            ]
+            intake.drain(options["batch_size"], max_batches=10 ** 6)  # clear the warm-up tickets
+
+            drained = BenchmarkResult(name="async drain (worker)", operations=count)
+            for _ in range(repeat):
+                accept()
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    intake.drain(options["batch_size"], max_batches=10 ** 6)
+                    drained.timings.append(time.perf_counter() - start)
+                drained.queries = len(queries)
+            results.append(drained)
+            cache.delete(intake.DRAIN_SCHEDULED_KEY)
+
+            report(self.stdout, results, baseline=results[0])
+            sync, accepted = results[0], results[1]
+            self.stdout.write(
+                f"orders/s: sync {count / sync.median:.0f}, async accept {count / accepted.median:.0f}, "
+                f"async end-to-end {count / (accepted.median + drained.median):.0f}"
+            )
+            transaction.set_rollback(True)
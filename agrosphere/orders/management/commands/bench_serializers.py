@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from agrosphere.benchmark import measure, report
+from orders.models import Order, OrderItem
+from orders.projections import OrderProjection
+from orders.serializers import OrderSerializer
+from products.models import Category, Product
+from products.projections import ProductProjection
+from products.serializers import ProductSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare per-row serialization cost of the serializers and the .values() projections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="Products per page / orders per page.")
+        parser.add_argument("--items", type=int, default=5, help="Line items per order.")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        with transaction.atomic():
+            self.seed(rows, options["items"])
+            renderer = JSONRenderer()
+
+            products = Product.objects.select_related("category", "vendor").order_by("pk")
+            product_projection = ProductProjection()
+            product_results = [
+                measure("ProductSerializer", lambda: renderer.render(ProductSerializer(products, many=True).data),
+                        repeat=repeat, operations=rows),
+                measure("ProductProjection", lambda: renderer.render(
+                    product_projection.render(list(product_projection.values(products)))),
+                    repeat=repeat, operations=rows),
+            ]
+            report(self.stdout, product_results, baseline=product_results[0])
+
+            orders = Order.objects.prefetch_related("items__product__category", "items__product__vendor")
+            order_projection = OrderProjection()
+            order_results = [
+                measure("OrderSerializer", lambda: renderer.render(OrderSerializer(orders, many=True).data),
+                        repeat=repeat, operations=rows),
+                measure("OrderProjection", lambda: renderer.render(
+                    order_projection.render(list(order_projection.values(orders)))),
+                    repeat=repeat, operations=rows),
+            ]
+            report(self.stdout, order_results, baseline=order_results[0])
+            transaction.set_rollback(True)
+
+    def seed(self, rows, items):
+        vendor = User.objects.create_user(email="bench-serializer@example.com")
+        category = Category.objects.create(name="Bench serializers")
+        products = Product.objects.bulk_create(
+            Product(
+                vendor=vendor,
+                category=category,
+                title=f"Bench product {i}",
+                slug=f"bench-serializer-product-{i}",
+                description="A reasonably long product description. " * 10,
+                price=Decimal(i) + Decimal("0.99"),
+            )
+            for i in range(rows)
+        )
+        orders = Order.objects.bulk_create(Order(user=vendor, shipping_address="Bench") for _ in range(rows))
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=products[(n + i) % rows], quantity=i + 1, price_at_purchase=products[i].price)
+            for n, order in enumerate(orders)
+            for i in range(items)
+        )
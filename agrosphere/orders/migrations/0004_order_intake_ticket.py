@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:32
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_user_created_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderIntakeTicket",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("payload", models.JSONField()),
+                ("status", models.CharField(choices=[("queued", "Queued"), ("created", "Created"), ("failed", "Failed")], default="queued", max_length=20)),
+                ("errors", models.JSONField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+                ("order", models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="intake_ticket", to="orders.order")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="order_tickets", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "indexes": [models.Index(condition=models.Q(("status", "queued")), fields=["created_at"], name="intake_queued_created_idx")],
+            },
+        ),
+    ]
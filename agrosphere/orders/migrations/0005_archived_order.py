@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# PostgreSQL: declarative range partitioning by month of created_at. The
+# partition key must be part of the primary key; monthly partitions are
+# created on demand by orders.archive.ensure_partitions, with the default
+# partition catching anything outside them.
+POSTGRES_FORWARD = [
+    """
+    CREATE TABLE orders_archivedorder (
+        id bigint NOT NULL,
+        user_id bigint NOT NULL REFERENCES users_user (id) DEFERRABLE INITIALLY DEFERRED,
+        status varchar(20) NOT NULL,
+        total_price numeric(12, 2) NOT NULL,
+        shipping_address text NOT NULL,
+        billing_address text NOT NULL,
+        items jsonb NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        updated_at timestamp with time zone NOT NULL,
+        archived_at timestamp with time zone NOT NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    """,
+    "CREATE TABLE orders_archivedorder_default PARTITION OF orders_archivedorder DEFAULT;",
+    "CREATE INDEX archived_user_created_idx ON orders_archivedorder (user_id, created_at DESC, id DESC);",
+    "CREATE INDEX archived_created_idx ON orders_archivedorder (created_at DESC, id DESC);",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TABLE IF EXISTS orders_archivedorder CASCADE;",
+]
+
+
+def create_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for statement in POSTGRES_FORWARD:
+            schema_editor.execute(statement)
+    else:
+        schema_editor.create_model(apps.get_model("orders", "ArchivedOrder"))
+
+
+def drop_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for statement in POSTGRES_BACKWARD:
+            schema_editor.execute(statement)
+    else:
+        schema_editor.delete_model(apps.get_model("orders", "ArchivedOrder"))
+
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_intake_ticket"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="ArchivedOrder",
+                    fields=[
+                        ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                        ("status", models.CharField(choices=[("pending", "Pending"), ("processing", "Processing"), ("shipped", "Shipped"), ("delivered", "Delivered"), ("cancelled", "Cancelled"), ("refunded", "Refunded")], max_length=20)),
+                        ("total_price", models.DecimalField(decimal_places=2, max_digits=12)),
+                        ("shipping_address", models.TextField(blank=True)),
+                        ("billing_address", models.TextField(blank=True)),
+                        ("items", models.JSONField(default=list)),
+                        ("created_at", models.DateTimeField()),
+                        ("updated_at", models.DateTimeField()),
+                        ("archived_at", models.DateTimeField(default=django.utils.timezone.now)),
+                        ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="archived_orders", to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        "ordering": ["-created_at", "-id"],
+                        "indexes": [models.Index(fields=["user", "-created_at", "-id"], name="archived_user_created_idx"), models.Index(fields=["-created_at", "-id"], name="archived_created_idx")],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0005_archived_order"),
+        ("products", "0006_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(fields=["product", "order"], name="orderitem_product_order_idx"),
+        ),
+    ]
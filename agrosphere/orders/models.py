@@ -1,4 +1,9 @@
+import uuid
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
 from products.models import Product
@@ -15,6 +20,16 @@ class Order(models.Model):
         ('refunded', 'Refunded'),
     ]
 
+    # Allowed status changes; see orders.workflow
+    TRANSITIONS = {
+        'pending': {'processing', 'cancelled'},
+        'processing': {'shipped', 'cancelled'},
+        'shipped': {'delivered'},
+        'delivered': {'refunded'},
+        'cancelled': set(),
+        'refunded': set(),
+    }
+
     user = models.ForeignKey(User, related_name='orders', on_delete=models.CASCADE)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -23,13 +38,37 @@ class Order(models.Model):
     shipping_address = models.TextField(blank=True)  # Could be a FK to an Address model
     billing_address = models.TextField(blank=True)   # Ditto
 
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),  # keyset pagination
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} by {self.user.email} - {self.status}"
 
-    def update_total_price(self):
-        total = sum(item.total_price() for item in self.items.all())
-        self.total_price = total
-        self.save(update_fields=['total_price'])
+    def can_transition_to(self, status):
+        return status in self.TRANSITIONS.get(self.status, ())
+
+    @classmethod
+    def sources_for(cls, status):
+        """
+        Statuses an order may move to ``status`` from.
+        """
+        return {source for source, targets in cls.TRANSITIONS.items() if status in targets}
+
+    def update_total_price(self, save=True):
+        # One SUM(price_at_purchase * quantity) in the database
+        self.total_price = self.items.order_by().aggregate(
+            total=Coalesce(
+                Sum(F('price_at_purchase') * F('quantity'), output_field=self._meta.get_field('total_price')),
+                Value(Decimal('0')),
+                output_field=self._meta.get_field('total_price'),
+            )
+        )['total']
+        if save:
+            self.save(update_fields=['total_price', 'updated_at'])
 
 
 class OrderItem(models.Model):
@@ -38,8 +77,80 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     price_at_purchase = models.DecimalField(max_digits=10, decimal_places=2)  # snapshot of price at order time
 
+    class Meta:
+        indexes = [
+            # A vendor's lines by product, with their orders (vendors.dashboard)
+            models.Index(fields=['product', 'order'], name='orderitem_product_order_idx'),
+        ]
+
     def total_price(self):
         return self.price_at_purchase * self.quantity
 
     def __str__(self):
         return f"{self.quantity} x {self.product.title}"
+
+
+class OrderIntakeTicket(models.Model):
+    """
+    An order accepted by the asynchronous intake (see orders.intake): the
+    validated payload waits here until a worker creates the order from it.
+    """
+    QUEUED = 'queued'
+    CREATED = 'created'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (CREATED, 'Created'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, related_name='order_tickets', on_delete=models.CASCADE)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    order = models.OneToOneField(
+        Order, null=True, blank=True, related_name='intake_ticket', on_delete=models.SET_NULL
+    )
+    errors = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers only ever scan the queued tickets, oldest first
+            models.Index(fields=['created_at'], condition=Q(status='queued'), name='intake_queued_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Ticket {self.id} - {self.status}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Cold storage for finished orders past the retention horizon (see
+    orders.archive). Line items are kept inline as JSON, so archived orders
+    no longer touch ``OrderItem``. On PostgreSQL the table is range
+    partitioned by ``created_at`` with one partition per month and its
+    primary key is ``(id, created_at)``; elsewhere it is a plain table.
+    """
+    # The original order id
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, related_name='archived_orders', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2)
+    shipping_address = models.TextField(blank=True)
+    billing_address = models.TextField(blank=True)
+    items = models.JSONField(default=list)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='archived_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='archived_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id} - {self.status}"
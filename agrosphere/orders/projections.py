@@ -0,0 +1,27 @@
+from agrosphere.projections import Projection
+
+from .serializers import OrderItemSerializer, OrderSerializer
+
+
+def item_total(row, prefix):
+    return row[prefix + "price_at_purchase"] * row[prefix + "quantity"]
+
+
+class OrderItemProjection(Projection):
+    """
+    ``OrderItemSerializer`` output built from a ``.values()`` row, joined
+    through to category and vendor when the product is expanded.
+    """
+    serializer_class = OrderItemSerializer
+    string_fields = {"product__vendor": "product__vendor__email"}
+    method_fields = {"total_price": (("price_at_purchase", "quantity"), item_total)}
+
+
+class OrderProjection(Projection):
+    """
+    ``OrderSerializer`` output; line items are fetched for the whole page in
+    one extra query.
+    """
+    serializer_class = OrderSerializer
+    string_fields = {"user": "user__email"}
+    children = {"items": (OrderItemProjection, "order_id")}
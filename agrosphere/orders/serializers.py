@@ -1,30 +1,54 @@
+from decimal import Decimal
+
+from django.db import transaction
 from rest_framework import serializers
-from .models import Order, OrderItem, Product
+from agrosphere.fieldsets import SparseFieldsetMixin
+from inventory.stock import InsufficientStock, reserve, rereserve_order
+from .emails import queue_confirmations
+from .models import ArchivedOrder, Order, OrderIntakeTicket, OrderItem, Product
+from .signals import orders_placed
 from products.serializers import ProductSerializer
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(),
-    )
+PENDING_ONLY_MESSAGE = "Items can only be changed while the order is pending."
+
+
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # Resolved for all items at once by OrderSerializer.validate_items
+    product_id = serializers.IntegerField()
     total_price = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'product_id', 'quantity', 'price_at_purchase', 'total_price']
+        fields = ['id', 'product_id', 'quantity', 'price_at_purchase', 'total_price']
         read_only_fields = ['id', 'price_at_purchase', 'total_price']
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # Delay import to avoid circular imports
-        from products.models import Product
-        self.fields['product_id'].queryset = Product.objects.filter(available=True)
+        # The full product is only embedded with ?expand=items.product
+        expandable_fields = {'product': (ProductSerializer, {'read_only': True})}
+        field_dependencies = {'total_price': ['price_at_purchase', 'quantity']}
 
     def get_total_price(self, obj):
         return obj.total_price()
 
 
-class OrderSerializer(serializers.ModelSerializer):
+def item_quantities(items_data):
+    quantities = {}
+    for item_data in items_data:
+        product_id = item_data['product'].pk
+        quantities[product_id] = quantities.get(product_id, 0) + item_data.get('quantity', 1)
+    return quantities
+
+
+def stock_error(items_data, exc):
+    """
+    Turn ``InsufficientStock`` into per-item validation errors.
+    """
+    return serializers.ValidationError({'items': [
+        {'quantity': [f"Only {exc.shortages[item_data['product'].pk]} left in stock."]}
+        if item_data['product'].pk in exc.shortages else {}
+        for item_data in items_data
+    ]})
+
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
     total_price = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     status = serializers.CharField(read_only=True)
@@ -35,48 +59,194 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'items', 'total_price', 'status', 'shipping_address', 'billing_address', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'total_price', 'status', 'created_at', 'updated_at']
 
+    def validate_items(self, items):
+        """
+        Resolve every ``product_id`` with one query and attach the product
+        to its item as ``product``.
+        """
+        ids = {item['product_id'] for item in items}
+        products = (
+            Product.objects.filter(available=True, pk__in=ids)
+            .select_related('category', 'vendor')
+            .in_bulk()
+        )
+        errors = [
+            {} if item['product_id'] in products
+            else {'product_id': [f'Invalid pk "{item["product_id"]}" - object does not exist.']}
+            for item in items
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for item in items:
+            item['product'] = products[item.pop('product_id')]
+        return items
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        user = self.context['request'].user
-
-        order = Order.objects.create(user=user, **validated_data)
-
-        for item_data in items_data:
-            product = item_data['product']
-            quantity = item_data.get('quantity', 1)
-
-            # Take a snapshot of price at purchase time
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price_at_purchase=product.price
+        # The view passes user= to save(); fall back to the requesting user
+        validated_data.setdefault('user', self.context['request'].user)
+
+        # Take a snapshot of price at purchase time
+        items = [
+            OrderItem(
+                product=item_data['product'],
+                quantity=item_data.get('quantity', 1),
+                price_at_purchase=item_data['product'].price,
             )
-
-        order.update_total_price()
+            for item_data in items_data
+        ]
+        total = sum((item.total_price() for item in items), Decimal('0'))
+
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(total_price=total, **validated_data)
+                reserve(order, item_quantities(items_data))
+                for item in items:
+                    item.order = order
+                OrderItem.objects.bulk_create(items)
+                orders_placed.send(sender=Order, order_ids=[order.pk])
+                queue_confirmations([order])
+        except InsufficientStock as exc:
+            raise stock_error(items_data, exc)
+
+        # Serve the response from memory instead of re-reading the items
+        prefetched = order.items.all()
+        prefetched._result_cache = items
+        prefetched._prefetch_done = True
+        order._prefetched_objects_cache = {'items': prefetched}
         return order
 
+    def validate(self, attrs):
+        # Stock is only re-reserved while the order can still be cancelled or expire
+        if self.instance is not None and 'items' in attrs and self.instance.status != 'pending':
+            raise serializers.ValidationError({'items': [PENDING_ONLY_MESSAGE]})
+        return attrs
+
     def update(self, instance, validated_data):
         # Disallow status and total_price updates here; status changes via separate workflow
         items_data = validated_data.pop('items', None)
-        if items_data:
-            instance.items.all().delete()  # simple approach; or do smarter diff update
-
-            for item_data in items_data:
-                product = item_data['product']
-                quantity = item_data.get('quantity', 1)
-
-                OrderItem.objects.create(
-                    order=instance,
-                    product=product,
-                    quantity=quantity,
-                    price_at_purchase=product.price
-                )
 
         # Update addresses if provided
         instance.shipping_address = validated_data.get('shipping_address', instance.shipping_address)
         instance.billing_address = validated_data.get('billing_address', instance.billing_address)
 
-        instance.save()
-        instance.update_total_price()
+        try:
+            with transaction.atomic():
+                if items_data:
+                    # Re-checked under the row lock in case the order was confirmed meanwhile
+                    if not Order.objects.select_for_update().filter(pk=instance.pk, status='pending').exists():
+                        raise serializers.ValidationError({'items': [PENDING_ONLY_MESSAGE]})
+                    rereserve_order(instance, item_quantities(items_data))
+                    self.sync_items(instance, items_data)
+                    instance.update_total_price(save=False)
+                instance.save()
+        except InsufficientStock as exc:
+            raise stock_error(items_data, exc)
         return instance
+
+    def sync_items(self, order, items_data):
+        """
+        Apply ``items_data`` to ``order`` as a diff keyed by product: changed
+        quantities are bulk-updated, new products bulk-inserted at the current
+        price and missing ones bulk-deleted. Existing lines keep their
+        ``price_at_purchase`` snapshot and primary key. Repeated products in
+        the payload are merged into one line.
+        """
+        wanted = {}
+        for item_data in items_data:
+            product = item_data['product']
+            quantity = item_data.get('quantity', 1)
+            if product.pk in wanted:
+                wanted[product.pk] = (product, wanted[product.pk][1] + quantity)
+            else:
+                wanted[product.pk] = (product, quantity)
+
+        kept, changed, removed = [], [], []
+        for item in order.items.all():
+            if item.product_id not in wanted:
+                removed.append(item.pk)
+                continue
+            _, quantity = wanted.pop(item.product_id)
+            if item.quantity != quantity:
+                item.quantity = quantity
+                changed.append(item)
+            kept.append(item)
+        added = [
+            OrderItem(order=order, product=product, quantity=quantity, price_at_purchase=product.price)
+            for product, quantity in wanted.values()
+        ]
+
+        if removed:
+            OrderItem.objects.filter(pk__in=removed).delete()
+        if changed:
+            OrderItem.objects.bulk_update(changed, ['quantity'])
+        if added:
+            OrderItem.objects.bulk_create(added)
+
+        # Keep the prefetched items in step for the response
+        items = order.items.all()
+        items._result_cache = sorted(kept, key=lambda item: item.pk) + added
+        items._prefetch_done = True
+        order._prefetched_objects_cache = {**getattr(order, '_prefetched_objects_cache', {}), 'items': items}
+
+
+class OrderStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+class BulkOrderTransitionSerializer(serializers.Serializer):
+    """
+    Move either the listed ``order_ids`` or every order in ``from_status``.
+    """
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=100_000
+    )
+    from_status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if 'order_ids' not in attrs and 'from_status' not in attrs:
+            raise serializers.ValidationError('Provide order_ids or from_status.')
+        return attrs
+
+
+class OrderIntakeItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class OrderIntakeSerializer(serializers.Serializer):
+    """
+    Shape-only validation for the asynchronous intake: products, prices
+    and stock are checked by the worker (see orders.intake).
+    """
+    items = OrderIntakeItemSerializer(many=True, allow_empty=False, max_length=500)
+    shipping_address = serializers.CharField(required=False, allow_blank=True, default='')
+    billing_address = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def create(self, validated_data):
+        user = validated_data.pop('user')
+        return OrderIntakeTicket.objects.create(user=user, payload=validated_data)
+
+
+class OrderIntakeTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderIntakeTicket
+        fields = ['id', 'status', 'order', 'errors', 'created_at', 'processed_at']
+        read_only_fields = fields
+
+
+class ArchivedOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Read-only representation of an archived order; ``items`` are the line
+    items as stored at archival (product id and title, quantity, price).
+    """
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            'id', 'user', 'items', 'total_price', 'status', 'shipping_address', 'billing_address',
+            'created_at', 'updated_at', 'archived_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,15 @@
+from django.dispatch import Signal
+
+# Sent inside the transaction that changed the orders, with ``order_ids``,
+# ``status`` (the new status) and ``sources`` (the statuses they left).
+order_status_changed = Signal()
+
+# Sent inside the transaction that created the orders, with ``order_ids``,
+# once their items exist.
+orders_placed = Signal()
+
+# Sent inside the archiving transaction with the ``order_ids`` moved to the
+# archive, just before they are deleted from the hot tables. Per-order
+# delete receivers should skip these (see orders.archive.is_archiving) and
+# handle the whole batch here instead.
+orders_archived = Signal()
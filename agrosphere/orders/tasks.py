@@ -1,6 +1,21 @@
 from celery import shared_task
 
+
+@shared_task
+def drain_order_intake(batch_size=None, max_batches=None):
+    """
+    Create orders from queued intake tickets in micro-batches.
+    """
+    from .intake import drain  # orders.intake queues this task
+
+    return drain(batch_size, max_batches)
+
+
 @shared_task
-def send_order_confirmation_email(order_id):
-    # code to send email
-    pass
+def archive_old_orders(retention_days=None, batch_size=None):
+    """
+    Move finished orders past the retention horizon to the archive.
+    """
+    from .archive import archive_orders
+
+    return archive_orders(retention_days, batch_size)
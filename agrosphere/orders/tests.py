@@ -1,9 +1,34 @@
+import hashlib
+import threading
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from agrosphere.queryplans import QueryPlanCapture
+from analytics.models import VendorDailySales
+from inventory.models import StockLevel
+from outbox.models import OutboxMessage
 from products.models import Product, Category
-from .models import Order
+from . import intake
+from .archive import archive_orders
+from .models import ArchivedOrder, Order, OrderIntakeTicket, OrderItem
+from .projections import OrderProjection
+from .serializers import OrderSerializer
+from .workflow import transition_orders
+from .tasks import archive_old_orders, drain_order_intake
 
 User = get_user_model()
 
@@ -47,3 +72,637 @@ class OrderTests(APITestCase):
 
         response = self.client.put(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OrderProjectionContractTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='projection-buyer@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Seeds")
+        self.seeds = Product.objects.create(title="Seeds", price="4.99", category=category, vendor=self.user)
+        self.hoe = Product.objects.create(title="Hoe", price=15, vendor=self.user)
+        self.order = Order.objects.create(user=self.user, shipping_address="Farm 1")
+        OrderItem.objects.create(order=self.order, product=self.seeds, quantity=3, price_at_purchase="4.99")
+        OrderItem.objects.create(order=self.order, product=self.hoe, quantity=1, price_at_purchase=15)
+        Order.objects.create(user=self.user)  # no items
+
+    def test_projection_matches_serializer_bytes(self):
+        queryset = Order.objects.prefetch_related('items__product__category', 'items__product__vendor')
+        expected = JSONRenderer().render(OrderSerializer(queryset, many=True).data)
+        projection = OrderProjection()
+        actual = JSONRenderer().render(projection.render(list(projection.values(queryset))))
+        self.assertEqual(actual, expected)
+
+    def test_endpoints_match_serializer_path(self):
+        for url in [reverse('order-list-create'), reverse('order-detail', args=[self.order.pk])]:
+            fast = self.client.get(url)
+            with override_settings(READ_PROJECTIONS=False):
+                slow = self.client.get(url)
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content, url)
+
+    def test_list_query_count_is_independent_of_item_count(self):
+        # The order page and one query for all items; unconditional GETs
+        # read their validators off the page
+        with self.assertNumQueries(2):
+            self.client.get(reverse('order-list-create'))
+
+
+class OrderConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='poller@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(title="Polled Seeds", price=5, vendor=self.user)
+        self.order = Order.objects.create(user=self.user, shipping_address="Farm 1")
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price_at_purchase=5)
+        self.detail_url = reverse('order-detail', args=[self.order.id])
+        self.list_url = reverse('order-list-create')
+
+    def test_detail_not_modified_until_order_changes(self):
+        response = self.client.get(self.detail_url)
+        etag = response['ETag']
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.order.shipping_address = "Farm 2"
+        self.order.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_changes_with_items(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        payload = {'items': [{'product_id': self.product.id, 'quantity': 3}]}
+        self.assertEqual(self.client.patch(self.detail_url, payload, format='json').status_code, 200)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_expanded_products_are_not_validated(self):
+        # Embedded products change independently of the order
+        response = self.client.get(self.detail_url + '?expand=items.product')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+
+    def test_conditional_list_reads_only_orders(self):
+        etag = self.client.get(self.list_url)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(context), 1)
+        self.assertNotIn('orders_orderitem', context.captured_queries[0]['sql'])
+
+    def test_list_not_modified_until_an_order_is_added(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # A different page or filter is a different representation
+        self.assertEqual(self.client.get(self.list_url + '?page_size=1', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        Order.objects.create(user=self.user, shipping_address="Farm 3")
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_validators_do_not_leak_other_users_orders(self):
+        other = User.objects.create_user(email='other-poller@example.com', password='pass1234')
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+
+
+class OrderQueryPlanTests(APITestCase):
+    tables = {'orders_order', 'orders_orderitem', 'products_product'}
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='plan-buyer@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        product = Product.objects.create(title="Planned Seeds", price=3, vendor=self.user)
+        self.order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=self.order, product=product, quantity=1, price_at_purchase=3)
+
+    def assertNoSequentialScans(self, url):
+        with QueryPlanCapture(connection) as capture:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(capture.scans(self.tables), {})
+
+    def test_user_order_list(self):
+        self.assertNoSequentialScans(reverse('order-list-create'))
+
+    def test_order_detail(self):
+        self.assertNoSequentialScans(reverse('order-detail', args=[self.order.id]))
+
+
+class OrderCreationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='cart@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Tools")
+        self.products = [
+            Product.objects.create(title=f"Tool {i}", price=i + 1, category=category, vendor=self.user)
+            for i in range(100)
+        ]
+        StockLevel.objects.bulk_create(StockLevel(product=product, on_hand=1000) for product in self.products)
+        self.url = reverse('order-list-create')
+
+    def payload(self, count):
+        return {
+            'shipping_address': "1 Field Road",
+            'items': [{'product_id': product.id, 'quantity': 2} for product in self.products[:count]],
+        }
+
+    def test_create_order_snapshots_prices_and_total(self):
+        response = self.client.post(self.url + '?expand=items.product', self.payload(3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # 2 x (1 + 2 + 3)
+        self.assertEqual(response.data['total_price'], '12.00')
+        self.assertEqual([item['product']['title'] for item in response.data['items']], ["Tool 0", "Tool 1", "Tool 2"])
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.total_price, 12)
+        self.assertEqual(order.items.count(), 3)
+
+    def test_query_budget_is_independent_of_cart_size(self):
+        budgets = []
+        for count in (1, 10, 100):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, self.payload(count), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data['items']), count)
+            budgets.append(len(queries))
+        # product lookup, savepoint, order insert, stock reservation (savepoint,
+        # lock, conditional update, reservation insert, release), item insert,
+        # confirmation email insert, release
+        self.assertEqual(budgets, [11, 11, 11])
+
+    def test_unknown_or_unavailable_product_is_rejected(self):
+        self.products[1].available = False
+        self.products[1].save()
+        payload = self.payload(2)
+        payload['items'].append({'product_id': 999999, 'quantity': 1})
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data['items']
+        self.assertEqual(errors[0], {})
+        self.assertIn('product_id', errors[1])
+        self.assertIn('product_id', errors[2])
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderUpdateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='editor@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        self.products = [
+            Product.objects.create(title=f"Crate {i}", price=10, vendor=self.user) for i in range(60)
+        ]
+        StockLevel.objects.bulk_create(StockLevel(product=product, on_hand=1000) for product in self.products)
+        self.order = Order.objects.create(user=self.user, shipping_address="Old")
+        self.items = OrderItem.objects.bulk_create(
+            OrderItem(order=self.order, product=product, quantity=1, price_at_purchase=product.price)
+            for product in self.products[:3]
+        )
+        self.order.update_total_price()
+        self.url = reverse('order-detail', args=[self.order.id])
+
+    def test_update_total_price_sums_in_database(self):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 30)
+
+    def test_patch_diffs_items_and_keeps_price_snapshots(self):
+        # Repricing must not touch lines that stay in the order
+        Product.objects.filter(pk__in=[p.pk for p in self.products]).update(price=25)
+        payload = {'items': [
+            {'product_id': self.products[0].id, 'quantity': 1},
+            {'product_id': self.products[1].id, 'quantity': 4},
+            {'product_id': self.products[3].id, 'quantity': 2},
+        ]}
+        response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        items = {item.product_id: item for item in self.order.items.all()}
+        self.assertEqual(set(items), {self.products[0].id, self.products[1].id, self.products[3].id})
+        self.assertEqual(items[self.products[0].id].pk, self.items[0].pk)
+        self.assertEqual(items[self.products[1].id].pk, self.items[1].pk)
+        self.assertEqual(items[self.products[1].id].quantity, 4)
+        self.assertEqual(items[self.products[1].id].price_at_purchase, 10)
+        self.assertEqual(items[self.products[3].id].price_at_purchase, 25)
+        # 1 x 10 + 4 x 10 + 2 x 25
+        self.assertEqual(response.data['total_price'], '100.00')
+        self.assertEqual(len(response.data['items']), 3)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 100)
+
+    def test_patch_without_items_leaves_them_alone(self):
+        response = self.client.patch(self.url, {'shipping_address': "New"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.order.items.count(), 3)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.shipping_address, "New")
+
+    def test_query_count_is_independent_of_item_count(self):
+        def patch(products):
+            payload = {'items': [{'product_id': p.id, 'quantity': 3} for p in products]}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(self.url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        # order, items, products, payload products, savepoint, delete,
+        # update, insert, SUM, order update, release
+        # order, items, products, payload products, the locked status check,
+        # the stock re-reservation (release + lock/update/insert, with
+        # savepoints), the item delete/update/insert, SUM and order update
+        self.assertLessEqual(patch(self.products[1:5]), 23)
+        self.assertLessEqual(patch(self.products[3:60]), 23)
+
+
+class OrderIdempotencyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='retry@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(title="Retried Seeds", price=7, vendor=self.user)
+        self.url = reverse('order-list-create')
+        self.payload = {'items': [{'product_id': self.product.id, 'quantity': 1}]}
+
+    def post(self, key, payload=None):
+        return self.client.post(self.url, payload or self.payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def cache_key(self, key):
+        scope = f"{self.user.pk}:POST:{self.url}:{key}"
+        return "idempotency:" + hashlib.sha256(scope.encode()).hexdigest()
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post('checkout-1')
+        retry = self.post('checkout-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_requests_without_a_key_are_not_deduplicated(self):
+        self.client.post(self.url, self.payload, format='json')
+        self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_with_another_payload_is_rejected(self):
+        self.post('checkout-2')
+        response = self.post('checkout-2', {'items': [{'product_id': self.product.id, 'quantity': 3}]})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        self.post('shared-key')
+        other = User.objects.create_user(email='retry-other@example.com', password='pass1234')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.post('shared-key').status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_claim_is_released_when_the_view_raises(self):
+        with mock.patch.object(OrderSerializer, 'create', side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self.post('checkout-4')
+        self.assertIsNone(cache.get(self.cache_key('checkout-4')))
+        self.assertEqual(self.post('checkout-4').status_code, status.HTTP_201_CREATED)
+
+    def test_concurrent_duplicate_waits_for_the_first_request(self):
+        first = self.post('checkout-3')
+        cache_key = self.cache_key('checkout-3')
+        stored = cache.get(cache_key)
+        # Pretend the first request is still running, then let it finish
+        cache.set(cache_key, {'fingerprint': stored['fingerprint']})
+        timer = threading.Timer(0.1, cache.set, (cache_key, stored))
+        timer.start()
+        retry = self.post('checkout-3')
+        timer.join()
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY={'WAIT_TIMEOUT': 0.1})
+    def test_duplicate_gives_up_with_conflict(self):
+        self.post('checkout-4')
+        cache_key = self.cache_key('checkout-4')
+        cache.set(cache_key, {'fingerprint': cache.get(cache_key)['fingerprint']})
+        self.assertEqual(self.post('checkout-4').status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+@override_settings(ORDER_WORKFLOW={'BATCH_SIZE': 10})
+class OrderWorkflowTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(email='flow-buyer@example.com', password='pass1234')
+        self.staff = User.objects.create_user(email='fulfilment@example.com', password='pass1234', is_staff=True)
+        self.order = Order.objects.create(user=self.buyer)
+
+    def test_transition_table(self):
+        self.assertTrue(self.order.can_transition_to('processing'))
+        self.assertFalse(self.order.can_transition_to('shipped'))
+        self.assertEqual(Order.sources_for('cancelled'), {'pending', 'processing'})
+
+    def test_owner_can_cancel_a_pending_order(self):
+        self.client.force_authenticate(user=self.buyer)
+        url = reverse('order-status', args=[self.order.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'status': 'cancelled'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': self.order.id, 'status': 'cancelled'})
+        notices = [message for message in mail.outbox if message.subject.startswith('Order')]
+        self.assertEqual([(message.subject, message.to) for message in notices], [
+            (f"Order #{self.order.id} is now cancelled", ['flow-buyer@example.com']),
+        ])
+
+    def test_owner_cannot_advance_an_order(self):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post(reverse('order-status', args=[self.order.id]), {'status': 'processing'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_transition_is_rejected(self):
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.post(reverse('order-status', args=[self.order.id]), {'status': 'shipped'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+
+    def test_bulk_transition_by_status_runs_one_update_per_batch(self):
+        Order.objects.bulk_create(Order(user=self.buyer, status='processing') for _ in range(25))
+        self.client.force_authenticate(user=self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('order-transitions'), {'status': 'shipped', 'from_status': 'processing'}, format='json'
+                )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'status': 'shipped', 'updated': 25})
+        self.assertEqual(Order.objects.filter(status='shipped').count(), 25)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'pending')
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "orders_order"')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(len([message for message in mail.outbox if message.subject.startswith('Order')]), 25)
+
+    def test_bulk_transition_by_ids_skips_ineligible_orders(self):
+        processing = Order.objects.bulk_create(Order(user=self.buyer, status='processing') for _ in range(3))
+        self.client.force_authenticate(user=self.staff)
+        ids = [order.pk for order in processing] + [self.order.pk]
+        response = self.client.post(reverse('order-transitions'), {'status': 'shipped', 'order_ids': ids}, format='json')
+        self.assertEqual(response.data, {'status': 'shipped', 'updated': 3, 'skipped': 1})
+
+    def test_status_emails_roll_back_with_the_transition(self):
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort), transaction.atomic():
+            transition_orders('processing', order_ids=[self.order.pk])
+            self.assertTrue(OutboxMessage.objects.filter(key=f'orders:status:{self.order.pk}:processing').exists())
+            raise Abort
+        self.assertFalse(OutboxMessage.objects.filter(key__startswith='orders:status:').exists())
+
+    def test_bulk_transition_requires_staff(self):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.post(reverse('order-transitions'), {'status': 'shipped', 'from_status': 'processing'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_order_creation_queues_a_confirmation_email(self):
+        product = Product.objects.create(title="Mailed Seeds", price=1, vendor=self.staff)
+        self.client.force_authenticate(user=self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('order-list-create'), {'items': [{'product_id': product.id, 'quantity': 1}]}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The outbox relay also delivers the welcome emails of setUp's users
+        self.assertIn(f"Order #{response.data['id']} received", [message.subject for message in mail.outbox])
+
+
+class OrderSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='sparse@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name="Bulbs")
+        self.product = Product.objects.create(
+            title="Tulips", price=3, category=category, vendor=self.user, description="A very long description"
+        )
+        self.order = Order.objects.create(user=self.user, shipping_address="Farm 1")
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=4, price_at_purchase=3)
+        self.list_url = reverse('order-list-create')
+        self.detail_url = reverse('order-detail', args=[self.order.pk])
+
+    def test_products_are_only_embedded_when_expanded(self):
+        item = self.client.get(self.detail_url).data['items'][0]
+        self.assertEqual(item['product_id'], self.product.pk)
+        self.assertNotIn('product', item)
+
+        item = self.client.get(self.detail_url + '?expand=items.product').data['items'][0]
+        self.assertEqual(item['product']['title'], "Tulips")
+        self.assertEqual(item['product']['category']['name'], "Bulbs")
+
+    def test_fields_prune_nested_serializers(self):
+        response = self.client.get(self.list_url + '?fields=id,items.quantity,items.product.title')
+        self.assertEqual(response.data['results'], [
+            {'id': self.order.pk, 'items': [{'quantity': 4, 'product': {'title': "Tulips"}}]},
+        ])
+
+    def test_shapes_match_serializer_path(self):
+        for query in ['?fields=id,status', '?fields=items.total_price', '?expand=items.product',
+                      '?fields=id,items.product.category.slug']:
+            fast = self.client.get(self.list_url + query)
+            with override_settings(READ_PROJECTIONS=False):
+                slow = self.client.get(self.list_url + query)
+            self.assertEqual(fast.content, slow.content, query)
+
+    def test_unrequested_relations_are_not_queried(self):
+        for projections in (True, False):
+            with override_settings(READ_PROJECTIONS=projections), CaptureQueriesContext(connection) as queries:
+                self.client.get(self.list_url + '?fields=id,status')
+            # Only the order page; no items, users or products
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('"shipping_address"', queries[0]['sql'])
+            self.assertNotIn('users_user', queries[0]['sql'])
+
+    def test_fields_do_not_apply_to_writes(self):
+        response = self.client.patch(self.detail_url + '?fields=id', {'shipping_address': "Farm 2"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['shipping_address'], "Farm 2")
+
+
+@override_settings(ORDER_INTAKE={'ASYNC': True})
+class OrderIntakeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='rush@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        self.seeds = Product.objects.create(title="Peak seeds", price=4, vendor=self.user)
+        self.hoe = Product.objects.create(title="Peak hoe", price=10, vendor=self.user)
+        StockLevel.objects.create(product=self.seeds, on_hand=3)
+        self.url = reverse('order-list-create')
+
+    def submit(self, *lines, **extra):
+        payload = {'shipping_address': "1 Rush Lane", 'items': [
+            {'product_id': product_id, 'quantity': quantity} for product_id, quantity in lines
+        ]}
+        return self.client.post(self.url, payload, format='json', **extra)
+
+    def test_accepted_ticket_becomes_an_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.submit((self.seeds.id, 2), (self.hoe.id, 1))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'queued')
+
+        ticket = self.client.get(response['Location']).data
+        self.assertEqual(ticket['status'], 'created')
+        order = Order.objects.get(pk=ticket['order'])
+        self.assertEqual((order.user, order.shipping_address, order.total_price), (self.user, "1 Rush Lane", 18))
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(StockLevel.objects.get().reserved, 2)
+        self.assertEqual([message.subject for message in mail.outbox if message.subject.startswith('Order')], [
+            f"Order #{order.pk} received",
+        ])
+
+    def test_only_the_shape_is_checked_up_front(self):
+        self.assertEqual(self.submit().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.submit((self.seeds.id, 0)).status_code, status.HTTP_400_BAD_REQUEST)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.submit((999999, 1))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        ticket = self.client.get(response['Location']).data
+        self.assertEqual(ticket['status'], 'failed')
+        self.assertIn('product_id', ticket['errors']['items'][0])
+        self.assertFalse(Order.objects.exists())
+
+    def test_workers_drain_tickets_in_batches(self):
+        # Hold the drain so the tickets queue up, then run it as a worker would
+        cache.add(intake.DRAIN_SCHEDULED_KEY, True)
+        tickets = [self.submit((self.seeds.id, 2), (self.hoe.id, 1)).data['id'] for _ in range(3)]
+        self.assertEqual(OrderIntakeTicket.objects.filter(status='queued').count(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(drain_order_intake.delay(batch_size=2).get(), 3)
+        outcomes = dict(OrderIntakeTicket.objects.values_list('id', 'status'))
+        # Only the first cart fits the stock; the others fail on their own
+        self.assertEqual([outcomes[uuid.UUID(str(pk))] for pk in tickets], ['created', 'failed', 'failed'])
+        self.assertEqual(
+            OrderIntakeTicket.objects.get(pk=tickets[1]).errors,
+            {'items': [{'quantity': ["Only 1 left in stock."]}, {}]},
+        )
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(StockLevel.objects.get().reserved, 2)
+
+    @override_settings(ORDER_INTAKE={'ASYNC': False})
+    def test_clients_can_opt_in_per_request(self):
+        self.assertEqual(self.submit((self.hoe.id, 1)).status_code, status.HTTP_201_CREATED)
+        response = self.submit((self.hoe.id, 1), HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Preference-Applied'], 'respond-async')
+
+    def test_tickets_are_private(self):
+        location = self.submit((self.hoe.id, 1))['Location']
+        self.client.force_authenticate(user=User.objects.create_user(email='peek@example.com', password='pass1234'))
+        self.assertEqual(self.client.get(location).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class OrderArchiveTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='archive@example.com', password='pass1234')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(title="Old seeds", price=4, vendor=self.user)
+        self.old = timezone.now() - timedelta(days=200)
+        self.delivered = self.order('delivered', self.old, quantity=3)
+        self.cancelled = self.order('cancelled', self.old)
+        self.shipped = self.order('shipped', self.old)
+        self.recent = self.order('delivered', timezone.now())
+
+    def order(self, status, created_at, quantity=1):
+        order = Order.objects.create(user=self.user, status=status, created_at=created_at, total_price=4 * quantity)
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, price_at_purchase=4)
+        # updated_at is auto_now; queryset updates leave it as given
+        Order.objects.filter(pk=order.pk).update(updated_at=created_at)
+        order.refresh_from_db()
+        return order
+
+    def test_only_old_finished_orders_move_to_the_archive(self):
+        item_id = self.delivered.items.get().pk
+        self.assertEqual(archive_old_orders.delay(retention_days=90, batch_size=1).get(), 2)
+        self.assertEqual(
+            set(ArchivedOrder.objects.values_list('id', flat=True)), {self.delivered.pk, self.cancelled.pk}
+        )
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.shipped.pk, self.recent.pk})
+        archived = ArchivedOrder.objects.get(pk=self.delivered.pk)
+        self.assertEqual((archived.user, archived.status, archived.total_price), (self.user, 'delivered', 12))
+        self.assertEqual(archived.created_at, self.delivered.created_at)
+        self.assertEqual(archived.items, [{
+            'id': item_id, 'product_id': self.product.pk, 'title': "Old seeds",
+            'quantity': 3, 'price_at_purchase': '4.00',
+        }])
+        self.assertEqual(archive_orders(retention_days=90), 0)
+
+    def test_recently_finished_orders_stay_hot(self):
+        Order.objects.filter(pk=self.delivered.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(archive_orders(retention_days=90), 1)
+        self.assertEqual(list(ArchivedOrder.objects.values_list('id', flat=True)), [self.cancelled.pk])
+        self.assertTrue(Order.objects.filter(pk=self.delivered.pk).exists())
+
+    def test_query_count_is_independent_of_batch_size(self):
+        def archive(count):
+            for _ in range(count):
+                self.order('delivered', self.old)
+            with CaptureQueriesContext(connection) as queries:
+                archive_orders(retention_days=90)
+            return len(queries)
+
+        self.assertEqual(archive(3), archive(40))
+
+    def test_archiving_invalidates_vendor_dashboards_once(self):
+        with mock.patch('vendors.dashboard.invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                archive_orders(retention_days=90)
+        invalidate.assert_called_once_with({self.user.pk})
+
+    def test_archived_sales_stay_in_the_rollups(self):
+        order = Order.objects.create(user=self.user, created_at=self.old)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, price_at_purchase=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            for status_name in ('processing', 'shipped', 'delivered'):
+                transition_orders(status_name, order_ids=[order.pk])
+        sales = list(VendorDailySales.objects.values_list('units', 'revenue', 'orders'))
+        self.assertEqual(sales, [(2, 8, 1)])
+        Order.objects.filter(pk=order.pk).update(updated_at=self.old)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_orders(retention_days=90)
+        self.assertTrue(ArchivedOrder.objects.filter(pk=order.pk).exists())
+        self.assertEqual(list(VendorDailySales.objects.values_list('units', 'revenue', 'orders')), sales)
+
+    def test_history_is_served_from_the_archive(self):
+        archive_orders(retention_days=90)
+        url = reverse('order-list-create')
+        self.assertEqual(
+            {order['id'] for order in self.client.get(url).data['results']}, {self.shipped.pk, self.recent.pk}
+        )
+        history = self.client.get(url, {'history': '1'}).data['results']
+        self.assertEqual([order['id'] for order in history], [self.cancelled.pk, self.delivered.pk])
+        self.assertEqual(history[0]['user'], str(self.user))
+
+        detail = reverse('order-detail', args=[self.delivered.pk])
+        self.assertEqual(self.client.get(detail).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(detail, {'history': '1', 'fields': 'id,items'})
+        self.assertEqual(set(response.data), {'id', 'items'})
+        self.assertEqual(response.data['items'][0]['quantity'], 3)
+
+        self.client.force_authenticate(user=User.objects.create_user(email='nosy@example.com', password='pass1234'))
+        self.assertEqual(self.client.get(url, {'history': '1'}).data['results'], [])
+        self.assertEqual(self.client.get(detail, {'history': '1'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_command_dry_run_and_rerun(self):
+        out = StringIO()
+        call_command('archive_orders', '--days', '90', '--dry-run', stdout=out)
+        self.assertIn("2 orders", out.getvalue())
+        self.assertFalse(ArchivedOrder.objects.exists())
+
+        call_command('archive_orders', '--days', '90', '--batch-size', '1', stdout=out)
+        call_command('archive_orders', '--days', '90', stdout=out)
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        self.assertIn("Archived 0 orders", out.getvalue())
+
@@ -1,7 +1,16 @@
 from django.urls import path
-from .views import OrderListCreateView, OrderRetrieveUpdateDestroyView
+from .views import (
+    BulkOrderTransitionView,
+    OrderIntakeTicketView,
+    OrderListCreateView,
+    OrderRetrieveUpdateDestroyView,
+    OrderStatusView,
+)
 
 urlpatterns = [
     path('', OrderListCreateView.as_view(), name='order-list-create'),
     path('<int:pk>/', OrderRetrieveUpdateDestroyView.as_view(), name='order-detail'),
+    path('<int:pk>/status/', OrderStatusView.as_view(), name='order-status'),
+    path('transitions/', BulkOrderTransitionView.as_view(), name='order-transitions'),
+    path('intake/<uuid:pk>/', OrderIntakeTicketView.as_view(), name='order-intake-ticket'),
 ]
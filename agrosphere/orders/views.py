@@ -1,41 +1,204 @@
-from rest_framework import generics, permissions
-from rest_framework.exceptions import PermissionDenied
-from .models import Order
-from .serializers import OrderSerializer
+from django.db.models import Count, Max, Prefetch
+from django.utils.dateparse import parse_datetime
+from django.urls import reverse
+from rest_framework import generics, permissions, status as http_status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from . import intake
+from .models import ArchivedOrder, Order, OrderIntakeTicket, OrderItem
+from .serializers import (
+    ArchivedOrderSerializer,
+    BulkOrderTransitionSerializer,
+    OrderIntakeSerializer,
+    OrderIntakeTicketSerializer,
+    OrderSerializer,
+    OrderStatusSerializer,
+)
+from .projections import OrderProjection
+from .workflow import InvalidTransition, transition_order, transition_orders
+from agrosphere.conditional import ConditionalGetMixin
+from agrosphere.fieldsets import SparseQuerysetMixin, requested_shape
+from agrosphere.idempotency import IdempotencyMixin
+from agrosphere.projections import ProjectionMixin, ordering_names
 
-class OrderListCreateView(generics.ListCreateAPIView):
+
+def visible_orders(user):
+    """
+    Orders ``user`` may see (staff: all), with items and their products
+    loaded in one extra query.
+    """
+    queryset = Order.objects.all() if user.is_staff else Order.objects.filter(user=user)
+    items = OrderItem.objects.select_related('product__category', 'product__vendor')
+    return queryset.select_related('user').prefetch_related(Prefetch('items', queryset=items))
+
+
+def archived_orders(user):
+    """
+    Archived orders ``user`` may see (staff: all).
+    """
+    queryset = ArchivedOrder.objects.all() if user.is_staff else ArchivedOrder.objects.filter(user=user)
+    return queryset.select_related('user')
+
+
+def archive_validators(queryset):
     """
-    List orders (admin: all orders; users: own orders) and create orders.
+    Archived orders never change; new archivals and user deletions are
+    noticed through the count and the newest archival time.
+    """
+    state = queryset.order_by().aggregate(archived=Max('archived_at'), order_count=Count('id'))
+    if not state['order_count']:
+        return None
+    return tuple(state.values()), state['archived']
+
+
+class OrderHistoryMixin:
+    """
+    Order views read the hot tables only. Safe requests with ``?history=1``
+    read the archive of finished orders instead (see orders.archive), with
+    the read-only ``ArchivedOrderSerializer``.
+    """
+    history_param = 'history'
+
+    def wants_history(self):
+        return (
+            self.request.method in SAFE_METHODS
+            and self.request.query_params.get(self.history_param, '').lower() in ('1', 'true', 'yes')
+        )
+
+    def get_queryset(self):
+        if self.wants_history():
+            return archived_orders(self.request.user)
+        return visible_orders(self.request.user)
+
+    def get_serializer_class(self):
+        return ArchivedOrderSerializer if self.wants_history() else super().get_serializer_class()
+
+    def get_projection(self):
+        return None if self.wants_history() else super().get_projection()
+
+
+class OrderValidatorsMixin(ConditionalGetMixin):
+    """
+    Conditional GETs for orders, keyed on the ``id`` and ``updated_at`` of
+    the orders rendered (item edits bump ``updated_at``). Unconditional GETs
+    read them off the response; conditional ones from the orders table alone,
+    without touching items or products. Shapes that leave either field out,
+    or expand nested objects, are served without validators.
+    """
+
+    def has_validators(self):
+        fields = self.get_serializer().fields
+        return 'id' in fields and 'updated_at' in fields and not requested_shape(self.request)[1]
+
+    def get_response_validators(self, response):
+        if self.wants_history():
+            return self.get_validators()
+        if not self.has_validators():
+            return None
+        data = response.data
+        if isinstance(data, dict) and 'results' in data:
+            return rendered_validators(data['results'], data['next'], data['previous'])
+        return rendered_validators(data if isinstance(data, list) else [data])
+
+
+def rendered_validators(rows, *links):
+    """
+    ``(parts, last_modified)`` for rendered order dicts and the page links.
+    """
+    parts = tuple((row['id'], row['updated_at']) for row in rows)
+    stamps = [parse_datetime(row['updated_at']) for row in rows]
+    return (parts, *links), max(stamps, default=None)
+
+
+class OrderListCreateView(
+    IdempotencyMixin, OrderValidatorsMixin, OrderHistoryMixin, ProjectionMixin, SparseQuerysetMixin,
+    generics.ListCreateAPIView,
+):
+    """
+    List orders (admin: all orders; users: own orders; ``?history=1``:
+    archived orders) and create orders, either directly or, with
+    asynchronous intake, as a 202 ticket.
     """
     serializer_class = OrderSerializer
+    projection_class = OrderProjection
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_staff:
-            return Order.objects.all().prefetch_related('items__product', 'items')
-        return Order.objects.filter(user=user).prefetch_related('items__product', 'items')
+    def get_validators(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.wants_history():
+            return archive_validators(queryset)
+        if not self.has_validators():
+            return None
+        # The page the request would get, without items
+        rows = queryset.values('id', 'updated_at', *ordering_names(queryset))
+        page = self.paginate_queryset(rows)
+        render = self.get_serializer().fields['updated_at'].to_representation
+        rendered = [{'id': row['id'], 'updated_at': render(row['updated_at'])} for row in (rows if page is None else page)]
+        if page is None:
+            return rendered_validators(rendered)
+        return rendered_validators(rendered, self.paginator.get_next_link(), self.paginator.get_previous_link())
+
+    def get_throttle_scope(self):
+        return 'checkout' if self.request.method == 'POST' else 'browse'
+
+    def create(self, request, *args, **kwargs):
+        if not intake.wants_async(request):
+            return super().create(request, *args, **kwargs)
+        # Asynchronous intake: check the shape now, create the order in a worker
+        serializer = OrderIntakeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ticket = serializer.save(user=request.user)
+        intake.schedule_drain()
+        headers = {
+            'Location': reverse('order-intake-ticket', args=[ticket.pk]),
+            'Preference-Applied': 'respond-async',
+        }
+        data = OrderIntakeTicketSerializer(ticket).data
+        return Response(data, status=http_status.HTTP_202_ACCEPTED, headers=headers)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
-class OrderRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class OrderRetrieveUpdateDestroyView(
+    IdempotencyMixin, OrderValidatorsMixin, OrderHistoryMixin, ProjectionMixin, SparseQuerysetMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     """
-    Retrieve, update, or delete an order with permission checks.
+    Retrieve, update, or delete an order with permission checks;
+    ``?history=1`` retrieves an archived order.
     """
 
     serializer_class = OrderSerializer
+    projection_class = OrderProjection
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'browse'
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.is_staff:
-            return Order.objects.all().prefetch_related('items__product', 'items')
-        return Order.objects.filter(user=user).prefetch_related('items__product', 'items')
+    def get_validators(self):
+        queryset = self.get_queryset().filter(pk=self.kwargs['pk'])
+        if self.wants_history():
+            return archive_validators(queryset)
+        if not self.has_validators():
+            return None
+        row = queryset.values('id', 'updated_at').first()
+        if row is None:
+            return None
+        render = self.get_serializer().fields['updated_at'].to_representation
+        return rendered_validators([{'id': row['id'], 'updated_at': render(row['updated_at'])}])
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        # Unlike UpdateModelMixin, keep the items prefetch: OrderSerializer
+        # updates it in place, so rendering needs no per-item queries
+        return Response(serializer.data)
 
     def perform_update(self, serializer):
-        order = self.get_object()
+        order = serializer.instance
         if self.request.user != order.user and not self.request.user.is_staff:
             raise PermissionDenied("You cannot modify this order.")
         serializer.save()
@@ -46,3 +209,72 @@ class OrderRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         if instance.status != 'pending':
             raise PermissionDenied("Only pending orders can be deleted.")
         instance.delete()
+
+
+class OrderStatusView(IdempotencyMixin, generics.GenericAPIView):
+    """
+    POST: Move one order to a new status. Owners may only cancel their
+    pending orders; staff may make any allowed transition.
+    """
+
+    serializer_class = OrderStatusSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        return Order.objects.all() if user.is_staff else Order.objects.filter(user=user)
+
+    def post(self, request, *args, **kwargs):
+        order = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        status = serializer.validated_data['status']
+        if not request.user.is_staff and (status != 'cancelled' or order.status != 'pending'):
+            raise PermissionDenied("You can only cancel pending orders.")
+        try:
+            transition_order(order, status)
+        except InvalidTransition as exc:
+            raise ValidationError({'status': [str(exc)]})
+        return Response({'id': order.pk, 'status': order.status})
+
+
+class BulkOrderTransitionView(IdempotencyMixin, generics.GenericAPIView):
+    """
+    POST: Staff-only bulk status change, e.g. every ``processing`` order to
+    ``shipped``. Runs one conditional UPDATE per batch; notifications are
+    queued after commit.
+    """
+
+    serializer_class = BulkOrderTransitionSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            changed = transition_orders(
+                data['status'], order_ids=data.get('order_ids'), from_status=data.get('from_status')
+            )
+        except InvalidTransition as exc:
+            raise ValidationError({'status': [str(exc)]})
+        body = {'status': data['status'], 'updated': len(changed)}
+        if 'order_ids' in data:
+            body['skipped'] = len(set(data['order_ids'])) - len(changed)
+        return Response(body)
+
+
+class OrderIntakeTicketView(generics.RetrieveAPIView):
+    """
+    GET: Outcome of an asynchronously submitted order: ``queued``, then
+    ``created`` with the order id or ``failed`` with validation errors.
+    """
+
+    serializer_class = OrderIntakeTicketSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'browse'
+
+    def get_queryset(self):
+        user = self.request.user
+        tickets = OrderIntakeTicket.objects.defer('payload')
+        return tickets if user.is_staff else tickets.filter(user=user)
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .emails import queue_status_notifications
+from .models import Order
+from .signals import order_status_changed
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def option(name, default):
+    return getattr(settings, 'ORDER_WORKFLOW', {}).get(name, default)
+
+
+def transition_batch(queryset, status, sources):
+    """
+    Move the orders of ``queryset`` still in one of ``sources`` to ``status``
+    with a single conditional UPDATE and return the ids that changed.
+
+    Every changed row is stamped with the same ``updated_at`` value, which
+    identifies them afterwards without locking the batch up front. The
+    owners' emails go through the outbox in the same transaction.
+    """
+    stamp = timezone.now()
+    with transaction.atomic():
+        updated = queryset.filter(status__in=sources).update(status=status, updated_at=stamp)
+        if not updated:
+            return []
+        ids = list(queryset.filter(status=status, updated_at=stamp).values_list('pk', flat=True))
+        order_status_changed.send(sender=Order, order_ids=ids, status=status, sources=sources)
+        queue_status_notifications(ids, status)
+    return ids
+
+
+def transition_orders(status, order_ids=None, from_status=None, batch_size=None):
+    """
+    Move orders to ``status`` in batches of ``batch_size``, one UPDATE per
+    batch. Either ``order_ids`` lists the orders, or every order currently in
+    ``from_status`` (default: any status that may move to ``status``) is
+    moved. Orders not in an allowed source status are skipped. Returns the
+    changed ids.
+    """
+    sources = Order.sources_for(status)
+    if from_status is not None:
+        sources &= {from_status}
+    if not sources:
+        origin = f" from '{from_status}'" if from_status else ''
+        raise InvalidTransition(f"Orders cannot move to '{status}'{origin}.")
+    batch_size = batch_size or option('BATCH_SIZE', 1000)
+
+    changed = []
+    if order_ids is not None:
+        order_ids = sorted(set(order_ids))
+        for start in range(0, len(order_ids), batch_size):
+            batch = order_ids[start:start + batch_size]
+            changed += transition_batch(Order.objects.filter(pk__in=batch), status, sources)
+        return changed
+
+    while True:
+        # Moved rows leave the source statuses, so each pass picks up new ones
+        batch = list(
+            Order.objects.filter(status__in=sources).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return changed
+        changed += transition_batch(Order.objects.filter(pk__in=batch), status, sources)
+
+
+def transition_order(order, status):
+    """
+    Move a single order to ``status``, refreshing ``order`` in place.
+    """
+    if not order.can_transition_to(status):
+        raise InvalidTransition(f"Cannot move an order from '{order.status}' to '{status}'.")
+    if not transition_batch(Order.objects.filter(pk=order.pk), status, {order.status}):
+        raise InvalidTransition('The order status changed concurrently; reload and try again.')
+    order.refresh_from_db(fields=['status', 'updated_at'])
+    return order
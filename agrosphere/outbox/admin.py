@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import OutboxMessage
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("key", "status", "attempts", "available_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("key",)
+    readonly_fields = ("created_at", "sent_at")
@@ -0,0 +1,33 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    An email to send once the transaction that wrote it commits (see
+    outbox.relay). ``key`` deduplicates: enqueueing the same key twice keeps
+    the first message.
+    """
+
+    PENDING, SENT, FAILED = "pending", "sent", "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (SENT, "Sent"), (FAILED, "Failed")]
+
+    key = models.CharField(max_length=200, unique=True)
+    # subject, body, to and (optionally) from_email
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Earliest next delivery attempt: backoff after failures, lease while claimed
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["available_at", "id"], name="outbox_due_idx", condition=Q(status="pending")),
+        ]
+
+    def __str__(self):
+        return f"{self.key} - {self.status}"
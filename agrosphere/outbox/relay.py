@@ -0,0 +1,177 @@
+"""
+Transactional outbox for emails.
+
+``enqueue`` writes ``OutboxMessage`` rows in the caller's transaction, so a
+message exists exactly when the change it reports was committed, and
+requests never wait on the mail server. After commit a ``relay_outbox`` task
+is queued (at most one at a time); it claims due messages in batches and
+sends each batch over one mail connection. Claiming leases the rows
+(``available_at`` moves ``LEASE`` seconds ahead) instead of holding locks
+while talking SMTP, so a crashed worker's batch is retried after the lease.
+Failed sends are retried with exponential backoff up to ``MAX_ATTEMPTS``.
+Delivery is at least once; the unique ``key`` keeps the same message from
+being enqueued twice. If the relay task cannot be queued (broker down),
+the messages wait for the periodic ``relay_outbox`` run instead.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .tasks import relay_outbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BATCH_SIZE": 100,      # messages per mail connection
+    "MAX_BATCHES": 10,      # batches per relay task before it hands over
+    "LEASE": 300,           # seconds a claimed batch is reserved for its worker
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF": 30,          # seconds before the first retry, doubled per attempt
+    "MAX_BACKOFF": 3600,
+    "KEEP_SENT_DAYS": 7,
+}
+
+RELAY_SCHEDULED_KEY = "outbox:relay-scheduled"
+
+
+def option(name):
+    return getattr(settings, "OUTBOX", {}).get(name, DEFAULTS[name])
+
+
+def email(key, subject, body, to, from_email=None):
+    """
+    An unsaved outbox email; pass it to ``enqueue``.
+    """
+    payload = {"subject": subject, "body": body, "to": list(to)}
+    if from_email:
+        payload["from_email"] = from_email
+    return OutboxMessage(key=key, payload=payload)
+
+
+def enqueue(*messages):
+    """
+    Save ``messages`` in the current transaction (keys already present are
+    skipped) and relay them after commit.
+    """
+    OutboxMessage.objects.bulk_create(messages, ignore_conflicts=True)
+    transaction.on_commit(schedule_relay)
+
+
+def schedule_relay():
+    # Runs after the caller's commit: the messages are saved, so failing
+    # here would only turn a committed change into an error response
+    try:
+        # A relay already waiting picks up these messages too
+        if cache.add(RELAY_SCHEDULED_KEY, True, timeout=60):
+            try:
+                relay_outbox.delay()
+            except Exception:
+                cache.delete(RELAY_SCHEDULED_KEY)
+                raise
+    except Exception:
+        logger.warning("Could not queue the outbox relay; the periodic relay will send the messages", exc_info=True)
+
+
+def relay(batch_size=None, max_batches=None):
+    """
+    Send due messages, oldest first, until none are left or ``max_batches``
+    batches ran. Returns the number of messages sent.
+    """
+    cache.delete(RELAY_SCHEDULED_KEY)
+    batch_size = batch_size or option("BATCH_SIZE")
+    max_batches = max_batches or option("MAX_BATCHES")
+    sent = 0
+    for _ in range(max_batches):
+        batch = claim(batch_size)
+        sent += deliver(batch)
+        if len(batch) < batch_size:
+            return sent
+    # Still more to do: let another task continue
+    schedule_relay()
+    return sent
+
+
+def claim(batch_size):
+    """
+    Lease up to ``batch_size`` due messages to this worker and count the
+    attempt. SKIP LOCKED keeps concurrent relays on disjoint batches.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxMessage.PENDING, available_at__lte=now)
+            .order_by("available_at", "id")[:batch_size]
+        )
+        OutboxMessage.objects.filter(pk__in=[message.pk for message in messages]).update(
+            available_at=now + timedelta(seconds=option("LEASE")), attempts=F("attempts") + 1
+        )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def build(message):
+    payload = message.payload
+    return EmailMessage(
+        subject=payload["subject"],
+        body=payload["body"],
+        from_email=payload.get("from_email"),
+        to=payload["to"],
+    )
+
+
+def deliver(messages):
+    """
+    Send ``messages`` over one connection and record each outcome. Returns
+    the number sent.
+    """
+    if not messages:
+        return 0
+    sent, failed = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+        for message in messages:
+            try:
+                connection.send_messages([build(message)])
+            except Exception as exc:
+                failed.append((message, exc))
+            else:
+                sent.append(message.pk)
+    except Exception as exc:
+        # The connection itself failed: retry whatever was not sent
+        failed += [(message, exc) for message in messages[len(sent) + len(failed):]]
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    OutboxMessage.objects.filter(pk__in=sent).update(status=OutboxMessage.SENT, sent_at=now, last_error="")
+    for message, exc in failed:
+        message.last_error = f"{type(exc).__name__}: {exc}"
+        if message.attempts >= option("MAX_ATTEMPTS"):
+            message.status = OutboxMessage.FAILED
+        else:
+            delay = min(option("BACKOFF") * 2 ** (message.attempts - 1), option("MAX_BACKOFF"))
+            message.available_at = now + timedelta(seconds=delay)
+    OutboxMessage.objects.bulk_update(
+        [message for message, _ in failed], ["status", "available_at", "last_error"]
+    )
+    return len(sent)
+
+
+def purge_sent(days=None):
+    """
+    Delete messages sent more than ``days`` ago. Returns the number deleted.
+    """
+    days = option("KEEP_SENT_DAYS") if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxMessage.objects.filter(status=OutboxMessage.SENT, sent_at__lt=cutoff).delete()
+    return deleted
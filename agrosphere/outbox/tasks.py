@@ -0,0 +1,18 @@
+from celery import shared_task
+
+
+@shared_task
+def relay_outbox(batch_size=None, max_batches=None):
+    """
+    Send due outbox messages in batches.
+    """
+    from .relay import relay  # outbox.relay queues this task
+
+    return relay(batch_size, max_batches)
+
+
+@shared_task
+def purge_sent_outbox(days=None):
+    from .relay import purge_sent
+
+    return purge_sent(days)
@@ -0,0 +1,126 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from . import relay
+from .models import OutboxMessage
+from .tasks import relay_outbox
+
+
+class BouncingBackend(EmailBackend):
+    """
+    locmem backend refusing recipients at bounce.example.com.
+    """
+
+    def send_messages(self, messages):
+        if any(address.endswith("@bounce.example.com") for message in messages for address in message.to):
+            raise ConnectionError("550 mailbox unavailable")
+        return super().send_messages(messages)
+
+
+class OutboxRelayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def queue(self, key, to="buyer@example.com"):
+        relay.enqueue(relay.email(key, f"Subject {key}", "Body", [to]))
+
+    def test_messages_are_sent_after_commit_once_per_key(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.queue("greeting")
+            self.queue("greeting")
+            self.assertEqual(mail.outbox, [])
+        self.assertEqual([message.subject for message in mail.outbox], ["Subject greeting"])
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), (OutboxMessage.SENT, 1))
+
+        # Rerunning the relay does not send it again
+        self.assertEqual(relay_outbox.delay().get(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_rolled_back_messages_are_never_sent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                self.queue("lost")
+                raise ValueError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_broker_errors_leave_messages_for_the_periodic_relay(self):
+        with mock.patch.object(relay_outbox, "delay", side_effect=ConnectionError("broker down")):
+            with self.assertLogs("outbox.relay", "WARNING"), self.captureOnCommitCallbacks(execute=True):
+                self.queue("delayed")
+        self.assertEqual(OutboxMessage.objects.get().status, OutboxMessage.PENDING)
+        self.assertIsNone(cache.get(relay.RELAY_SCHEDULED_KEY))
+
+        self.assertEqual(relay_outbox.delay().get(), 1)
+        self.assertEqual([message.subject for message in mail.outbox], ["Subject delayed"])
+
+    def test_each_batch_shares_one_connection(self):
+        for index in range(25):
+            self.queue(f"bulk-{index}")
+        with mock.patch("outbox.relay.get_connection", wraps=relay.get_connection) as get_connection:
+            self.assertEqual(relay.relay(batch_size=10), 25)
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 25)
+
+    @override_settings(
+        EMAIL_BACKEND="outbox.tests.BouncingBackend",
+        OUTBOX={"BACKOFF": 30, "MAX_ATTEMPTS": 2},
+    )
+    def test_failures_are_retried_with_backoff(self):
+        self.queue("bounce", to="someone@bounce.example.com")
+        self.queue("fine")
+        self.assertEqual(relay.relay(), 1)
+
+        bounced = OutboxMessage.objects.get(key="bounce")
+        self.assertEqual((bounced.status, bounced.attempts), (OutboxMessage.PENDING, 1))
+        self.assertIn("550 mailbox unavailable", bounced.last_error)
+        self.assertGreater(bounced.available_at, timezone.now() + timedelta(seconds=25))
+        # Not due yet
+        self.assertEqual(relay.relay(), 0)
+        self.assertEqual(OutboxMessage.objects.get(key="bounce").attempts, 1)
+
+        OutboxMessage.objects.filter(key="bounce").update(available_at=timezone.now())
+        relay.relay()
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), (OutboxMessage.FAILED, 2))
+        self.assertEqual([message.subject for message in mail.outbox], ["Subject fine"])
+
+    def test_purge_keeps_recent_and_unsent_messages(self):
+        self.queue("old")
+        self.queue("recent")
+        self.queue("pending")
+        relay.relay(batch_size=2, max_batches=1)
+        OutboxMessage.objects.filter(key="old").update(sent_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(relay.purge_sent(days=7), 1)
+        self.assertEqual(set(OutboxMessage.objects.values_list("key", flat=True)), {"recent", "pending"})
+
+
+class RegistrationEmailTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def register(self):
+        payload = {"email": "newbie@example.com", "password": "Str0ng-pass!", "password2": "Str0ng-pass!"}
+        return self.client.post(reverse("register"), payload, format="json")
+
+    def test_registration_queues_the_welcome_email(self):
+        with mock.patch("outbox.relay.relay_outbox.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.register().status_code, status.HTTP_201_CREATED)
+        # The request only wrote the outbox row; sending is the relay's job
+        self.assertEqual(mail.outbox, [])
+        delay.assert_called_once_with()
+        self.assertEqual(OutboxMessage.objects.get().payload["to"], ["newbie@example.com"])
+
+        relay.relay()
+        self.assertEqual(mail.outbox[0].subject, "Welcome to AgroSphere")
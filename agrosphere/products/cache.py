@@ -0,0 +1,116 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class VersionedQueryCache:
+    """
+    Response cache keyed on a normalized query string and a generation counter.
+
+    Bumping the generation invalidates every cached entry of the namespace in
+    O(1): old keys are simply never read again and age out of the cache.
+    Entries carry a soft expiry; once it passes, a single caller (guarded by a
+    cache lock) recomputes the value while everyone else keeps serving the
+    stale copy. A cold key is recomputed by one caller while the others wait.
+    """
+
+    defaults = {
+        "TIMEOUT": 300,        # seconds an entry is considered fresh
+        "STALE_TIMEOUT": 60,   # extra seconds a stale entry may still be served
+        "LOCK_TIMEOUT": 10,    # upper bound on a single recomputation
+        "WAIT_TIMEOUT": 5,     # how long cold-key callers wait for the lock holder
+        "POLL_INTERVAL": 0.05,
+    }
+
+    def __init__(self, namespace, setting_name):
+        self.namespace = namespace
+        self.setting_name = setting_name
+
+    @property
+    def options(self):
+        return {**self.defaults, **getattr(settings, self.setting_name, {})}
+
+    @property
+    def generation_key(self):
+        return f"{self.namespace}:generation"
+
+    def generation(self):
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            # Seed from the clock so an evicted counter never reuses old keys.
+            cache.add(self.generation_key, time.time_ns(), None)
+            generation = cache.get(self.generation_key)
+        return generation
+
+    def invalidate(self):
+        try:
+            cache.incr(self.generation_key)
+        except ValueError:
+            cache.add(self.generation_key, time.time_ns(), None)
+
+    def make_key(self, params):
+        """
+        Build the cache key for a QueryDict (or mapping of lists), ignoring
+        parameter order and empty values.
+        """
+        lists = params.lists() if hasattr(params, "lists") else params.items()
+        normalized = sorted(
+            (name, sorted(value for value in values if value != ""))
+            for name, values in lists
+        )
+        query = urlencode([(name, value) for name, values in normalized for value in values])
+        digest = hashlib.sha1(query.encode()).hexdigest()
+        return f"{self.namespace}:{self.generation()}:{digest}"
+
+    def version(self, params):
+        """
+        Identity of the entry currently cached for ``params`` (its freshness
+        deadline, unique per build), or None when there is none.
+        """
+        entry = cache.get(self.make_key(params))
+        return None if entry is None else entry[0]
+
+    def get_or_set(self, params, compute):
+        options = self.options
+        key = self.make_key(params)
+        lock_key = f"{key}:lock"
+
+        entry = cache.get(key)
+        if entry is not None:
+            fresh_until, data = entry
+            if time.time() < fresh_until:
+                return data
+            # Stale: one caller revalidates, the rest keep serving the old copy.
+            if cache.add(lock_key, 1, options["LOCK_TIMEOUT"]):
+                return self._recompute(key, lock_key, compute, options)
+            return data
+
+        if cache.add(lock_key, 1, options["LOCK_TIMEOUT"]):
+            return self._recompute(key, lock_key, compute, options)
+
+        # Cold key being computed elsewhere: wait for it instead of piling on.
+        deadline = time.monotonic() + options["WAIT_TIMEOUT"]
+        while time.monotonic() < deadline:
+            time.sleep(options["POLL_INTERVAL"])
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[1]
+        return compute()
+
+    def _recompute(self, key, lock_key, compute, options):
+        try:
+            data = compute()
+            cache.set(
+                key,
+                (time.time() + options["TIMEOUT"], data),
+                options["TIMEOUT"] + options["STALE_TIMEOUT"],
+            )
+            return data
+        finally:
+            cache.delete(lock_key)
+
+
+product_list_cache = VersionedQueryCache("products:list", "PRODUCT_LIST_CACHE")
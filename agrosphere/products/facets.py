@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db.models import Count, Q
+
+DEFAULT_PRICE_RANGES = {
+    "0-50": {"gte": 0, "lte": 50},
+    "51-100": {"gt": 50, "lte": 100},
+    "101-500": {"gt": 100, "lte": 500},
+    "500+": {"gt": 500},
+}
+DEFAULT_RATING_THRESHOLDS = [1, 2, 3, 4, 5]
+
+
+class FacetEngine:
+    """
+    Computes category, price-range and rating facets in a single query.
+
+    Products are grouped by category and every price range and rating
+    threshold becomes a conditional ``COUNT(...) FILTER (WHERE ...)`` column of
+    that grouped query; the per-category rows are then folded into totals.
+    Bucket boundaries come from ``settings.PRODUCT_FACETS``: price ranges map a
+    label to ``price`` lookups (``{"gt": 50, "lte": 100}``) and rating
+    thresholds produce ``"<n>_stars_and_up"`` buckets.
+    """
+
+    def __init__(self, price_ranges=None, rating_thresholds=None):
+        config = getattr(settings, "PRODUCT_FACETS", {})
+        self.price_ranges = price_ranges or config.get("PRICE_RANGES", DEFAULT_PRICE_RANGES)
+        self.rating_thresholds = rating_thresholds or config.get("RATING_THRESHOLDS", DEFAULT_RATING_THRESHOLDS)
+
+    def get_aggregates(self):
+        aggregates = {"count": Count("id")}
+        for index, bounds in enumerate(self.price_ranges.values()):
+            condition = Q(**{f"price__{lookup}": value for lookup, value in bounds.items()})
+            aggregates[f"price_{index}"] = Count("id", filter=condition)
+        for index, threshold in enumerate(self.rating_thresholds):
+            aggregates[f"rating_{index}"] = Count("id", filter=Q(rating_avg__gte=threshold))
+        return aggregates
+
+    def compute(self, queryset):
+        rows = list(
+            queryset.values("category__name", "category__slug")
+            .annotate(**self.get_aggregates())
+            .order_by("-count")
+        )
+
+        price_ranges = {
+            label: sum(row[f"price_{index}"] for row in rows)
+            for index, label in enumerate(self.price_ranges)
+        }
+        ratings = {
+            f"{threshold}_stars_and_up": sum(row[f"rating_{index}"] for row in rows)
+            for index, threshold in enumerate(self.rating_thresholds)
+        }
+        categories = [
+            {"category__name": row["category__name"], "category__slug": row["category__slug"], "count": row["count"]}
+            for row in rows
+        ]
+        return {
+            "categories": categories,
+            "price_ranges": price_ranges,
+            "ratings": ratings,
+        }
@@ -0,0 +1,167 @@
+import codecs
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .cache import product_list_cache
+from .models import Category, Product
+from .slugs import allocate_slugs
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+}
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Validates one imported row; ``category`` is a category slug.
+    """
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(required=False, allow_blank=True, default="")
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    available = serializers.BooleanField(required=False, default=True)
+    category = serializers.SlugField(required=False, allow_blank=True, allow_null=True, default=None)
+
+
+def decode_lines(byte_lines):
+    """
+    Decode an iterable of byte lines incrementally, dropping a UTF-8 BOM.
+    """
+    return codecs.iterdecode(byte_lines, "utf-8-sig")
+
+
+def iter_csv_rows(lines):
+    """
+    Yield ``(row_number, data, error)`` for each CSV record after the header.
+    """
+    reader = csv.DictReader(lines)
+    try:
+        for record in reader:
+            # Drop empty optional cells so serializer defaults apply
+            yield reader.line_num, {key: value for key, value in record.items() if key and value != ""}, None
+    except csv.Error as exc:
+        yield reader.line_num, None, {"non_field_errors": [f"Malformed CSV: {exc}"]}
+
+
+def iter_ndjson_rows(lines):
+    """
+    Yield ``(row_number, data, error)`` for each non-blank NDJSON line.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield number, None, {"non_field_errors": [f"Invalid JSON: {exc}"]}
+            continue
+        if not isinstance(data, dict):
+            yield number, None, {"non_field_errors": ["Each line must be a JSON object."]}
+            continue
+        yield number, data, None
+
+
+def iter_rows(byte_lines, file_format):
+    lines = decode_lines(byte_lines)
+    if file_format == "csv":
+        return iter_csv_rows(lines)
+    return iter_ndjson_rows(lines)
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+
+class ProductImporter:
+    """
+    Streams rows into ``Product`` in chunks of ``batch_size``.
+
+    Each chunk is validated row by row, categories are resolved through one
+    slug -> id map loaded up front, slugs are allocated for the whole chunk at
+    once and the valid rows are written with a single ``bulk_create``. The
+    product list cache is invalidated once, after the last chunk.
+    """
+
+    def __init__(self, vendor, batch_size=None, max_errors=None):
+        config = getattr(settings, "PRODUCT_IMPORT", {})
+        self.vendor = vendor
+        self.batch_size = batch_size or config.get("BATCH_SIZE", 1000)
+        self.max_errors = max_errors or config.get("MAX_REPORTED_ERRORS", 100)
+        self.categories = dict(Category.objects.values_list("slug", "id"))
+
+    def run(self, rows):
+        result = ImportResult()
+        rows = iter(rows)
+        try:
+            while True:
+                chunk = list(islice(rows, self.batch_size))
+                if not chunk:
+                    break
+                self.import_chunk(chunk, result)
+        finally:
+            if result.created:
+                product_list_cache.invalidate()
+        return result
+
+    def import_chunk(self, chunk, result):
+        products = []
+        for number, data, error in chunk:
+            if error is None:
+                product, error = self.build_product(data)
+            if error is not None:
+                self.add_error(result, number, error)
+                continue
+            products.append(product)
+        if products:
+            self.write(products)
+            result.created += len(products)
+
+    def build_product(self, data):
+        serializer = ProductImportRowSerializer(data=data)
+        if not serializer.is_valid():
+            return None, serializer.errors
+        values = serializer.validated_data
+        category_slug = values.pop("category")
+        category_id = None
+        if category_slug:
+            category_id = self.categories.get(category_slug)
+            if category_id is None:
+                return None, {"category": [f"Unknown category '{category_slug}'."]}
+        return Product(vendor=self.vendor, category_id=category_id, **values), None
+
+    def write(self, products, attempts=3):
+        for attempt in range(attempts):
+            for product, slug in zip(products, allocate_slugs(Product, [p.title for p in products])):
+                product.slug = slug
+            try:
+                with transaction.atomic():
+                    return Product.objects.bulk_create(products, batch_size=self.batch_size)
+            except IntegrityError:
+                # Another writer claimed one of the slugs; reallocate the chunk
+                if attempt == attempts - 1:
+                    raise
+                for product in products:
+                    product.pk = None
+                    product._state.adding = True
+
+    def add_error(self, result, number, errors):
+        result.failed += 1
+        if len(result.errors) < self.max_errors:
+            result.errors.append({"row": number, "errors": errors})
@@ -0,0 +1,101 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from agrosphere.benchmark import measure, report
+from products.facets import FacetEngine
+from products.models import Category, Product, Review
+
+User = get_user_model()
+
+
+def legacy_facets(queryset):
+    """
+    The multi-query implementation ProductFacetsView used before FacetEngine.
+    """
+    categories = list(
+        queryset
+        .values("category__name", "category__slug")
+        .annotate(count=Count("id"))
+        .order_by("-count")
+    )
+    price_buckets = {
+        "0-50": queryset.filter(price__gte=0, price__lte=50).count(),
+        "51-100": queryset.filter(price__gt=50, price__lte=100).count(),
+        "101-500": queryset.filter(price__gt=100, price__lte=500).count(),
+        "500+": queryset.filter(price__gt=500).count(),
+    }
+    rating_buckets = {}
+    for rating in range(1, 6):
+        count = queryset.annotate(avg_rating=Avg("reviews__rating")).filter(avg_rating__gte=rating).count()
+        rating_buckets[f"{rating}_stars_and_up"] = count
+    return {"categories": categories, "price_ranges": price_buckets, "ratings": rating_buckets}
+
+
+class Command(BaseCommand):
+    help = "Benchmark FacetEngine against the legacy multi-query facets on a synthetic catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1_000_000)
+        parser.add_argument("--categories", type=int, default=25)
+        parser.add_argument("--reviewers", type=int, default=5, help="Maximum reviews per product.")
+        parser.add_argument("--review-ratio", type=float, default=0.3, help="Share of products with reviews.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded rows instead of rolling back.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options)
+            queryset = Product.objects.filter(available=True)
+            legacy = measure("legacy (10 queries)", lambda: legacy_facets(queryset), repeat=options["repeat"])
+            engine = measure("FacetEngine", lambda: FacetEngine().compute(queryset), repeat=options["repeat"])
+            report(self.stdout, [legacy, engine], baseline=legacy)
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def seed(self, options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        reviewers = [
+            User.objects.create_user(email=f"bench-reviewer-{i}@example.com")
+            for i in range(options["reviewers"])
+        ]
+        vendor = reviewers[0]
+        categories = Category.objects.bulk_create(
+            Category(name=f"Bench category {i}", slug=f"bench-category-{i}")
+            for i in range(options["categories"])
+        )
+
+        created = 0
+        while created < options["products"]:
+            size = min(batch_size, options["products"] - created)
+            products, reviews = [], []
+            for i in range(size):
+                product = Product(
+                    vendor=vendor,
+                    category=rng.choice(categories),
+                    title=f"Bench product {created + i}",
+                    slug=f"bench-product-{created + i}",
+                    price=Decimal(rng.randint(100, 100_000)) / 100,
+                    available=rng.random() > 0.05,
+                )
+                if rng.random() < options["review_ratio"]:
+                    for user in rng.sample(reviewers, rng.randint(1, len(reviewers))):
+                        rating = rng.randint(1, 5)
+                        reviews.append(Review(product=product, user=user, rating=rating))
+                        # bulk_create skips the review signals, so fill the aggregates here
+                        product.review_count += 1
+                        product.rating_sum += rating
+                        setattr(product, f"rating_{rating}_count", getattr(product, f"rating_{rating}_count") + 1)
+                    product.rating_avg = product.rating_sum / product.review_count
+                products.append(product)
+            Product.objects.bulk_create(products)
+            Review.objects.bulk_create(reviews, batch_size=batch_size)
+            created += size
+        self.stdout.write(f"Seeded {created} products across {len(categories)} categories.")
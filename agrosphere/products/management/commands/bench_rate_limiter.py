@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from agrosphere import throttling
+from agrosphere.benchmark import measure, report
+
+
+class PingView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = []
+    throttle_scope = "bench"
+
+    def get(self, request):
+        return Response({"ok": True})
+
+
+class ThrottledPingView(PingView):
+    throttle_classes = [throttling.TokenBucketThrottle]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the per-request overhead of the token-bucket rate limiter."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5_000, help="Requests per timed run.")
+        parser.add_argument("--clients", type=int, default=100, help="Distinct client IPs (buckets).")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--redis-url", help="Also benchmark RedisTokenBuckets against this server.")
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = [
+            factory.get("/bench/", REMOTE_ADDR=f"10.0.{i // 256 % 256}.{i % 256}")
+            for i in range(options["clients"])
+        ]
+        count = options["requests"]
+
+        def run(view):
+            def call():
+                for i in range(count):
+                    view(requests[i % len(requests)])
+            return call
+
+        backends = [("local buckets", "agrosphere.throttling.LocalTokenBuckets", {})]
+        if options["redis_url"]:
+            backends.append(("redis buckets", "agrosphere.throttling.RedisTokenBuckets", {"url": options["redis_url"]}))
+
+        plain = measure("no throttle", run(PingView.as_view()), repeat=options["repeat"], operations=count)
+        results = [plain]
+        for name, backend, backend_options in backends:
+            limits = {
+                "ENABLED": True,
+                "BACKEND": backend,
+                "OPTIONS": backend_options,
+                # Never runs dry, so every request pays for a full take()
+                "SCOPES": {"bench": {"anon": (f"{count * 100}/s", count * 100)}},
+            }
+            with override_settings(RATE_LIMITS=limits):
+                results.append(
+                    measure(name, run(ThrottledPingView.as_view()), repeat=options["repeat"], operations=count)
+                )
+        report(self.stdout, results)
+        for result in results[1:]:
+            overhead = result.per_operation - plain.per_operation
+            self.stdout.write(f"{result.name} overhead per request: {overhead * 1_000_000:.1f} us")
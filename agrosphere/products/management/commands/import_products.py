@@ -0,0 +1,44 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importers import FORMATS, ProductImporter, iter_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Bulk import products from a CSV or NDJSON file ('-' reads stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--vendor", required=True, help="Email of the vendor that owns the products.")
+        parser.add_argument("--format", dest="file_format", choices=FORMATS)
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            vendor = User.objects.get(email=options["vendor"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['vendor']}.")
+
+        path = options["path"]
+        file_format = options["file_format"] or path.rsplit(".", 1)[-1].lower()
+        if file_format == "jsonl":
+            file_format = "ndjson"
+        if file_format not in FORMATS:
+            raise CommandError("Cannot infer the format from the file name; pass --format.")
+
+        importer = ProductImporter(vendor=vendor, batch_size=options["batch_size"])
+        if path == "-":
+            result = importer.run(iter_rows(sys.stdin.buffer, file_format))
+        else:
+            with open(path, "rb") as source:
+                result = importer.run(iter_rows(source, file_format))
+
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f"... {result.failed - len(result.errors)} more row error(s) not shown")
+        self.stdout.write(self.style.SUCCESS(f"Imported {result.created} product(s), {result.failed} row(s) failed."))
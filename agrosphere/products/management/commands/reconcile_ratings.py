@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from products.ratings import reconcile_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized product rating aggregates from reviews and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without writing.")
+
+    def handle(self, *args, **options):
+        fixed = reconcile_ratings(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        verb = "would be fixed" if options["dry_run"] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} product(s) with drifted ratings {verb}."))
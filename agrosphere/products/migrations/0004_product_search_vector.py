@@ -0,0 +1,131 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:05
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    CREATE FUNCTION products_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(
+                (SELECT name FROM products_category WHERE id = NEW.category_id), ''
+            )), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER products_product_search_vector
+    BEFORE INSERT OR UPDATE OF title, description, category_id ON products_product
+    FOR EACH ROW EXECUTE FUNCTION products_product_search_vector_update();
+    """,
+    """
+    CREATE FUNCTION products_category_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        -- Touching title re-fires the product trigger with the new category name
+        UPDATE products_product SET title = title WHERE category_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER products_category_search_vector
+    AFTER UPDATE OF name ON products_category
+    FOR EACH ROW EXECUTE FUNCTION products_category_search_vector_update();
+    """,
+    "UPDATE products_product SET title = title;",
+    "CREATE INDEX products_product_search_vector_gin ON products_product USING gin (search_vector);",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS products_product_search_vector_gin;",
+    "DROP TRIGGER IF EXISTS products_category_search_vector ON products_category;",
+    "DROP FUNCTION IF EXISTS products_category_search_vector_update();",
+    "DROP TRIGGER IF EXISTS products_product_search_vector ON products_product;",
+    "DROP FUNCTION IF EXISTS products_product_search_vector_update();",
+]
+
+FTS5_ROW = """
+    INSERT INTO products_product_fts (rowid, title, category, description)
+    VALUES (
+        NEW.id, NEW.title,
+        coalesce((SELECT name FROM products_category WHERE id = NEW.category_id), ''),
+        NEW.description
+    );
+"""
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE products_product_fts
+    USING fts5(title, category, description, tokenize = 'porter unicode61');
+    """,
+    f"""
+    CREATE TRIGGER products_product_fts_insert AFTER INSERT ON products_product
+    BEGIN {FTS5_ROW} END;
+    """,
+    f"""
+    CREATE TRIGGER products_product_fts_update
+    AFTER UPDATE OF title, description, category_id ON products_product
+    BEGIN
+        DELETE FROM products_product_fts WHERE rowid = OLD.id;
+        {FTS5_ROW}
+    END;
+    """,
+    """
+    CREATE TRIGGER products_product_fts_delete AFTER DELETE ON products_product
+    BEGIN
+        DELETE FROM products_product_fts WHERE rowid = OLD.id;
+    END;
+    """,
+    """
+    CREATE TRIGGER products_category_fts_update AFTER UPDATE OF name ON products_category
+    BEGIN
+        UPDATE products_product_fts SET category = NEW.name
+        WHERE rowid IN (SELECT id FROM products_product WHERE category_id = NEW.id);
+    END;
+    """,
+    """
+    INSERT INTO products_product_fts (rowid, title, category, description)
+    SELECT p.id, p.title, coalesce(c.name, ''), p.description
+    FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id;
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS products_category_fts_update;",
+    "DROP TRIGGER IF EXISTS products_product_fts_delete;",
+    "DROP TRIGGER IF EXISTS products_product_fts_update;",
+    "DROP TRIGGER IF EXISTS products_product_fts_insert;",
+    "DROP TABLE IF EXISTS products_product_fts;",
+]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {"postgresql": postgres, "sqlite": sqlite}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_product_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_keyset_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="products_pr_created_e6f9fc_idx",
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(condition=models.Q(("available", True)), fields=["-created_at", "-id"], name="product_avail_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(condition=models.Q(("available", True)), fields=["category", "price"], name="product_avail_cat_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["vendor", "-created_at"], name="product_vendor_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(fields=["product", "-created_at", "-id"], name="review_product_created_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:11
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(django.db.models.functions.text.Lower("slug"), name="category_slug_lower_idx"),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
-from django.utils.text import slugify
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models.functions import Lower
 from django.utils import timezone
 
+from .slugs import save_with_unique_slug
+
 User = get_user_model()
 
 class Category(models.Model):
@@ -15,11 +18,15 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
+        indexes = [
+            # Case-insensitive category filter (see ProductFilter.filter_category)
+            models.Index(Lower("slug"), name="category_slug_lower_idx"),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        return save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -38,25 +45,46 @@ class Product(models.Model):
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
-    # Optionally: add fields for stock, SKU, ratings, images, etc.
+
+    # Denormalized review aggregates, kept in sync by products.ratings
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(null=True, blank=True)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
+    # Weighted title/category/description vector, maintained by a database
+    # trigger and GIN-indexed on PostgreSQL (migration 0004, products.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Optionally: add fields for stock, SKU, images, etc.
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['slug']),
             models.Index(fields=['title']),
+            models.Index(fields=['rating_avg']),
+            # Hot paths: public listings only ever read available products
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(available=True),
+                name='product_avail_created_idx',
+            ),
+            models.Index(
+                fields=['category', 'price'],
+                condition=models.Q(available=True),
+                name='product_avail_cat_price_idx',
+            ),
+            models.Index(fields=['vendor', '-created_at'], name='product_vendor_created_idx'),
         ]
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            slug = base_slug
-            i = 1
-            while Product.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{i}"
-                i += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        return save_with_unique_slug(self, self.title, super().save, *args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -64,6 +92,10 @@ class Product(models.Model):
     def get_absolute_url(self):
         return reverse("products:product_detail", kwargs={"slug": self.slug})
 
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f"rating_{star}_count") for star in range(1, 6)}
+
 
 class Review(models.Model):
     product = models.ForeignKey(Product, related_name="reviews", on_delete=models.CASCADE)
@@ -78,6 +110,18 @@ class Review(models.Model):
     class Meta:
         unique_together = ("product", "user")  # One review per user per product
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),  # keyset pagination
+            models.Index(fields=["product", "-created_at", "-id"], name="review_product_created_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so edits can be applied as deltas
+        if "product_id" in field_names and "rating" in field_names:
+            instance._stored_rating = (instance.product_id, instance.rating)
+        return instance
 
     def __str__(self):
         return f"Review {self.rating} by {self.user.email} on {self.product.title}"
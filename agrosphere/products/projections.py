@@ -0,0 +1,11 @@
+from agrosphere.projections import Projection
+
+from .serializers import ProductSerializer
+
+
+class ProductProjection(Projection):
+    """
+    ``ProductSerializer`` output built from a ``.values()`` row.
+    """
+    serializer_class = ProductSerializer
+    string_fields = {"vendor": "vendor__email"}  # User.__str__ is the email
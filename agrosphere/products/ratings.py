@@ -0,0 +1,90 @@
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, NullIf
+
+from .models import Product, Review
+
+STARS = range(1, 6)
+
+
+def apply_rating_delta(product_id, added=None, removed=None):
+    """
+    Adjust a product's denormalized rating columns for one review rating
+    being added and/or removed, in a single UPDATE built from F-expressions
+    so concurrent reviews never overwrite each other.
+    """
+    if added == removed:
+        return
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+
+    updates = {
+        "review_count": F("review_count") + count_delta,
+        "rating_sum": F("rating_sum") + sum_delta,
+        # UPDATE evaluates against the old row, so repeat the deltas here
+        "rating_avg": Cast(F("rating_sum") + sum_delta, FloatField())
+        / NullIf(F("review_count") + count_delta, 0),
+    }
+    if added is not None:
+        updates[f"rating_{added}_count"] = F(f"rating_{added}_count") + 1
+    if removed is not None:
+        updates[f"rating_{removed}_count"] = F(f"rating_{removed}_count") - 1
+    Product.objects.filter(pk=product_id).update(**updates)
+
+
+def compute_rating_aggregates(product_ids):
+    """
+    Recompute the rating columns for ``product_ids`` from Review rows.
+    """
+    rows = (
+        Review.objects.filter(product_id__in=product_ids)
+        .order_by()
+        .values("product_id")
+        .annotate(
+            review_count=Count("id"),
+            rating_sum=Sum("rating"),
+            **{f"rating_{star}_count": Count("id", filter=Q(rating=star)) for star in STARS},
+        )
+    )
+    aggregates = {row.pop("product_id"): row for row in rows}
+    empty = {"review_count": 0, "rating_sum": 0, **{f"rating_{star}_count": 0 for star in STARS}}
+    for product_id in product_ids:
+        values = aggregates.setdefault(product_id, dict(empty))
+        values["rating_avg"] = values["rating_sum"] / values["review_count"] if values["review_count"] else None
+    return aggregates
+
+
+RATING_FIELDS = ["review_count", "rating_sum", "rating_avg", *(f"rating_{star}_count" for star in STARS)]
+
+
+def reconcile_ratings(batch_size=1000, dry_run=False):
+    """
+    Compare the denormalized columns against Review rows in batches of
+    products and rewrite any that drifted. Returns the number of products fixed.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        products = list(
+            Product.objects.filter(pk__gt=last_id).order_by("pk").only("pk", *RATING_FIELDS)[:batch_size]
+        )
+        if not products:
+            return fixed
+        last_id = products[-1].pk
+        aggregates = compute_rating_aggregates([product.pk for product in products])
+
+        drifted = []
+        for product in products:
+            expected = aggregates[product.pk]
+            if any(not _same(getattr(product, name), expected[name]) for name in RATING_FIELDS):
+                for name in RATING_FIELDS:
+                    setattr(product, name, expected[name])
+                drifted.append(product)
+        if drifted and not dry_run:
+            Product.objects.bulk_update(drifted, RATING_FIELDS)
+        fixed += len(drifted)
+
+
+def _same(current, expected):
+    if current is None or expected is None:
+        return current is expected
+    return abs(current - expected) < 1e-9
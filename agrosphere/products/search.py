@@ -0,0 +1,99 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+# Text search configuration used by the PostgreSQL trigger in migration 0004
+SEARCH_CONFIG = "english"
+# Column weights, title > category > description
+FTS5_WEIGHTS = (10.0, 4.0, 1.0)
+FTS5_TABLE = "products_product_fts"
+
+
+class PostgresSearchBackend:
+    """
+    Matches against the trigger-maintained, GIN-indexed ``search_vector``
+    column and ranks with ``ts_rank`` over its A/B/C weights.
+    """
+
+    def search(self, queryset, terms):
+        query = SearchQuery(" ".join(terms), search_type="websearch", config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        )
+
+
+class SQLiteSearchBackend:
+    """
+    Matches against the trigger-maintained FTS5 table and ranks with bm25.
+    """
+
+    def search(self, queryset, terms):
+        # Quote every term so user input can never be parsed as FTS5 syntax
+        match = " ".join('"%s"' % term.replace('"', '""') for term in terms)
+        table = queryset.model._meta.db_table
+        weights = ", ".join(str(weight) for weight in FTS5_WEIGHTS)
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS5_TABLE} WHERE {FTS5_TABLE} MATCH %s", [match])
+        ).annotate(
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS5_TABLE}, {weights}) FROM {FTS5_TABLE} "
+                f'WHERE {FTS5_TABLE} MATCH %s AND rowid = "{table}"."id"',
+                [match],
+                output_field=FloatField(),
+            )
+        )
+
+
+class LikeSearchBackend:
+    """
+    Unranked substring matching for databases without a full-text backend.
+    """
+
+    fields = ["title", "description", "category__name"]
+
+    def search(self, queryset, terms):
+        for term in terms:
+            condition = Q()
+            for field in self.fields:
+                condition |= Q(**{f"{field}__icontains": term})
+            queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=Value(0.0))
+
+
+def get_search_backend():
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite":
+        return SQLiteSearchBackend()
+    return LikeSearchBackend()
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search over product title, category name and description.
+
+    Drop-in replacement for DRF's ``SearchFilter`` that reads the same
+    ``?search=`` parameter. List it after ``OrderingFilter``: results are
+    ordered by relevance unless the client asked for an explicit ordering.
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def get_search_terms(self, request):
+        value = request.query_params.get(self.search_param, "")
+        return re.findall(r"\w+", value)
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        queryset = get_search_backend().search(queryset, terms)
+        if not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by("-search_rank", *queryset.query.order_by)
+        return queryset
@@ -1,15 +1,15 @@
 from rest_framework import serializers
+from agrosphere.fieldsets import SparseFieldsetMixin
 from .models import Product, Category, Review
-from django.db.models import Avg
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "slug", "description"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(),
@@ -38,13 +38,8 @@ class ProductSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "slug", "created_at", "updated_at", "vendor")
 
     def create(self, validated_data):
-        # vendor set by view from request.user
-        category = validated_data.pop("category", None)
-        product = Product.objects.create(**validated_data)
-        if category:
-            product.category = category
-            product.save()
-        return product
+        # vendor set by view from request.user; category (if any) saved in the same insert
+        return Product.objects.create(**validated_data)
 
     def update(self, instance, validated_data):
         category = validated_data.pop("category", None)
@@ -56,18 +51,27 @@ class ProductSerializer(serializers.ModelSerializer):
         return instance
     
     def get_average_rating(self, obj):
-        avg = obj.reviews.aggregate(avg=Avg("rating"))["avg"]
-        return round(avg, 2) if avg is not None else None
+        return round(obj.rating_avg, 2) if obj.rating_avg is not None else None
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)  # Show email or username
 
     class Meta:
         model = Review
         fields = ["id", "product", "user", "rating", "comment", "created_at", "updated_at"]
         read_only_fields = ["id", "user", "created_at", "updated_at"]
+        # ?expand=product replaces the product id with the full product
+        expandable_fields = {"product": (ProductSerializer, {"read_only": True})}
 
     def validate_rating(self, value):
         if not 1 <= value <= 5:
             raise serializers.ValidationError("Rating must be between 1 and 5.")
-        return value
\ No newline at end of file
+        return value
+
+
+class ProductImportParamsSerializer(serializers.Serializer):
+    """
+    Query parameters of the product import endpoint.
+    """
+
+    batch_size = serializers.IntegerField(min_value=1, max_value=10_000, required=False)
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import product_list_cache
+from .models import Product, Review
+from .ratings import apply_rating_delta
+
+
+@receiver(pre_save, sender=Review)
+def remember_stored_rating(sender, instance: Review, **kwargs):
+    # Reviews loaded through the ORM already carry this (see Review.from_db)
+    if not instance._state.adding and not hasattr(instance, "_stored_rating"):
+        stored = Review.objects.filter(pk=instance.pk).values_list("product_id", "rating").first()
+        if stored is not None:
+            instance._stored_rating = stored
+
+
+@receiver(post_save, sender=Review)
+def track_review_save(sender, instance: Review, created: bool, **kwargs):
+    stored = getattr(instance, "_stored_rating", None)
+    if created or stored is None:
+        apply_rating_delta(instance.product_id, added=instance.rating)
+    elif stored[0] == instance.product_id:
+        apply_rating_delta(instance.product_id, added=instance.rating, removed=stored[1])
+    else:
+        apply_rating_delta(stored[0], removed=stored[1])
+        apply_rating_delta(instance.product_id, added=instance.rating)
+    instance._stored_rating = (instance.product_id, instance.rating)
+    product_list_cache.invalidate()
+
+
+@receiver(post_delete, sender=Review)
+def track_review_delete(sender, instance: Review, origin=None, **kwargs):
+    if isinstance(origin, Product):
+        return  # The product row is being deleted along with its reviews
+    product_id, rating = getattr(instance, "_stored_rating", (instance.product_id, instance.rating))
+    apply_rating_delta(product_id, removed=rating)
+    product_list_cache.invalidate()
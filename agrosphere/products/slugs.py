@@ -0,0 +1,89 @@
+import re
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Count, Max, Q
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+SUFFIX_ROOM = 11  # "-" plus up to ten digits
+BATCH_QUERY_SIZE = 200
+
+
+def base_slug(model, value, field="slug"):
+    max_length = model._meta.get_field(field).max_length - SUFFIX_ROOM
+    return slugify(value)[:max_length].strip("-") or model._meta.model_name
+
+
+def allocate_slug(model, value, field="slug"):
+    """
+    Return a free slug for ``value``: the plain slug if unused, otherwise the
+    base slug with one more than the highest numeric suffix in use. Resolved
+    with a single aggregate over the ``base`` / ``base-*`` prefix range.
+    """
+    base = base_slug(model, value, field)
+    state = model._default_manager.filter(
+        Q(**{field: base}) | Q(**{f"{field}__startswith": f"{base}-"})
+    ).aggregate(
+        base_taken=Count("pk", filter=Q(**{field: base})),
+        max_suffix=Max(
+            Cast(Substr(field, len(base) + 2), BigIntegerField()),
+            filter=Q(**{f"{field}__regex": rf"^{base}-[0-9]+$"}),
+        ),
+    )
+    if not state["base_taken"]:
+        return base
+    return f"{base}-{(state['max_suffix'] or 0) + 1}"
+
+
+def allocate_slugs(model, values, field="slug"):
+    """
+    Batch variant of ``allocate_slug``: returns one unique slug per value,
+    unique against the table and against each other, with one query per
+    ``BATCH_QUERY_SIZE`` distinct base slugs.
+    """
+    bases = [base_slug(model, value, field) for value in values]
+    distinct = list(dict.fromkeys(bases))
+    taken = set()
+    max_suffix = defaultdict(int)
+
+    for start in range(0, len(distinct), BATCH_QUERY_SIZE):
+        chunk = distinct[start:start + BATCH_QUERY_SIZE]
+        lookup = set(chunk)
+        pattern = rf"^({'|'.join(re.escape(base) for base in chunk)})-[0-9]+$"
+        existing = model._default_manager.filter(
+            Q(**{f"{field}__in": chunk}) | Q(**{f"{field}__regex": pattern})
+        ).values_list(field, flat=True)
+        for slug in existing.iterator():
+            taken.add(slug)
+            prefix, _, suffix = slug.rpartition("-")
+            if prefix in lookup and suffix.isdigit():
+                max_suffix[prefix] = max(max_suffix[prefix], int(suffix))
+
+    slugs = []
+    for base in bases:
+        slug = base
+        while slug in taken:
+            max_suffix[base] += 1
+            slug = f"{base}-{max_suffix[base]}"
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def save_with_unique_slug(instance, value, save, *args, field="slug", attempts=5, **kwargs):
+    """
+    Allocate a slug for ``instance`` and call ``save``, allocating again if a
+    concurrent writer claimed the same slug first.
+    """
+    model = type(instance)
+    for attempt in range(attempts):
+        setattr(instance, field, allocate_slug(model, value, field))
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            clashed = model._default_manager.filter(**{field: getattr(instance, field)}).exists()
+            if not clashed or attempt == attempts - 1:
+                setattr(instance, field, "")
+                raise
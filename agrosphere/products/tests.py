@@ -1,9 +1,37 @@
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 
-from .models import Product, Category
+from agrosphere import throttling
+from agrosphere.queryplans import QueryPlanCapture
+
+from .cache import product_list_cache
+from .management.commands.bench_facets import legacy_facets
+from .models import Product, Category, Review
+from .projections import ProductProjection
+from .serializers import ProductSerializer
+from .slugs import allocate_slug, allocate_slugs
 
 User = get_user_model()
 
@@ -25,7 +53,7 @@ class ProductAPITests(APITestCase):
         url = reverse("products:products-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(len(response.data) >= 1)
+        self.assertTrue(len(response.data["results"]) >= 1)
 
     def test_create_product(self):
         url = reverse("products:products-list")
@@ -43,7 +71,7 @@ class ProductAPITests(APITestCase):
         url = reverse("products:products-list") + "?category=electronics"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(any(p["category"]["slug"] == "electronics" for p in response.data))
+        self.assertTrue(any(p["category"]["slug"] == "electronics" for p in response.data["results"]))
 
     def test_update_product(self):
         url = reverse("products:products-detail", args=[self.product.id])
@@ -62,3 +90,691 @@ class ProductAPITests(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Product.objects.filter(id=self.product.id).exists())
+
+
+class ProductListCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="cache@example.com", password="pass1234")
+        self.fruits = Category.objects.create(name="Fruits")
+        self.grains = Category.objects.create(name="Grains")
+        Product.objects.create(vendor=self.user, category=self.fruits, title="Mango", price=10)
+        Product.objects.create(vendor=self.user, category=self.grains, title="Maize", price=20)
+        self.url = reverse("product-list-create")
+
+    def titles(self, response):
+        return sorted(p["title"] for p in response.data["results"])
+
+    def test_cache_is_keyed_on_query(self):
+        self.assertEqual(self.titles(self.client.get(self.url, {"category": "fruits"})), ["Mango"])
+        self.assertEqual(self.titles(self.client.get(self.url, {"category": "grains"})), ["Maize"])
+
+    def test_parameter_order_shares_entry(self):
+        first = product_list_cache.make_key(QueryDict("category=fruits&ordering=price"))
+        second = product_list_cache.make_key(QueryDict("ordering=price&category=fruits"))
+        self.assertEqual(first, second)
+
+    def test_repeat_request_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_create_invalidates_listing(self):
+        self.assertEqual(len(self.client.get(self.url).data["results"]), 2)
+        self.client.force_authenticate(user=self.user)
+        self.client.post(self.url, {"title": "Beans", "price": 5}, format="json")
+        self.assertEqual(len(self.client.get(self.url).data["results"]), 3)
+
+    def test_stale_entry_served_while_another_caller_revalidates(self):
+        params = QueryDict("")
+        key = product_list_cache.make_key(params)
+        cache.set(key, (time.time() - 1, ["stale"]), 60)
+        cache.add(f"{key}:lock", 1, 10)
+        computed = []
+        self.assertEqual(product_list_cache.get_or_set(params, lambda: computed.append(1)), ["stale"])
+        self.assertEqual(computed, [])
+
+    def test_cold_key_computed_once_under_concurrency(self):
+        params = QueryDict("search=maize")
+        calls = []
+        gate = threading.Event()
+
+        def compute():
+            calls.append(1)
+            gate.wait(1)
+            return ["fresh"]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(product_list_cache.get_or_set(params, compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        gate.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["fresh"]] * 8)
+
+
+class ProductFacetsTests(APITestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(email="facets@example.com", password="pass1234")
+        self.reviewer = User.objects.create_user(email="reviewer@example.com", password="pass1234")
+        self.fruits = Category.objects.create(name="Fruits")
+        self.grains = Category.objects.create(name="Grains")
+        mango = Product.objects.create(vendor=self.vendor, category=self.fruits, title="Mango", price=30)
+        Product.objects.create(vendor=self.vendor, category=self.fruits, title="Avocado", price=75)
+        maize = Product.objects.create(vendor=self.vendor, category=self.grains, title="Maize", price=600)
+        Product.objects.create(vendor=self.vendor, category=self.grains, title="Rice", price=200, available=False)
+        Review.objects.create(product=mango, user=self.vendor, rating=5)
+        Review.objects.create(product=mango, user=self.reviewer, rating=4)
+        Review.objects.create(product=maize, user=self.reviewer, rating=2)
+        self.url = reverse("product-facets")
+
+    def test_facets_match_legacy_implementation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, legacy_facets(Product.objects.filter(available=True)))
+        self.assertEqual(response.data["price_ranges"], {"0-50": 1, "51-100": 1, "101-500": 0, "500+": 1})
+        self.assertEqual(response.data["ratings"]["4_stars_and_up"], 1)
+
+    def test_facets_computed_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_facets_apply_listing_filters(self):
+        response = self.client.get(self.url, {"category": "fruits"})
+        self.assertEqual([c["category__slug"] for c in response.data["categories"]], ["fruits"])
+        self.assertEqual(sum(response.data["price_ranges"].values()), 2)
+
+    def test_category_filter_ignores_case(self):
+        Category.objects.filter(pk=self.grains.pk).update(slug="Whole-Grains")
+        for value in ("whole-grains", "WHOLE-GRAINS", "Whole-Grains"):
+            response = self.client.get(self.url, {"category": value})
+            self.assertEqual(sum(response.data["price_ranges"].values()), 1, value)
+
+    @override_settings(PRODUCT_FACETS={"PRICE_RANGES": {"cheap": {"lt": 100}, "dear": {"gte": 100}}, "RATING_THRESHOLDS": [3]})
+    def test_buckets_come_from_settings(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["price_ranges"], {"cheap": 2, "dear": 1})
+        self.assertEqual(response.data["ratings"], {"3_stars_and_up": 1})
+
+
+class ProductRatingAggregateTests(APITestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(email="ratings@example.com", password="pass1234")
+        self.alice = User.objects.create_user(email="alice@example.com", password="pass1234")
+        self.bob = User.objects.create_user(email="bob@example.com", password="pass1234")
+        self.product = Product.objects.create(vendor=self.vendor, title="Cassava", price=10)
+
+    def assertAggregates(self, product, count, total, avg, histogram):
+        product.refresh_from_db()
+        self.assertEqual(product.review_count, count)
+        self.assertEqual(product.rating_sum, total)
+        if avg is None:
+            self.assertIsNone(product.rating_avg)
+        else:
+            self.assertAlmostEqual(product.rating_avg, avg)
+        self.assertEqual(product.rating_histogram, histogram)
+
+    def test_create_edit_delete_keep_aggregates_in_sync(self):
+        review = Review.objects.create(product=self.product, user=self.alice, rating=5)
+        Review.objects.create(product=self.product, user=self.bob, rating=2)
+        self.assertAggregates(self.product, 2, 7, 3.5, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 4
+        review.save()
+        self.assertAggregates(self.product, 2, 6, 3.0, {1: 0, 2: 1, 3: 0, 4: 1, 5: 0})
+
+        review.delete()
+        Review.objects.filter(user=self.bob).get().delete()
+        self.assertAggregates(self.product, 0, 0, None, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+    def test_moving_review_to_another_product(self):
+        other = Product.objects.create(vendor=self.vendor, title="Yam", price=12)
+        review = Review.objects.create(product=self.product, user=self.alice, rating=3)
+        review.product = other
+        review.save()
+        self.assertAggregates(self.product, 0, 0, None, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+        self.assertAggregates(other, 1, 3, 3.0, {1: 0, 2: 0, 3: 1, 4: 0, 5: 0})
+
+    def test_min_rating_filter_uses_column(self):
+        Review.objects.create(product=self.product, user=self.alice, rating=4)
+        Product.objects.create(vendor=self.vendor, title="Sorghum", price=8)
+        response = self.client.get(reverse("product-list-create"), {"min_rating": 4})
+        self.assertEqual([p["title"] for p in response.data["results"]], ["Cassava"])
+
+    def test_reconcile_fixes_drift(self):
+        Review.objects.create(product=self.product, user=self.alice, rating=5)
+        Product.objects.filter(pk=self.product.pk).update(review_count=9, rating_avg=1.0)
+        out = StringIO()
+        call_command("reconcile_ratings", stdout=out)
+        self.assertIn("1 product(s)", out.getvalue())
+        self.assertAggregates(self.product, 1, 5, 5.0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(email="search@example.com", password="pass1234")
+        self.grains = Category.objects.create(name="Grains")
+        Product.objects.create(vendor=self.vendor, title="Yellow maize", price=10, description="Dried cobs")
+        Product.objects.create(vendor=self.vendor, title="Maize flour", price=12)
+        Product.objects.create(vendor=self.vendor, title="Chicken feed", price=9, description="Contains maize bran")
+        self.rice = Product.objects.create(vendor=self.vendor, title="Rice", price=15, category=self.grains)
+        self.url = reverse("product-list-create")
+
+    def search(self, term, **params):
+        return [p["title"] for p in self.client.get(self.url, {"search": term, **params}).data["results"]]
+
+    def test_title_matches_rank_above_description_matches(self):
+        titles = self.search("maize")
+        self.assertEqual(set(titles), {"Yellow maize", "Maize flour", "Chicken feed"})
+        self.assertEqual(titles[-1], "Chicken feed")
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self.search("maize flour"), ["Maize flour"])
+
+    def test_category_name_is_searchable(self):
+        self.assertEqual(self.search("grains"), ["Rice"])
+
+    def test_index_follows_product_and_category_updates(self):
+        self.rice.title = "Basmati"
+        self.rice.save()
+        self.assertEqual(self.search("basmati"), ["Basmati"])
+        self.grains.name = "Cereals"
+        self.grains.save()
+        self.assertEqual(self.search("cereals"), ["Basmati"])
+        self.assertEqual(self.search("grains"), [])
+
+    def test_explicit_ordering_overrides_relevance(self):
+        self.assertEqual(self.search("maize", ordering="price"), ["Chicken feed", "Yellow maize", "Maize flour"])
+
+    def test_facets_follow_search(self):
+        response = self.client.get(reverse("product-facets"), {"search": "maize"})
+        self.assertEqual(sum(c["count"] for c in response.data["categories"]), 3)
+
+    def test_ranked_results_paginate(self):
+        response = self.client.get(self.url, {"search": "maize", "page_size": 1})
+        seen = []
+        while response.data["next"]:
+            seen.extend(p["title"] for p in response.data["results"])
+            response = self.client.get(response.data["next"])
+        seen.extend(p["title"] for p in response.data["results"])
+        self.assertEqual(seen, self.search("maize"))
+
+    def test_query_syntax_is_not_interpreted(self):
+        response = self.client.get(self.url, {"search": 'maize" OR NEAR(*'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProductPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(email="pages@example.com", password="pass1234")
+        self.reviewer = User.objects.create_user(email="pager@example.com", password="pass1234")
+        now = timezone.now()
+        self.products = [
+            Product.objects.create(
+                vendor=self.vendor,
+                title=f"Product {i:02d}",
+                price=[5, 10, 10, 10, 20][i % 5],
+                created_at=now - timedelta(minutes=i // 3),  # shared timestamps
+            )
+            for i in range(23)
+        ]
+        for product in self.products[:6]:
+            Review.objects.create(product=product, user=self.reviewer, rating=product.pk % 5 + 1)
+        self.url = reverse("product-list-create")
+
+    def walk(self, url, params=None):
+        seen = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(p["id"] for p in response.data["results"])
+            if not response.data["next"]:
+                return seen
+            response = self.client.get(response.data["next"])
+
+    def test_default_ordering_pages_through_every_product_once(self):
+        seen = self.walk(self.url, {"page_size": 5})
+        expected = list(
+            Product.objects.filter(available=True).order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_pages_stay_stable_on_non_unique_ordering(self):
+        for ordering in ["price", "-price", "title", "rating_avg", "-rating_avg"]:
+            seen = self.walk(self.url, {"page_size": 4, "ordering": ordering})
+            self.assertEqual(sorted(seen), sorted(p.pk for p in self.products), ordering)
+            self.assertEqual(len(seen), len(set(seen)), ordering)
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get(self.url, {"page_size": 5, "ordering": "price"})
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+
+    def test_pages_do_not_count(self):
+        first = self.client.get(self.url, {"page_size": 5})
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(first.data["next"])
+        self.assertEqual(len(context), 1)
+        self.assertNotIn("COUNT(", context.captured_queries[0]["sql"].upper())
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_cursor_values_are_rejected(self):
+        for values in (["notadate", 1], [{"a": 1}, 1], [timezone.now().isoformat(), "x"], [1]):
+            token = base64.urlsafe_b64encode(json.dumps({"v": values}).encode()).decode()
+            response = self.client.get(self.url, {"cursor": token})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, values)
+        token = base64.urlsafe_b64encode(json.dumps({"v": ["cheap", 1]}).encode()).decode()
+        response = self.client.get(self.url, {"cursor": token, "ordering": "price"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SlugAllocationTests(APITestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(email="slugs@example.com", password="pass1234")
+
+    def create(self, title, **kwargs):
+        return Product.objects.create(vendor=self.vendor, title=title, price=1, **kwargs)
+
+    def test_suffixes_increment(self):
+        slugs = [self.create("Maize").slug for _ in range(3)]
+        self.assertEqual(slugs, ["maize", "maize-1", "maize-2"])
+
+    def test_allocation_is_one_query_regardless_of_collisions(self):
+        for _ in range(5):
+            self.create("Maize")
+        self.create("Maize Red")  # shares the prefix but is not a numeric suffix
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Product, "Maize"), "maize-5")
+
+    def test_free_base_is_reused(self):
+        first = self.create("Beans")
+        self.create("Beans")
+        first.delete()
+        self.assertEqual(self.create("Beans").slug, "beans")
+
+    def test_retries_when_a_concurrent_save_claims_the_slug(self):
+        self.create("Millet")
+        with mock.patch("products.slugs.allocate_slug", side_effect=["millet", "millet-1"]) as allocate:
+            product = self.create("Millet")
+        self.assertEqual(product.slug, "millet-1")
+        self.assertEqual(allocate.call_count, 2)
+
+    def test_batch_allocation(self):
+        self.create("Maize")
+        self.create("Maize 1")
+        titles = ["Maize", "Maize", "Maize 1", "Sorghum", "Sorghum", "!!!"]
+        with self.assertNumQueries(1):
+            slugs = allocate_slugs(Product, titles)
+        self.assertEqual(slugs, ["maize-2", "maize-3", "maize-1-1", "sorghum", "sorghum-1", "product"])
+
+    def test_category_uses_allocator(self):
+        Category.objects.create(name="Fruits")
+        self.assertEqual(Category.objects.create(name="Fruits!").slug, "fruits-1")
+
+
+class ProductImportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(email="importer@example.com", password="pass1234")
+        self.grains = Category.objects.create(name="Grains")
+        self.client.force_authenticate(user=self.vendor)
+        self.url = reverse("product-import")
+
+    def test_csv_body_import(self):
+        body = (
+            "title,price,category,description,available\n"
+            "Maize,10.50,grains,,true\n"
+            "Maize,11,,White maize,false\n"
+            "Beans,abc,,,\n"
+            "Rice,5,unknown,,\n"
+        )
+        response = self.client.generic("POST", self.url, body, content_type="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([e["row"] for e in response.data["errors"]], [4, 5])
+        self.assertIn("category", response.data["errors"][1]["errors"])
+        maize = Product.objects.filter(title="Maize").order_by("slug")
+        self.assertEqual([p.slug for p in maize], ["maize", "maize-1"])
+        self.assertEqual(maize[0].category, self.grains)
+        self.assertFalse(maize[1].available)
+
+    def test_ndjson_multipart_upload(self):
+        upload = SimpleUploadedFile(
+            "catalog.ndjson",
+            b'{"title": "Sorghum", "price": "7.25"}\n\nnot json\n{"title": "Millet", "price": 3}\n',
+        )
+        response = self.client.post(self.url, {"file": upload}, format="multipart")
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["errors"][0]["row"], 3)
+        self.assertTrue(Product.objects.filter(title="Millet", vendor=self.vendor).exists())
+
+    def test_queries_are_per_batch_not_per_row(self):
+        body = "title,price\n" + "".join(f"Product {i},{i}\n" for i in range(50))
+        with CaptureQueriesContext(connection) as context:
+            self.client.generic("POST", self.url + "?batch_size=25", body, content_type="text/csv")
+        inserts = [q for q in context.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(Product.objects.count(), 50)
+        self.assertEqual(len(inserts), 2)
+        self.assertLess(len(context), 20)
+
+    def test_import_holds_its_idempotency_claim_for_long_runs(self):
+        with mock.patch("agrosphere.idempotency.cache.add", wraps=cache.add) as add:
+            self.client.generic(
+                "POST", self.url, "title,price\nA,1\n", content_type="text/csv", HTTP_IDEMPOTENCY_KEY="import-1"
+            )
+        timeouts = [call.args[2] for call in add.call_args_list if call.args[0].startswith("idempotency:")]
+        self.assertEqual(timeouts, [30 * 60])
+
+    def test_listing_cache_invalidated_once(self):
+        with mock.patch.object(product_list_cache, "invalidate") as invalidate:
+            self.client.generic("POST", self.url, "title,price\nA,1\nB,2\n", content_type="text/csv")
+        invalidate.assert_called_once()
+
+    def test_unknown_format_rejected(self):
+        response = self.client.generic("POST", self.url, "x", content_type="application/octet-stream")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_batch_size_rejected(self):
+        for batch_size in ("abc", "0", "-5"):
+            response = self.client.generic(
+                "POST", f"{self.url}?batch_size={batch_size}", "title,price\nA,1\n", content_type="text/csv"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("batch_size", response.data)
+        self.assertFalse(Product.objects.exists())
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as source:
+            source.write("title,price,category\nTeff,4,grains\n")
+        self.addCleanup(os.remove, source.name)
+        out = StringIO()
+        call_command("import_products", source.name, vendor=self.vendor.email, stdout=out)
+        self.assertIn("Imported 1 product(s)", out.getvalue())
+        self.assertEqual(Product.objects.get(title="Teff").category, self.grains)
+
+
+class ProductProjectionContractTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(email="projection@example.com", password="pass1234")
+        category = Category.objects.create(name="Tubers", description="Roots & tubers")
+        Product.objects.create(vendor=self.vendor, category=category, title="Cassava", price="12.50", description="Fresh")
+        Product.objects.create(vendor=self.vendor, title="Loose", price=3)
+
+    def test_projection_matches_serializer_bytes(self):
+        queryset = Product.objects.select_related("category", "vendor").order_by("pk")
+        expected = JSONRenderer().render(ProductSerializer(queryset, many=True).data)
+        projection = ProductProjection()
+        actual = JSONRenderer().render(projection.render(list(projection.values(queryset))))
+        self.assertEqual(actual, expected)
+
+    def test_endpoints_match_serializer_path(self):
+        product = Product.objects.get(title="Cassava")
+        urls = [
+            reverse("product-list-create"),
+            reverse("product-list-create") + "?ordering=price",
+            reverse("product-detail", args=[product.pk]),
+        ]
+        for url in urls:
+            fast = self.client.get(url)
+            cache.clear()
+            with override_settings(READ_PROJECTIONS=False):
+                slow = self.client.get(url)
+            cache.clear()
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content, url)
+
+    def test_missing_product_is_404(self):
+        response = self.client.get(reverse("product-detail", args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProductConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(email="etag-vendor@example.com", password="pass1234")
+        self.category = Category.objects.create(name="Fertilizers")
+        self.product = Product.objects.create(
+            vendor=self.vendor, category=self.category, title="Compost", price=12
+        )
+        self.detail_url = reverse("product-detail", args=[self.product.id])
+        self.list_url = reverse("product-list-create")
+
+    def test_detail_if_none_match(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        self.product.price = 15
+        self.product.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["price"], "15.00")
+
+    def test_detail_if_modified_since(self):
+        last_modified = self.client.get(self.detail_url)["Last-Modified"]
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_changes_with_category(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.category.name = "Organic Fertilizers"
+        self.category.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_modified_skips_queries(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+
+    def test_list_etag_follows_cache_generation(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+
+        self.assertEqual(
+            self.client.get(self.list_url + "?ordering=price", HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_200_OK,
+        )
+        product_list_cache.invalidate()
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_when_the_entry_is_rebuilt(self):
+        etag = self.client.get(self.list_url)["ETag"]
+        # Bypasses the view, so the generation is not bumped
+        Product.objects.filter(pk=self.product.pk).update(price=99)
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with mock.patch("products.cache.time.time", return_value=time.time() + 301):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["price"], "99.00")
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class ProductQueryPlanTests(APITestCase):
+    """
+    EXPLAIN every query the hot product endpoints run and fail on
+    sequential scans of the product, category or review tables.
+    """
+
+    tables = {"products_product", "products_category", "products_review"}
+
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(email="plan-vendor@example.com", password="pass1234")
+        self.category = Category.objects.create(name="Irrigation")
+        self.product = Product.objects.create(vendor=self.vendor, category=self.category, title="Drip line", price=30)
+        Review.objects.create(product=self.product, user=self.vendor, rating=4)
+        self.client.force_authenticate(user=self.vendor)
+
+    def assertNoSequentialScans(self, url, params=None):
+        with QueryPlanCapture(connection) as capture:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(capture.scans(self.tables), {})
+
+    def test_product_list(self):
+        self.assertNoSequentialScans(reverse("product-list-create"))
+
+    def test_product_list_next_page(self):
+        Product.objects.create(vendor=self.vendor, title="Sprinkler", price=10)
+        first = self.client.get(reverse("product-list-create"), {"page_size": 1})
+        cache.clear()
+        self.assertNoSequentialScans(first.data["next"])
+
+    def test_product_list_by_category_and_price(self):
+        self.assertNoSequentialScans(
+            reverse("product-list-create"), {"category": "irrigation", "price_min": 10, "price_max": 50}
+        )
+
+    def test_product_detail(self):
+        self.assertNoSequentialScans(reverse("product-detail", args=[self.product.id]))
+
+    def test_reviews_for_product(self):
+        self.assertNoSequentialScans(reverse("review-list-create"), {"product": self.product.id})
+
+    def test_vendor_products(self):
+        queryset = Product.objects.filter(vendor=self.vendor).order_by("-created_at")
+        with QueryPlanCapture(connection) as capture:
+            list(queryset)
+        self.assertEqual(capture.scans(self.tables), {})
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="sparse-reviewer@example.com", password="pass1234")
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name="Herbs")
+        self.product = Product.objects.create(
+            title="Basil", price=2, category=self.category, vendor=self.user, description="Sweet basil"
+        )
+        Review.objects.create(product=self.product, user=self.user, rating=5, comment="Fragrant")
+
+    def test_product_fields_limit_columns(self):
+        with override_settings(READ_PROJECTIONS=False), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("product-list-create") + "?fields=id,title,category.name")
+        self.assertEqual(response.data["results"], [
+            {"id": self.product.id, "category": {"name": "Herbs"}, "title": "Basil"},
+        ])
+        sql = queries[-1]["sql"]
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn("users_user", sql)
+
+    def test_review_product_is_expandable(self):
+        url = reverse("review-list-create")
+        self.assertEqual(self.client.get(url).data["results"][0]["product"], self.product.id)
+
+        review = self.client.get(url + "?expand=product").data["results"][0]
+        self.assertEqual(review["product"]["title"], "Basil")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + "?fields=rating")
+        self.assertEqual(response.data["results"], [{"rating": 5}])
+        self.assertNotIn('"comment"', queries[-1]["sql"])
+
+    def test_expand_keeps_writable_product_on_create(self):
+        other = Product.objects.create(title="Mint", price=1, vendor=self.user)
+        response = self.client.post(
+            reverse("review-list-create") + "?expand=product",
+            {"product": other.id, "rating": 4, "comment": "Fresh"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["product"], other.id)
+
+
+RATE_LIMITS = {
+    "ENABLED": True,
+    "BACKEND": "agrosphere.throttling.LocalTokenBuckets",
+    "OPTIONS": {},
+    "SCOPES": {
+        "search": {"anon": ("6/min", 2), "user": ("60/min", 5)},
+        "browse": {"anon": ("60/min", 3)},
+    },
+}
+
+
+@override_settings(RATE_LIMITS=RATE_LIMITS)
+class RateLimitTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        throttling.reset_buckets(setting="RATE_LIMITS")
+        self.user = User.objects.create_user(email="scraper@example.com", password="pass1234")
+        self.buckets = throttling.get_buckets()
+        self.now = self.buckets.clock()
+        patcher = mock.patch.object(self.buckets, "clock", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, **extra):
+        return self.client.get(reverse("product-facets"), extra.pop("params", {}), **extra)
+
+    def test_empty_bucket_answers_429_with_retry_after(self):
+        self.assertEqual([self.search().status_code for _ in range(3)], [200, 200, 429])
+        response = self.search()
+        # One token per 10 seconds
+        self.assertEqual(response["Retry-After"], "10")
+
+        self.now += 10
+        self.assertEqual(self.search().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.search().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_buckets_are_per_identity_and_endpoint_class(self):
+        for _ in range(2):
+            self.search()
+        self.assertEqual(self.search().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Another IP, a signed-in user and another endpoint class have their own buckets
+        self.assertEqual(self.search(REMOTE_ADDR="10.0.0.9").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse("product-list-create")).status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual([self.search().status_code for _ in range(6)], [200] * 5 + [429])
+
+    def test_spoofed_forwarded_for_does_not_reset_the_bucket(self):
+        spoofed = [self.search(HTTP_X_FORWARDED_FOR=f"203.0.113.{n}").status_code for n in range(3)]
+        self.assertEqual(spoofed, [200, 200, 429])
+
+        # Behind one proxy only the address it appended counts
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            forwarded = [
+                self.search(HTTP_X_FORWARDED_FOR=f"203.0.113.{n}, 198.51.100.7").status_code for n in range(3)
+            ]
+        self.assertEqual(forwarded, [200, 200, 429])
+
+    def test_product_search_counts_as_search(self):
+        url = reverse("product-list-create")
+        self.assertEqual([self.client.get(url, {"search": "seeds"}).status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+
+    def test_unreachable_redis_lets_requests_through(self):
+        buckets = throttling.RedisTokenBuckets(url="redis://127.0.0.1:1/3")
+        with self.assertLogs("agrosphere.throttling", "WARNING"):
+            self.assertEqual(buckets.take("search:anon:1", 1.0, 1), (True, 0.0))
+        # Backs off instead of hitting Redis again
+        with mock.patch.object(buckets, "script") as script:
+            self.assertEqual(buckets.take("search:anon:1", 1.0, 1), (True, 0.0))
+        script.assert_not_called()
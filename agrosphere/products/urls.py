@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import ProductListCreateView, ProductRetrieveUpdateDestroyView, ReviewListCreateView
+from .views import ProductListCreateView, ProductRetrieveUpdateDestroyView, ReviewListCreateView, ProductFacetsView, ProductImportView
 
 urlpatterns = [
     path("", ProductListCreateView.as_view(), name="product-list-create"),
     path("<int:pk>/", ProductRetrieveUpdateDestroyView.as_view(), name="product-detail"),
     path("reviews/", ReviewListCreateView.as_view(), name="review-list-create"),
+    path("facets/", ProductFacetsView.as_view(), name="product-facets"),
+    path("import/", ProductImportView.as_view(), name="product-import"),
 ]
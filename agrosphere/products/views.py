@@ -1,15 +1,26 @@
-from rest_framework import generics, permissions, filters as drf_filters
+from rest_framework import generics, permissions, status, filters as drf_filters
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.core.cache import cache
 from rest_framework.response import Response
-from django.db.models import Count, Avg
 
 from .models import Product, Review
-from .serializers import ProductSerializer, ReviewSerializer
+from .serializers import ProductImportParamsSerializer, ProductSerializer, ReviewSerializer
 from .filters import ProductFilter
-
-
-class ProductListCreateView(generics.ListCreateAPIView):
+from .cache import product_list_cache
+from .facets import FacetEngine
+from .search import ProductSearchFilter
+from .importers import CONTENT_TYPES, FORMATS, ProductImporter, iter_rows
+from .projections import ProductProjection
+from agrosphere.conditional import ConditionalGetMixin
+from agrosphere.fieldsets import SparseQuerysetMixin
+from agrosphere.idempotency import IdempotencyMixin
+from agrosphere.projections import ProjectionMixin
+
+
+class ProductListCreateView(
+    IdempotencyMixin, ConditionalGetMixin, ProjectionMixin, SparseQuerysetMixin,
+    generics.ListCreateAPIView,
+):
     """
     GET: List products with filtering, searching, ordering, and caching.
     POST: Create a new product.
@@ -17,28 +28,44 @@ class ProductListCreateView(generics.ListCreateAPIView):
 
     queryset = Product.objects.filter(available=True).select_related("category", "vendor")
     serializer_class = ProductSerializer
+    projection_class = ProductProjection
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-    filter_backends = [DjangoFilterBackend, drf_filters.SearchFilter, drf_filters.OrderingFilter]
+    # ProductSearchFilter goes last so relevance ordering wins unless ?ordering= is given
+    filter_backends = [DjangoFilterBackend, drf_filters.OrderingFilter, ProductSearchFilter]
     filterset_class = ProductFilter
-    search_fields = ["title", "description", "category__name"]
-    ordering_fields = ["price", "created_at", "title"]
+    ordering_fields = ["price", "created_at", "title", "rating_avg"]
     ordering = ["-created_at"]
 
+    def get_throttle_scope(self):
+        # Full-text queries cost more than plain listing
+        return "search" if self.request.query_params.get(ProductSearchFilter.search_param) else "browse"
+
     def perform_create(self, serializer):
         serializer.save(vendor=self.request.user)
-        cache.delete("product_list")
+        product_list_cache.invalidate()
 
     def list(self, request, *args, **kwargs):
-        cache_key = "product_list"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-        response = super().list(request, *args, **kwargs)
-        cache.set(cache_key, response.data, 300)  # cache serialized data for 5 minutes
-        return response
-
-class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+        # Cached per normalized query string; see products.cache for invalidation.
+        return Response(product_list_cache.get_or_set(request.query_params, self.compute_page))
+
+    def compute_page(self):
+        return super().list(self.request, *self.args, **self.kwargs).data
+
+    def get_validators(self):
+        # The body is whatever entry is cached: it changes when the generation
+        # is bumped and whenever the entry is rebuilt, so writes that bypass
+        # invalidation still show up once the entry goes stale. Serving it
+        # first rebuilds a stale or missing entry.
+        params = self.request.query_params
+        product_list_cache.get_or_set(params, self.compute_page)
+        version = product_list_cache.version(params)
+        return None if version is None else ((version,), None)
+
+class ProductRetrieveUpdateDestroyView(
+    IdempotencyMixin, ConditionalGetMixin, ProjectionMixin, SparseQuerysetMixin,
+    generics.RetrieveUpdateDestroyAPIView,
+):
     """
     GET: Retrieve product details.
     PUT/PATCH: Update product.
@@ -47,22 +74,86 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
     queryset = Product.objects.filter(available=True).select_related("category", "vendor")
     serializer_class = ProductSerializer
+    projection_class = ProductProjection
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    throttle_scope = "browse"
+
+    def get_validators(self):
+        row = (
+            self.get_queryset()
+            .filter(pk=self.kwargs["pk"])
+            .values_list("updated_at", "vendor__email", "category_id", "category__name",
+                         "category__slug", "category__description")
+            .first()
+        )
+        if row is None:
+            return None
+        return row, row[0]
 
     def perform_update(self, serializer):
         serializer.save()
-        cache.delete("product_list")
+        product_list_cache.invalidate()
 
     def perform_destroy(self, instance):
         instance.delete()
-        cache.delete("product_list")
+        product_list_cache.invalidate()
+
+class ProductImportView(IdempotencyMixin, generics.GenericAPIView):
+    """
+    POST: Bulk import products for the authenticated vendor.
+
+    Accepts a CSV or NDJSON body (Content-Type text/csv or
+    application/x-ndjson) or a multipart upload in the ``file`` field.
+    Rows are streamed, validated and inserted in batches; the response
+    reports created rows and row-level errors.
+    """
 
-class ReviewListCreateView(generics.ListCreateAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    # Large files take minutes; a retry must not start a second import meanwhile
+    idempotency_lock_timeout = 30 * 60
+
+    def post(self, request, *args, **kwargs):
+        params = ProductImportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        byte_lines, file_format = self.get_source(request)
+        importer = ProductImporter(vendor=request.user, batch_size=params.validated_data.get("batch_size"))
+        result = importer.run(iter_rows(byte_lines, file_format))
+        if result.failed and not result.created:
+            return Response(result.as_dict(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK)
+
+    def get_idempotency_fingerprint(self, request):
+        # Hashing the body would buffer the whole upload
+        return f"{request.content_type}:{request.META.get('CONTENT_LENGTH')}:{request.query_params.urlencode()}"
+
+    def get_source(self, request):
+        requested = request.query_params.get("file_format")
+        content_type = request.content_type.split(";")[0].strip().lower()
+        if content_type.startswith("multipart/"):
+            upload = request.FILES.get("file")
+            if upload is None:
+                raise ValidationError({"file": ["No file was submitted."]})
+            detected = CONTENT_TYPES.get(upload.content_type) or upload.name.rsplit(".", 1)[-1].lower()
+            source = upload
+        else:
+            detected = CONTENT_TYPES.get(content_type)
+            # Read the raw body line by line instead of letting a parser buffer it
+            source = request.stream or []
+        file_format = requested or detected
+        if file_format == "jsonl":
+            file_format = "ndjson"
+        if file_format not in FORMATS:
+            raise ValidationError({"file_format": [f"Expected one of: {', '.join(FORMATS)}."]})
+        return source, file_format
+
+
+class ReviewListCreateView(IdempotencyMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     """
     List reviews (optionally filtered by product) and create new reviews.
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "browse"
 
     def get_queryset(self):
         product_id = self.request.query_params.get("product")
@@ -75,12 +166,15 @@ class ReviewListCreateView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class ReviewRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewRetrieveUpdateDestroyView(
+    IdempotencyMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     Retrieve, update, or delete a review.
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "browse"
 
     def get_queryset(self):
         # Only allow users to access their own reviews or implement a permission class for this
@@ -89,32 +183,14 @@ class ReviewRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 class ProductFacetsView(generics.GenericAPIView):
     """
     Returns facet counts for categories, price ranges, average rating buckets.
+    Accepts the same filters as the product listing so counts match it.
     """
 
-    def get(self, request, *args, **kwargs):
-        available_products = Product.objects.filter(available=True)
-
-        categories = (
-            available_products
-            .values("category__name", "category__slug")
-            .annotate(count=Count("id"))
-            .order_by("-count")
-        )
+    queryset = Product.objects.filter(available=True)
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter]
+    filterset_class = ProductFilter
+    throttle_scope = "search"
 
-        price_buckets = {
-            "0-50": available_products.filter(price__gte=0, price__lte=50).count(),
-            "51-100": available_products.filter(price__gt=50, price__lte=100).count(),
-            "101-500": available_products.filter(price__gt=100, price__lte=500).count(),
-            "500+": available_products.filter(price__gt=500).count(),
-        }
-
-        rating_buckets = {}
-        for rating in range(1, 6):
-            count = available_products.annotate(avg_rating=Avg("reviews__rating")).filter(avg_rating__gte=rating).count()
-            rating_buckets[f"{rating}_stars_and_up"] = count
-
-        return Response({
-            "categories": list(categories),
-            "price_ranges": price_buckets,
-            "ratings": rating_buckets,
-        })
\ No newline at end of file
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(FacetEngine().compute(queryset))
@@ -0,0 +1,177 @@
+"""
+JWT authentication that resolves users from a cache instead of the database.
+
+``CachedJWTAuthentication`` keeps the columns of recently seen users in a
+small in-process cache (``LOCAL_TTL`` seconds) backed by the shared Django
+cache (``SHARED_TTL`` seconds), so the ``users_user`` lookup disappears from
+most authenticated reads. Unsafe requests always load the user from the
+database, so writes never act on stale flags. Saving or deleting a user
+drops both cache entries in this process and the shared entry for every
+other process; other processes notice within ``LOCAL_TTL``. Changes that
+bypass signals (``QuerySet.update()``) are picked up within
+``LOCAL_TTL + SHARED_TTL``.
+
+With ``STATELESS_READS`` on, safe requests to views that set
+``stateless_authentication = True`` trust the signed ``STATELESS_CLAIMS``
+of the token and touch neither the cache nor the database; such views see
+flag changes only when the token is reissued.
+
+Every request also checks the token against the revocation store (see
+users.revocation), stateless ones included.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+from .revocation import token_revoked
+
+DEFAULTS = {
+    "LOCAL_TTL": 5,
+    "SHARED_TTL": 60,
+    "LOCAL_MAX_ENTRIES": 10000,
+    "STATELESS_READS": False,
+}
+
+# Claims added to issued tokens (see users.serializers.TokenObtainPairSerializer)
+STATELESS_CLAIMS = ("is_staff", "is_superuser", "is_vendor")
+
+# Never cache the password hash; the token revocation check keeps a digest of it
+CACHED_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != "password"]
+REVOKE_KEY = "password_digest"
+
+
+def option(name):
+    return getattr(settings, "AUTH_USER_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def build_user(values):
+    """
+    Instantiate a ``User`` as if loaded from the database with only the
+    columns in ``values``; other columns load lazily on first access.
+    """
+    names = [name for name in CACHED_FIELDS if name in values]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+class UserCache:
+    """
+    Two-level cache of user columns keyed on the user id: a per-process dict
+    in front of the shared cache.
+    """
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self.local = {}
+        self.lock = threading.Lock()
+
+    def key(self, user_id):
+        return f"users:auth:{user_id}"
+
+    def get(self, user_id):
+        entry = self.local.get(user_id)
+        if entry is not None and entry[0] > self.clock():
+            return entry[1]
+        values = cache.get(self.key(user_id))
+        if values is None:
+            values = User.objects.filter(pk=user_id).values(*CACHED_FIELDS, "password").first()
+            if values is None:
+                return None
+            values[REVOKE_KEY] = get_md5_hash_password(values.pop("password"))
+            cache.set(self.key(user_id), values, option("SHARED_TTL"))
+        self.remember(user_id, values)
+        return values
+
+    def remember(self, user_id, values):
+        with self.lock:
+            if len(self.local) >= option("LOCAL_MAX_ENTRIES"):
+                now = self.clock()
+                self.local = {pk: entry for pk, entry in self.local.items() if entry[0] > now}
+                if len(self.local) >= option("LOCAL_MAX_ENTRIES"):
+                    self.local.pop(next(iter(self.local)))
+            self.local[user_id] = (self.clock() + option("LOCAL_TTL"), values)
+
+    def invalidate(self, user_id):
+        self.local.pop(user_id, None)
+        cache.delete(self.key(user_id))
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` resolving users of safe requests through
+    ``user_cache`` (or, for opted-in views, from the token claims).
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method not in SAFE_METHODS:
+            return self.get_user(validated_token), validated_token
+        if self.stateless(request, validated_token):
+            return self.get_claims_user(validated_token), validated_token
+        return self.get_cached_user(validated_token), validated_token
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if token_revoked(validated_token):
+            raise InvalidToken(_("Token has been revoked"))
+        return validated_token
+
+    def user_id(self, validated_token):
+        # The claim is a string; normalize it so cache keys match instance.pk
+        try:
+            return User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError) as exc:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from exc
+
+    def stateless(self, request, validated_token):
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        return (
+            option("STATELESS_READS")
+            and getattr(view, "stateless_authentication", False)
+            and all(claim in validated_token for claim in STATELESS_CLAIMS)
+        )
+
+    def get_cached_user(self, validated_token):
+        values = user_cache.get(self.user_id(validated_token))
+        if values is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not values["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != values[REVOKE_KEY]:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return build_user(values)
+
+    def get_claims_user(self, validated_token):
+        values = {claim: bool(validated_token[claim]) for claim in STATELESS_CLAIMS}
+        return build_user({"id": self.user_id(validated_token), "is_active": True, **values})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    # Again after commit, in case a concurrent read cached the old row meanwhile
+    transaction.on_commit(lambda: user_cache.invalidate(instance.pk))
@@ -0,0 +1,92 @@
+"""
+Argon2 password hashing with tuned parameters and a cap on concurrent work.
+
+``BoundedArgon2PasswordHasher`` takes its cost parameters from
+``settings.PASSWORD_HASHING`` (tune them with ``manage.py
+tune_password_hasher``) and runs every hash and verification while holding
+one of ``MAX_CONCURRENCY`` slots of this process. A burst of sign-ins
+therefore queues for the slots instead of taking every core from the
+other requests; callers that cannot get a slot within ``ACQUIRE_TIMEOUT``
+seconds fail with ``503`` and ``Retry-After``.
+
+The algorithm name stays ``argon2``, so Django's ``check_password``
+transparently rehashes on login both hashes from older hashers (PBKDF2)
+and Argon2 hashes with outdated parameters.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    "TIME_COST": 2,
+    "MEMORY_COST": 65536,   # KiB
+    "PARALLELISM": 1,       # lanes per hash; the slots bound the cores used
+    "MAX_CONCURRENCY": 2,
+    "ACQUIRE_TIMEOUT": 5,
+}
+
+
+def option(name):
+    return getattr(settings, "PASSWORD_HASHING", {}).get(name, DEFAULTS[name])
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-ins in progress, please retry shortly."
+    default_code = "password_hashing_busy"
+    wait = 1  # rendered as Retry-After
+
+
+class HashingSlots:
+    """
+    Per-process semaphore sized by ``MAX_CONCURRENCY`` (re-created when the
+    setting changes).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.size = None
+        self.semaphore = None
+
+    @contextmanager
+    def held(self):
+        size = option("MAX_CONCURRENCY")
+        with self.lock:
+            if size != self.size:
+                self.semaphore, self.size = threading.BoundedSemaphore(size), size
+            semaphore = self.semaphore
+        if not semaphore.acquire(timeout=option("ACQUIRE_TIMEOUT")):
+            raise PasswordHashingBusy()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+hashing_slots = HashingSlots()
+
+
+class BoundedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return option("TIME_COST")
+
+    @property
+    def memory_cost(self):
+        return option("MEMORY_COST")
+
+    @property
+    def parallelism(self):
+        return option("PARALLELISM")
+
+    def encode(self, password, salt):
+        with hashing_slots.held():
+            return super().encode(password, salt)
+
+    def verify(self, password, encoded):
+        with hashing_slots.held():
+            return super().verify(password, encoded)
@@ -0,0 +1,93 @@
+import threading
+import time
+
+from argon2 import PasswordHasher
+from django.core.management.base import BaseCommand
+
+from agrosphere.benchmark import measure, report
+from users.hashers import option
+
+
+class Command(BaseCommand):
+    help = (
+        "Time Argon2 on this machine and recommend PASSWORD_HASHING costs: the largest memory "
+        "cost that fits the memory budget at MAX_CONCURRENCY parallel hashes, then the largest "
+        "time cost that keeps one hash under the target latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target-ms", type=float, default=100, help="Longest acceptable single hash.")
+        parser.add_argument(
+            "--memory", default="19,32,46,64,128", help="Candidate memory costs in MiB, comma-separated."
+        )
+        parser.add_argument("--memory-budget", type=int, default=512, help="MiB available to concurrent hashes.")
+        parser.add_argument("--concurrency", type=int, default=None, help="Defaults to MAX_CONCURRENCY.")
+        parser.add_argument("--parallelism", type=int, default=None)
+        parser.add_argument("--max-time-cost", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        target = options["target_ms"] / 1000
+        concurrency = options["concurrency"] or option("MAX_CONCURRENCY")
+        parallelism = options["parallelism"] or option("PARALLELISM")
+        candidates = sorted((int(value) for value in options["memory"].split(",")), reverse=True)
+        affordable = [mib for mib in candidates if mib * concurrency <= options["memory_budget"]]
+        if not affordable:
+            self.stderr.write("No candidate memory cost fits the budget at this concurrency.")
+            return
+
+        chosen = None
+        for mib in affordable:
+            results = []
+            for time_cost in range(1, options["max_time_cost"] + 1):
+                hasher = PasswordHasher(time_cost=time_cost, memory_cost=mib * 1024, parallelism=parallelism)
+                result = measure(f"m={mib}MiB t={time_cost}", lambda: hasher.hash("correct horse"), repeat=options["repeat"])
+                results.append(result)
+                if result.median > target:
+                    break
+                chosen = (mib, time_cost, result)
+            report(self.stdout, results)
+            if chosen is not None:
+                break
+        if chosen is None:
+            self.stderr.write(f"Even the cheapest candidate takes longer than {options['target_ms']} ms.")
+            return
+
+        mib, time_cost, result = chosen
+        hasher = PasswordHasher(time_cost=time_cost, memory_cost=mib * 1024, parallelism=parallelism)
+        throughput = self.throughput(hasher, concurrency, options["repeat"] * concurrency)
+        self.stdout.write(
+            f"\nm={mib}MiB t={time_cost} p={parallelism}: {result.median * 1000:.1f} ms per hash, "
+            f"{throughput:.1f} hashes/s with {concurrency} slots, "
+            f"{mib * concurrency} MiB at full concurrency."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "PASSWORD_HASHING = {\n"
+            f"    'TIME_COST': {time_cost},\n"
+            f"    'MEMORY_COST': {mib * 1024},\n"
+            f"    'PARALLELISM': {parallelism},\n"
+            f"    'MAX_CONCURRENCY': {concurrency},\n"
+            "}"
+        ))
+
+    def throughput(self, hasher, concurrency, total):
+        """
+        Hashes per second with ``concurrency`` threads hashing ``total`` passwords.
+        """
+        remaining = iter(range(total))
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                hasher.hash("correct horse")
+
+        threads = [threading.Thread(target=work) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return total / (time.perf_counter() - start)
@@ -66,6 +66,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = _("user")
         verbose_name_plural = _("users")
+        indexes = [
+            models.Index(fields=["-date_joined", "-id"]),  # keyset pagination
+        ]
 
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip()
@@ -10,3 +10,11 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         return obj == request.user or request.user.is_staff
+
+
+class IsVendor(permissions.BasePermission):
+    """
+    Only authenticated users flagged as vendors.
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and request.user.is_vendor)
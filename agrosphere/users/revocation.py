@@ -0,0 +1,152 @@
+"""
+Token revocation store.
+
+Revoked tokens are recorded by ``jti`` with a TTL equal to their remaining
+lifetime, so the store only ever holds tokens that could still be used.
+"Sign out everywhere" bumps a per-user generation number instead of
+listing tokens: every issued token carries the generation current at
+issue time (``GENERATION_CLAIM``) and is rejected once the user's
+generation moves past it. Generations never expire: refreshed tokens keep
+the generation of the sign-in they descend from, so a lapsed counter would
+start over and let revoked sessions back in; it costs one integer per user
+who ever signed out everywhere. ``token_revoked`` answers both questions with one
+round trip (``MGET`` on Redis) and runs on every authentication.
+
+``RedisRevocationStore`` is shared by all processes; ``LocalRevocationStore``
+is a per-process stand-in for tests and development.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.settings import api_settings
+
+GENERATION_CLAIM = "gen"
+
+DEFAULTS = {
+    "BACKEND": "users.revocation.RedisRevocationStore",
+    "OPTIONS": {},
+}
+
+
+def option(name):
+    return getattr(settings, "TOKEN_REVOCATION", {}).get(name, DEFAULTS[name])
+
+
+class RedisRevocationStore:
+    def __init__(self, url="redis://localhost:6379/2", prefix="auth:revoked"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def jti_key(self, jti):
+        return f"{self.prefix}:jti:{jti}"
+
+    def generation_key(self, user_id):
+        return f"{self.prefix}:generation:{user_id}"
+
+    def check(self, jti, user_id):
+        """
+        ``(revoked, generation)`` for the token ``jti`` of ``user_id``.
+        """
+        revoked, generation = self.client.mget(self.jti_key(jti), self.generation_key(user_id))
+        return revoked is not None, int(generation or 0)
+
+    def generation(self, user_id):
+        return int(self.client.get(self.generation_key(user_id)) or 0)
+
+    def revoke(self, jti, ttl):
+        """
+        Revoke ``jti`` for ``ttl`` seconds; False if it already was.
+        """
+        return bool(self.client.set(self.jti_key(jti), 1, ex=max(int(ttl), 1), nx=True))
+
+    def revoke_all(self, user_id):
+        return self.client.incr(self.generation_key(user_id))
+
+
+class LocalRevocationStore:
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.generations = {}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            return None
+        return entry[1]
+
+    def check(self, jti, user_id):
+        return self.get(("jti", jti)) is not None, self.generation(user_id)
+
+    def generation(self, user_id):
+        return self.generations.get(user_id, 0)
+
+    def revoke(self, jti, ttl):
+        with self.lock:
+            if self.get(("jti", jti)) is not None:
+                return False
+            self.entries[("jti", jti)] = (self.clock() + max(ttl, 1), True)
+            return True
+
+    def revoke_all(self, user_id):
+        with self.lock:
+            generation = self.generations[user_id] = self.generation(user_id) + 1
+            return generation
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = import_string(option("BACKEND"))(**option("OPTIONS"))
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting, **kwargs):
+    global _store
+    if setting == "TOKEN_REVOCATION":
+        _store = None
+
+
+def remaining_lifetime(token):
+    return token["exp"] - time.time()
+
+
+def token_revoked(token):
+    """
+    True if ``token`` (a validated simplejwt token) was revoked on its own
+    or by a later "sign out everywhere".
+    """
+    revoked, generation = get_store().check(
+        token[api_settings.JTI_CLAIM], token.get(api_settings.USER_ID_CLAIM)
+    )
+    return revoked or token.get(GENERATION_CLAIM, 0) < generation
+
+
+def revoke_token(token):
+    """
+    Revoke ``token`` until it expires; False if it already was revoked.
+    """
+    return get_store().revoke(token[api_settings.JTI_CLAIM], remaining_lifetime(token))
+
+
+def revoke_user_tokens(user_id):
+    """
+    Revoke every token issued to ``user_id`` so far.
+    """
+    return get_store().revoke_all(str(user_id))
+
+
+def current_generation(user_id):
+    return get_store().generation(str(user_id))
@@ -1,12 +1,20 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, password_validation
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from agrosphere.fieldsets import SparseFieldsetMixin
+from .revocation import GENERATION_CLAIM, current_generation, revoke_token, token_revoked
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Basic user representation for read operations."""
     class Meta:
         model = User
@@ -41,11 +49,9 @@ class RegisterSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data):
-        password = validated_data.pop("password")
-        user = User.objects.create(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        # One insert, committed together with the queued welcome email
+        with transaction.atomic():
+            return User.objects.create_user(**validated_data)
 
 
 class ChangePasswordSerializer(serializers.Serializer):
@@ -67,3 +73,68 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("first_name", "last_name", "phone", "username")
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """
+    Token pair carrying the permission flags as claims, for stateless
+    authentication of read-only endpoints (see users.authentication).
+    """
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_stateless_claims(token, user)
+        # Lets "sign out everywhere" revoke this token (see users.revocation)
+        token[GENERATION_CLAIM] = current_generation(user.pk)
+        return token
+
+
+def set_stateless_claims(token, user):
+    from .authentication import STATELESS_CLAIMS
+
+    for claim in STATELESS_CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Refresh with rotation against the revocation store: revoked refresh
+    tokens are refused and the presented one is revoked as it is exchanged,
+    so each refresh token works once, even under concurrent requests.
+
+    Rotation would otherwise copy every claim forward; the permission flags
+    are re-read from the user instead, so a demotion reaches stateless reads
+    at the next refresh at the latest.
+    """
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if token_revoked(refresh) or not revoke_token(refresh):
+            raise InvalidToken(_("Token has been revoked"))
+        user = User.objects.filter(
+            **{jwt_settings.USER_ID_FIELD: refresh.payload.get(jwt_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        set_stateless_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=False)
+
+    def validate_refresh(self, value):
+        try:
+            refresh = RefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+        if refresh.get(jwt_settings.USER_ID_CLAIM) != str(self.context["request"].user.pk):
+            raise serializers.ValidationError(_("Token belongs to another user."))
+        return refresh
+
@@ -1,7 +1,7 @@
 from django.dispatch import receiver
 from django.db.models.signals import post_save
-from django.conf import settings
-from django.core.mail import send_mail
+
+from outbox.relay import email, enqueue
 
 from .models import User
 
@@ -9,12 +9,7 @@ from .models import User
 @receiver(post_save, sender=User)
 def send_welcome_email(sender, instance: User, created: bool, **kwargs):
     if created:
-        # Placeholder: enqueue a Celery task to send welcome email in production
+        # Written in the creating transaction; outbox.relay sends it after commit
         subject = "Welcome to AgroSphere"
         message = f"Hi {instance.get_full_name() or instance.email}, welcome to AgroSphere!"
-        # In prod, use celery task, here we call send_mail for example:
-        try:
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [instance.email])
-        except Exception:
-            # Logging in production
-            pass
+        enqueue(email(f"users:welcome:{instance.pk}", subject, message, [instance.email]))
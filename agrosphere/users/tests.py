@@ -1,8 +1,23 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, identify_hasher, make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.contrib.auth import get_user_model
 
+from .authentication import user_cache
+from . import revocation
+from .hashers import hashing_slots
+
 User = get_user_model()
 
 
@@ -49,3 +64,216 @@ class UserProfileTests(APITestCase):
         resp = self.client.get(self.me_url)
         self.assertEqual(resp.status_code, status.HTTP_200_OK)
         self.assertEqual(resp.data["email"], "carol@example.com")
+
+
+class UserSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email="admin@example.com", password="pass12345", is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+
+    def test_fields_limit_payload_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-list") + "?fields=id,email")
+        self.assertEqual(response.data["results"], [{"id": self.admin.id, "email": "admin@example.com"}])
+        self.assertNotIn('"password"', queries[-1]["sql"])
+
+        response = self.client.get(reverse("me") + "?fields=email")
+        self.assertEqual(response.data, {"email": "admin@example.com"})
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.local.clear()
+        self.user = User.objects.create_user(email="dave@example.com", password="pass12345", is_vendor=True)
+        response = self.client.post(reverse("token_obtain_pair"), {"email": "dave@example.com", "password": "pass12345"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def user_queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        return response, [query["sql"] for query in queries if '"users_user"' in query["sql"]]
+
+    def test_reads_resolve_the_user_from_cache(self):
+        response, queries = self.user_queries("get", reverse("me"))
+        self.assertEqual(response.data["email"], "dave@example.com")
+        self.assertEqual(len(queries), 1)
+        response, queries = self.user_queries("get", reverse("me"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+        # Writes always load the user from the database
+        _, queries = self.user_queries("patch", reverse("user-detail", args=[self.user.pk]), data={"first_name": "Dave"})
+        self.assertTrue(queries)
+        self.assertEqual(self.client.get(reverse("me")).data["first_name"], "Dave")
+
+    def test_deactivation_through_save_applies_immediately(self):
+        self.assertEqual(self.client.get(reverse("me")).status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("me")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivation_elsewhere_applies_within_the_local_ttl(self):
+        now = user_cache.clock()
+        with mock.patch.object(user_cache, "clock", return_value=now):
+            self.assertEqual(self.client.get(reverse("me")).status_code, status.HTTP_200_OK)
+            # Another process deactivates the user: its signal only reaches the shared cache
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            cache.delete(user_cache.key(self.user.pk))
+            self.assertEqual(self.client.get(reverse("me")).status_code, status.HTTP_200_OK)
+        with mock.patch.object(user_cache, "clock", return_value=now + 5.1):
+            self.assertEqual(self.client.get(reverse("me")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_USER_CACHE={"STATELESS_READS": True})
+    def test_stateless_reads_trust_the_token_claims(self):
+        response, queries = self.user_queries("get", reverse("vendor-dashboard"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+        # Views that did not opt in still check the (cached) user
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("me")).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(reverse("vendor-dashboard")).status_code, status.HTTP_200_OK)
+
+
+ARGON2_HASHERS = ["users.hashers.BoundedArgon2PasswordHasher", "django.contrib.auth.hashers.PBKDF2PasswordHasher"]
+CHEAP_ARGON2 = {"TIME_COST": 1, "MEMORY_COST": 1024, "PARALLELISM": 1, "MAX_CONCURRENCY": 2, "ACQUIRE_TIMEOUT": 5}
+
+
+@override_settings(PASSWORD_HASHERS=ARGON2_HASHERS, PASSWORD_HASHING=CHEAP_ARGON2)
+class PasswordHashingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="erin@example.com", password="pass12345")
+
+    def login(self):
+        return self.client.post(reverse("token_obtain_pair"), {"email": "erin@example.com", "password": "pass12345"})
+
+    def stored_hash(self):
+        return User.objects.values_list("password", flat=True).get(pk=self.user.pk)
+
+    def test_passwords_use_the_configured_argon2_costs(self):
+        encoded = self.stored_hash()
+        self.assertEqual(identify_hasher(encoded).algorithm, "argon2")
+        self.assertIn("$m=1024,t=1,p=1$", encoded)
+
+    def test_old_hashes_are_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password("pass12345", hasher="pbkdf2_sha256"))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertIn("$m=1024,t=1,p=1$", self.stored_hash())
+
+        with self.settings(PASSWORD_HASHING={**CHEAP_ARGON2, "TIME_COST": 2}):
+            self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+        self.assertIn("$m=1024,t=2,p=1$", self.stored_hash())
+
+    def test_concurrent_hashing_is_capped(self):
+        active, peak, lock = [0], [0], threading.Lock()
+        encode = Argon2PasswordHasher.encode
+
+        def tracked(hasher, password, salt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            try:
+                return encode(hasher, password, salt)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        with mock.patch.object(Argon2PasswordHasher, "encode", tracked):
+            threads = [threading.Thread(target=make_password, args=("secret",)) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(peak[0], 2)
+
+    def test_sign_in_fails_fast_when_no_slot_frees_up(self):
+        with self.settings(PASSWORD_HASHING={**CHEAP_ARGON2, "MAX_CONCURRENCY": 1, "ACQUIRE_TIMEOUT": 0.01}):
+            with hashing_slots.held():
+                response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        revocation.reset_store(setting="TOKEN_REVOCATION")
+        self.user = User.objects.create_user(email="frank@example.com", password="pass12345")
+
+    def login(self):
+        response = self.client.post(reverse("token_obtain_pair"), {"email": "frank@example.com", "password": "pass12345"})
+        return response.data["access"], response.data["refresh"]
+
+    def get_me(self, access):
+        return self.client.get(reverse("me"), HTTP_AUTHORIZATION=f"Bearer {access}").status_code
+
+    def refresh(self, token):
+        return self.client.post(reverse("token_refresh"), {"refresh": token})
+
+    def test_logout_revokes_the_access_and_refresh_token(self):
+        access, refresh = self.login()
+        self.assertEqual(self.get_me(access), status.HTTP_200_OK)
+        response = self.client.post(reverse("logout"), {"refresh": refresh}, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_me(access), status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rereads_the_permission_claims(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        _, refresh = self.login()
+        self.assertTrue(RefreshToken(refresh)["is_staff"])
+
+        self.user.is_staff = False
+        self.user.save()
+        data = self.refresh(refresh).data
+        self.assertFalse(AccessToken(data["access"])["is_staff"])
+        self.assertFalse(RefreshToken(data["refresh"])["is_staff"])
+
+    def test_refresh_tokens_rotate_and_work_once(self):
+        _, refresh = self.login()
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data["refresh"], refresh)
+        self.assertEqual(self.get_me(response.data["access"]), status.HTTP_200_OK)
+
+        self.assertEqual(self.refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, status.HTTP_200_OK)
+
+    def test_logout_all_revokes_every_session(self):
+        laptop, phone = self.login(), self.login()
+        response = self.client.post(reverse("logout-all"), HTTP_AUTHORIZATION=f"Bearer {laptop[0]}")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        for access, refresh in (laptop, phone):
+            self.assertEqual(self.get_me(access), status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(self.refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+        # Signing in again starts a new generation
+        self.assertEqual(self.get_me(self.login()[0]), status.HTTP_200_OK)
+
+    def test_sign_out_everywhere_outlives_the_token_lifetime(self):
+        self.client.post(reverse("logout-all"), HTTP_AUTHORIZATION=f"Bearer {self.login()[0]}")
+        _, refresh = self.login()
+        store = revocation.get_store()
+        lifetime = max(jwt_settings.ACCESS_TOKEN_LIFETIME, jwt_settings.REFRESH_TOKEN_LIFETIME)
+        with mock.patch.object(store, "clock", return_value=store.clock() + lifetime.total_seconds() + 1):
+            # Past the longest token lifetime, a token descended from the last sign-in
+            data = self.refresh(refresh).data
+            access, refresh = data["access"], data["refresh"]
+            self.assertEqual(RefreshToken(refresh)[revocation.GENERATION_CLAIM], 1)
+            self.client.post(reverse("logout-all"), HTTP_AUTHORIZATION=f"Bearer {access}")
+            self.assertEqual(self.get_me(access), status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(self.refresh(refresh).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocations_expire_with_the_token(self):
+        store = revocation.LocalRevocationStore()
+        now = store.clock()
+        with mock.patch.object(store, "clock", return_value=now):
+            self.assertTrue(store.revoke("abc", 30))
+            self.assertFalse(store.revoke("abc", 30))
+            self.assertEqual(store.check("abc", "1"), (True, 0))
+        with mock.patch.object(store, "clock", return_value=now + 31):
+            self.assertEqual(store.check("abc", "1"), (False, 0))
+
@@ -5,14 +5,19 @@ from .views import (
     UserDetailView,
     MeView,
     ChangePasswordView,
+    LogoutView,
+    LogoutAllView,
+    TokenObtainPairView,
+    TokenRefreshView,
 )
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
     # Auth & registration
     path("auth/register/", RegisterView.as_view(), name="register"),
     path("auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("auth/logout/", LogoutView.as_view(), name="logout"),
+    path("auth/logout-all/", LogoutAllView.as_view(), name="logout-all"),
 
     # User management
     path("", UserListView.as_view(), name="user-list"),
@@ -1,13 +1,17 @@
 from django.contrib.auth import get_user_model
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework_simplejwt import views as jwt_views
 
 from .serializers import (
     UserSerializer,
     RegisterSerializer,
     ChangePasswordSerializer,
+    LogoutSerializer,
 )
 from .permissions import IsOwnerOrReadOnly
+from .revocation import revoke_token, revoke_user_tokens
+from agrosphere.fieldsets import SparseQuerysetMixin
 
 User = get_user_model()
 
@@ -21,21 +25,22 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "auth"
 
 
 # List all users (admin only)
-class UserListView(generics.ListAPIView):
+class UserListView(SparseQuerysetMixin, generics.ListAPIView):
     """
     List all users (admin only).
     GET /api/v1/users/
     """
-    queryset = User.objects.all().order_by("-date_joined")
+    queryset = User.objects.all().order_by("-date_joined", "-id")
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
 # Retrieve or update a user (owner or admin)
-class UserDetailView(generics.RetrieveUpdateAPIView):
+class UserDetailView(SparseQuerysetMixin, generics.RetrieveUpdateAPIView):
     """
     Retrieve or update a user (owner or admin).
     GET /api/v1/users/<id>/
@@ -46,6 +51,15 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsOwnerOrReadOnly]
 
 
+# JWT endpoints, rate limited as they hash passwords or mint tokens
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    throttle_scope = "auth"
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    throttle_scope = "auth"
+
+
 #current user's profile view
 class MeView(generics.RetrieveAPIView):
     """
@@ -67,6 +81,7 @@ class ChangePasswordView(generics.UpdateAPIView):
     """
     serializer_class = ChangePasswordSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "auth"  # hashes twice
 
     def update(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={"request": request})
@@ -77,3 +92,35 @@ class ChangePasswordView(generics.UpdateAPIView):
         user.set_password(serializer.validated_data["new_password"])
         user.save()
         return Response({"detail": "Password updated successfully."}, status=status.HTTP_200_OK)
+
+
+# Logout views
+class LogoutView(generics.GenericAPIView):
+    """
+    Revoke the access token of the request and, if given, a refresh token.
+    POST /api/v1/users/auth/logout/
+    """
+    serializer_class = LogoutSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if request.auth is not None:
+            revoke_token(request.auth)
+        if "refresh" in serializer.validated_data:
+            revoke_token(serializer.validated_data["refresh"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LogoutAllView(generics.GenericAPIView):
+    """
+    Revoke every token issued to the authenticated user, on all devices.
+    POST /api/v1/users/auth/logout-all/
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        revoke_user_tokens(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
@@ -0,0 +1,120 @@
+"""
+Vendor dashboard aggregates.
+
+Revenue, units and top products come from the analytics daily rollups, so
+their cost depends on the number of days and products, not order lines.
+The order-status breakdown is the one query that reads order lines (only
+the vendor's own); the whole dashboard is cached per vendor and range, and
+a vendor's entries are invalidated by bumping that vendor's generation
+whenever one of their orders, products or reviews changes (see
+vendors.signals).
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from rest_framework import serializers
+
+from analytics.models import ProductDailySales, VendorDailySales
+from orders.models import Order, OrderItem
+from products.cache import VersionedQueryCache
+from products.models import Product
+
+DEFAULTS = {
+    "DEFAULT_DAYS": 30,
+    "MAX_DAYS": 365,
+    "TOP_PRODUCTS": 5,
+    "LOW_RATING_THRESHOLD": 3.0,   # average rating below which a product is flagged
+    "LOW_RATING_MIN_REVIEWS": 3,   # ... once it has at least this many reviews
+}
+
+REVENUE = serializers.DecimalField(max_digits=16, decimal_places=2)
+
+
+def option(name):
+    return getattr(settings, "VENDOR_DASHBOARD", {}).get(name, DEFAULTS[name])
+
+
+def dashboard_cache(vendor_id):
+    return VersionedQueryCache(f"vendors:dashboard:{vendor_id}", "VENDOR_DASHBOARD")
+
+
+def invalidate(vendor_ids):
+    for vendor_id in set(vendor_ids):
+        dashboard_cache(vendor_id).invalidate()
+
+
+def vendors_of_orders(order_ids):
+    return set(
+        Product.objects.filter(order_items__order_id__in=order_ids).values_list("vendor_id", flat=True).distinct()
+    )
+
+
+def money(value):
+    return REVENUE.to_representation(value or 0)
+
+
+def build_dashboard(vendor_id, days):
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    sales = VendorDailySales.objects.filter(vendor_id=vendor_id, day__range=(start, end))
+    totals = sales.aggregate(total_units=Sum("units"), total_revenue=Sum("revenue"), total_orders=Sum("orders"))
+    daily = sales.filter(orders__gt=0).order_by("day").values("day", "units", "revenue", "orders")
+    top_products = (
+        ProductDailySales.objects.filter(product__vendor_id=vendor_id, day__range=(start, end))
+        .values("product_id", "product__title")
+        .annotate(total_units=Sum("units"), total_revenue=Sum("revenue"))
+        .filter(total_units__gt=0)
+        .order_by("-total_revenue", "product_id")[:option("TOP_PRODUCTS")]
+    )
+    # Starts from the vendor's own lines (products -> lines by product), so
+    # other vendors' orders in the window are never read
+    statuses = (
+        OrderItem.objects.filter(
+            product__vendor_id=vendor_id,
+            order__created_at__gte=timezone.make_aware(datetime.combine(start, time.min)),
+        )
+        .values(status=F("order__status"))
+        .annotate(count=Count("order", distinct=True))
+        .order_by()
+    )
+    low_rated = (
+        Product.objects.filter(
+            vendor_id=vendor_id,
+            review_count__gte=option("LOW_RATING_MIN_REVIEWS"),
+            rating_avg__lt=option("LOW_RATING_THRESHOLD"),
+        )
+        .order_by("rating_avg", "id")
+        .values("id", "title", "rating_avg", "review_count")[:20]
+    )
+    status_counts = {status: 0 for status, _ in Order.STATUS_CHOICES}
+    status_counts.update({row["status"]: row["count"] for row in statuses})
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "revenue": money(totals["total_revenue"]),
+        "units": totals["total_units"] or 0,
+        "orders": totals["total_orders"] or 0,
+        "daily": [
+            {"day": row["day"].isoformat(), "units": row["units"], "revenue": money(row["revenue"]),
+             "orders": row["orders"]}
+            for row in daily
+        ],
+        "top_products": [
+            {"id": row["product_id"], "title": row["product__title"], "units": row["total_units"],
+             "revenue": money(row["total_revenue"])}
+            for row in top_products
+        ],
+        "order_status": status_counts,
+        "low_rating_alerts": [
+            {"id": row["id"], "title": row["title"], "rating_avg": round(row["rating_avg"], 2),
+             "review_count": row["review_count"]}
+            for row in low_rated
+        ],
+        "generated_at": timezone.now().isoformat(),
+    }
+
+
+def get_dashboard(vendor_id, days):
+    return dashboard_cache(vendor_id).get_or_set({"days": [str(days)]}, lambda: build_dashboard(vendor_id, days))
@@ -0,0 +1,83 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+
+from agrosphere.benchmark import measure, report
+from analytics.rollups import option as analytics_option, sync_orders
+from orders.models import Order, OrderItem
+from products.models import Product
+from vendors.dashboard import build_dashboard, get_dashboard
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the vendor dashboard for one large vendor: a direct aggregation over order "
+        "lines, a cold build from the rollups and a cached read. Runs in a rolled-back "
+        "transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=100_000, help="Order lines of the vendor.")
+        parser.add_argument("--lines-per-order", type=int, default=5)
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        with transaction.atomic():
+            vendor = self.seed(options["lines"], options["lines_per_order"], options["products"])
+            cache.clear()
+
+            def direct():
+                lines = OrderItem.objects.filter(product__vendor=vendor, order__status__in=("processing", "shipped"))
+                lines.aggregate(
+                    units=Sum("quantity"),
+                    revenue=Sum(F("price_at_purchase") * F("quantity"), output_field=DecimalField()),
+                    orders=Count("order", distinct=True),
+                )
+                list(
+                    lines.values("product_id")
+                    .annotate(revenue=Sum(F("price_at_purchase") * F("quantity"), output_field=DecimalField()))
+                    .order_by("-revenue")[:5]
+                )
+
+            get_dashboard(vendor.pk, 30)  # prime the cache
+            results = [
+                measure("direct aggregation", direct, repeat=repeat),
+                measure("dashboard, cold (rollups)", lambda: build_dashboard(vendor.pk, 30), repeat=repeat),
+                measure("dashboard, cached", lambda: get_dashboard(vendor.pk, 30), repeat=repeat),
+            ]
+            report(self.stdout, results, baseline=results[0])
+            transaction.set_rollback(True)
+
+    def seed(self, lines, per_order, product_count):
+        vendor = User.objects.create_user(email="bench-dashboard@example.com", is_vendor=True)
+        buyer = User.objects.create_user(email="bench-dashboard-buyer@example.com")
+        products = Product.objects.bulk_create(
+            Product(vendor=vendor, title=f"Dashboard product {i}", slug=f"bench-dashboard-product-{i}",
+                    price=Decimal(i % 50) + Decimal("0.99"))
+            for i in range(product_count)
+        )
+        orders = Order.objects.bulk_create(
+            Order(user=buyer, status="processing") for _ in range(-(-lines // per_order))
+        )
+        OrderItem.objects.bulk_create(
+            (
+                OrderItem(order=orders[n // per_order], product=products[n % product_count], quantity=1 + n % 3,
+                          price_at_purchase=products[n % product_count].price)
+                for n in range(lines)
+            ),
+            batch_size=5000,
+        )
+        chunk = analytics_option("CHUNK_SIZE", 1000)
+        order_ids = [order.pk for order in orders]
+        for start in range(0, len(order_ids), chunk):
+            sync_orders(order_ids[start:start + chunk])
+        self.stdout.write(f"Seeded {lines} order lines in {len(orders)} orders over {product_count} products.")
+        return vendor
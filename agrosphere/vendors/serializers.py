@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from .dashboard import option
+
+
+class DashboardQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_days(self, value):
+        if value > option("MAX_DAYS"):
+            raise serializers.ValidationError(f"Ensure this value is less than or equal to {option('MAX_DAYS')}.")
+        return value
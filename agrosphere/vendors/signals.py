@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from analytics.rollups import rollups_changed
+from orders.archive import is_archiving
+from orders.models import Order
+from orders.signals import order_status_changed, orders_archived, orders_placed
+from products.models import Product, Review
+
+from . import dashboard
+
+
+def invalidate_after_commit(vendor_ids):
+    vendor_ids = set(vendor_ids)
+    if vendor_ids:
+        transaction.on_commit(lambda: dashboard.invalidate(vendor_ids))
+
+
+def invalidate_orders_after_commit(order_ids):
+    # Look the vendors up after commit, when new order lines are visible
+    order_ids = list(order_ids)
+    transaction.on_commit(lambda: dashboard.invalidate(dashboard.vendors_of_orders(order_ids)))
+
+
+@receiver(rollups_changed)
+def invalidate_on_rollup(sender, vendor_ids, **kwargs):
+    invalidate_after_commit(vendor_ids)
+
+
+@receiver(orders_placed, sender=Order)
+@receiver(order_status_changed, sender=Order)
+def invalidate_on_orders(sender, order_ids, **kwargs):
+    invalidate_orders_after_commit(order_ids)
+
+
+@receiver(post_save, sender=Order)
+def invalidate_on_order_save(sender, instance, created, **kwargs):
+    if not created:  # new orders announce themselves through orders_placed
+        invalidate_orders_after_commit([instance.pk])
+
+
+@receiver(pre_delete, sender=Order)
+def invalidate_on_order_delete(sender, instance, **kwargs):
+    if is_archiving():
+        return  # handled per batch by invalidate_on_archive
+    # The order lines cascade with the order, so find the vendors first
+    invalidate_after_commit(dashboard.vendors_of_orders([instance.pk]))
+
+
+@receiver(orders_archived, sender=Order)
+def invalidate_on_archive(sender, order_ids, **kwargs):
+    invalidate_after_commit(dashboard.vendors_of_orders(order_ids))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_on_product(sender, instance, **kwargs):
+    invalidate_after_commit([instance.vendor_id])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_on_review(sender, instance, **kwargs):
+    vendor_id = Product.objects.filter(pk=instance.product_id).values_list("vendor_id", flat=True).first()
+    if vendor_id is not None:
+        invalidate_after_commit([vendor_id])
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from orders.models import Order, OrderItem
+from orders.workflow import transition_orders
+from products.models import Product, Review
+
+from .dashboard import dashboard_cache
+
+User = get_user_model()
+
+
+class VendorDashboardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user(email="farmer@example.com", password="pass1234", is_vendor=True)
+        self.buyer = User.objects.create_user(email="customer@example.com", password="pass1234")
+        self.other = User.objects.create_user(email="rival@example.com", password="pass1234", is_vendor=True)
+        self.kale = Product.objects.create(title="Kale", price=3, vendor=self.vendor)
+        self.leeks = Product.objects.create(title="Leeks", price=5, vendor=self.vendor)
+        self.beets = Product.objects.create(title="Beets", price=2, vendor=self.other)
+        self.paid = [
+            self.order((self.kale, 2, 3), (self.beets, 1, 2)),
+            self.order((self.leeks, 3, 5)),
+        ]
+        self.order((self.kale, 1, 3), (self.leeks, 1, 5))  # pending, not revenue yet
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders("processing", order_ids=[order.pk for order in self.paid])
+        self.client.force_authenticate(user=self.vendor)
+        self.url = reverse("vendor-dashboard")
+
+    def order(self, *lines):
+        order = Order.objects.create(user=self.buyer)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=quantity, price_at_purchase=price)
+            for product, quantity, price in lines
+        )
+        return order
+
+    def test_dashboard_aggregates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n, rating in enumerate((1, 2, 2)):
+                reviewer = User.objects.create_user(email=f"critic{n}@example.com", password="pass1234")
+                Review.objects.create(product=self.kale, user=reviewer, rating=rating)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual((data["revenue"], data["units"], data["orders"]), ("21.00", 5, 2))
+        self.assertEqual(
+            [(row["title"], row["units"], row["revenue"]) for row in data["top_products"]],
+            [("Leeks", 3, "15.00"), ("Kale", 2, "6.00")],
+        )
+        self.assertEqual(data["order_status"]["processing"], 2)
+        self.assertEqual(data["order_status"]["pending"], 1)
+        self.assertEqual(data["low_rating_alerts"], [
+            {"id": self.kale.id, "title": "Kale", "rating_avg": 1.67, "review_count": 3},
+        ])
+
+    def test_cached_until_a_relevant_write(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        other_generation = dashboard_cache(self.other.pk).generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders("cancelled", order_ids=[self.paid[1].pk])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["revenue"], "6.00")
+        self.assertEqual(response.data["order_status"]["cancelled"], 1)
+        # The other vendor only had items in the first order
+        self.assertEqual(dashboard_cache(self.other.pk).generation(), other_generation)
+
+    def test_product_and_review_writes_invalidate(self):
+        generation = dashboard_cache(self.vendor.pk).generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.leeks, user=self.buyer, rating=5)
+        self.assertNotEqual(dashboard_cache(self.vendor.pk).generation(), generation)
+
+        generation = dashboard_cache(self.vendor.pk).generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leeks.title = "Winter leeks"
+            self.leeks.save()
+        self.assertNotEqual(dashboard_cache(self.vendor.pk).generation(), generation)
+
+    def test_vendors_only(self):
+        self.assertEqual(self.client.get(self.url, {"days": 0}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.buyer)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
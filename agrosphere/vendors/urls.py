@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import VendorDashboardView
+
+urlpatterns = [
+    path("me/dashboard/", VendorDashboardView.as_view(), name="vendor-dashboard"),
+]
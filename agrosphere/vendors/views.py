@@ -0,0 +1,26 @@
+from rest_framework import generics
+from rest_framework.response import Response
+
+from users.permissions import IsVendor
+
+from .dashboard import get_dashboard, option
+from .serializers import DashboardQuerySerializer
+
+
+class VendorDashboardView(generics.GenericAPIView):
+    """
+    GET: Sales dashboard of the authenticated vendor over the last ``days``
+    days: revenue, units and orders (with a daily series), top products,
+    order-status breakdown and low-rating alerts. Served from cache.
+    """
+
+    serializer_class = DashboardQuerySerializer
+    permission_classes = [IsVendor]
+    # Needs only the user id and flags, which the token claims carry
+    stateless_authentication = True
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        days = serializer.validated_data.get("days", option("DEFAULT_DAYS"))
+        return Response(get_dashboard(request.user.pk, days))